@@ -1,6 +1,8 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
+from eco_nexus import reference
+from eco_nexus.reference import ReferenceChoiceField
 from .models import StudentProfile
 
 
@@ -15,10 +17,15 @@ class StudentSignUpForm(UserCreationForm):
 
 
 class StudentProfileForm(forms.ModelForm):
+    department = ReferenceChoiceField(
+        reference.departments, required=False,
+        widget=forms.Select(attrs={'class': 'block w-full rounded-md border-gray-300'}),
+    )
+    semester = ReferenceChoiceField(
+        reference.semesters, required=False,
+        widget=forms.Select(attrs={'class': 'block w-full rounded-md border-gray-300'}),
+    )
+
     class Meta:
         model = StudentProfile
         fields = ('department', 'semester')
-        widgets = {
-            'department': forms.Select(attrs={'class': 'block w-full rounded-md border-gray-300'}),
-            'semester': forms.Select(attrs={'class': 'block w-full rounded-md border-gray-300'}),
-        }
@@ -0,0 +1,144 @@
+import json
+import logging
+import random
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from eco_nexus import bench
+from eco_nexus.seeding import DEFAULT_PASSWORD
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark scripted user journeys against the WSGI app in-process (default) or a running server "
+        "(--url), reporting throughput, p50/p95/p99 latency and query counts per endpoint. "
+        "Journeys write quiz attempts and applications, so run it against a seeded copy (see seed_scale)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default=None,
+                            help="Base URL of a running server sharing this database and SECRET_KEY "
+                                 "(default: call eco_nexus.wsgi.application in-process)")
+        parser.add_argument('--journey', action='append', choices=sorted(bench.JOURNEYS), dest='journeys',
+                            help="Journey to run; repeat to mix several (default: all)")
+        parser.add_argument('--concurrency', type=int, default=4, help="Concurrent virtual users (default: 4)")
+        parser.add_argument('--iterations', type=int, default=None,
+                            help="Total journeys to run (default: 200 unless --duration is given)")
+        parser.add_argument('--duration', type=float, default=None, help="Stop after this many seconds")
+        parser.add_argument('--warmup', type=int, default=10,
+                            help="Unrecorded journeys run first to warm caches (default: 10)")
+        parser.add_argument('--sample', type=int, default=1000,
+                            help="Object ids sampled per model for the journeys to pick from (default: 1000)")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed (default: 0)")
+        parser.add_argument('--password', default=DEFAULT_PASSWORD,
+                            help=f"Password of the seeded users, for the sign_in journey (default: {DEFAULT_PASSWORD})")
+        parser.add_argument('--output', default=None, help="Write the results as JSON to this file")
+        parser.add_argument('--compare', default=None,
+                            help="Earlier --output file to report latency and query changes against")
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError("--concurrency must be at least 1")
+        iterations, duration = options['iterations'], options['duration']
+        if iterations is None and duration is None:
+            iterations = 200
+        journeys = options['journeys'] or sorted(bench.JOURNEYS)
+
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read {options['compare']}: {e}")
+
+        targets = bench.Targets.load(random.Random(options['seed']), sample=options['sample'],
+                                     password=options['password'])
+        missing = bench.missing_targets(journeys, targets)
+        if missing:
+            raise CommandError(
+                f"No {', '.join(missing)} in the database for the selected journeys; run seed_scale first"
+            )
+
+        if options['url']:
+            try:
+                transport = bench.HTTPTransport(options['url'])
+            except ValueError as e:
+                raise CommandError(str(e))
+        else:
+            transport = bench.WSGITransport()
+            if options['verbosity'] < 2:
+                # One perf log line per request would drown the report
+                logging.getLogger('eco_nexus.perf').setLevel(logging.WARNING)
+
+        self.stdout.write(
+            f"Running {iterations or 'unlimited'} journeys ({', '.join(journeys)}) "
+            f"on {options['concurrency']} users against {transport}"
+            + (f" for up to {duration:g}s" if duration else "")
+        )
+        self.stdout.write(f"Sessions: {settings.SESSION_ENGINE}")
+        started_at = datetime.now(timezone.utc)
+        recorder, wall = bench.run(
+            transport, journeys, targets,
+            concurrency=options['concurrency'], iterations=iterations, duration=duration,
+            warmup=options['warmup'], seed=options['seed'],
+        )
+        summary = bench.summarize(recorder, wall)
+        result = {
+            'meta': {
+                'started_at': started_at.isoformat(),
+                'transport': transport.name,
+                'target': str(transport),
+                'journeys': journeys,
+                'concurrency': options['concurrency'],
+                'iterations': iterations,
+                'duration': duration,
+                'warmup': options['warmup'],
+                'seed': options['seed'],
+                'database': connection.vendor,
+                'session_engine': settings.SESSION_ENGINE,
+                'debug': settings.DEBUG,
+            },
+            **summary,
+        }
+
+        self.write_report(summary)
+        if baseline is not None:
+            self.write_comparison(result, baseline)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(result, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        message = (
+            f"{summary['requests']} requests in {summary['wall_seconds']:.1f}s "
+            f"({summary['throughput']} req/s), {summary['errors']} errors"
+        )
+        self.stdout.write(self.style.WARNING(message) if summary['errors'] else self.style.SUCCESS(message))
+
+    def write_report(self, summary):
+        width = max((len(label) for label in summary['endpoints']), default=8)
+        self.stdout.write(
+            f"{'endpoint':<{width}}  {'reqs':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+            f"{'queries':>9} {'errors':>6}"
+        )
+        for label, stats in summary['endpoints'].items():
+            queries = '-' if stats['queries_mean'] is None else f"{stats['queries_mean']:g}/{stats['queries_max']}"
+            self.stdout.write(
+                f"{label:<{width}}  {stats['requests']:>6} {stats['throughput']:>8} {stats['p50_ms']:>8} "
+                f"{stats['p95_ms']:>8} {stats['p99_ms']:>8} {queries:>9} {stats['errors']:>6}"
+            )
+
+    def write_comparison(self, result, baseline):
+        self.stdout.write(f"Compared with {baseline.get('meta', {}).get('started_at', 'baseline')}:")
+        for label, metric, before, after, change in bench.compare(result, baseline):
+            line = f"  {label} {metric}: {before:g} -> {after:g}"
+            if change is None:
+                self.stdout.write(line)
+            elif change > 0.1:
+                self.stdout.write(self.style.WARNING(f"{line} ({change:+.0%})"))
+            else:
+                self.stdout.write(f"{line} ({change:+.0%})")
@@ -0,0 +1,96 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from eco_nexus.seeding import DEFAULT_BATCH_SIZE, DEFAULT_PASSWORD, Seeder
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a coherent synthetic dataset across accounts, ums, lms and careers for load testing. "
+        "Deterministic for a given --seed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=10000, help="Students to create (default: 10000)")
+        parser.add_argument('--courses', type=int, default=500, help="UMS courses to create (default: 500)")
+        parser.add_argument('--env-courses', type=int, default=200, help="LMS courses to create (default: 200)")
+        parser.add_argument('--modules', type=int, default=6, help="Modules per LMS course (default: 6)")
+        parser.add_argument('--lessons', type=int, default=4, help="Lessons per module (default: 4)")
+        parser.add_argument('--quizzes', type=int, default=2, help="Quizzes per module (default: 2)")
+        parser.add_argument('--questions', type=int, default=8, help="Questions per quiz (default: 8)")
+        parser.add_argument('--choices', type=int, default=4, help="Choices per question (default: 4)")
+        parser.add_argument('--enrollments', type=int, default=None,
+                            help="Total enrollments, spread over students (default: 5 per student)")
+        parser.add_argument('--attempts', type=int, default=None,
+                            help="Total quiz attempts (default: 20 per student)")
+        parser.add_argument('--ledger', type=int, default=None,
+                            help="Total gamification ledger rows (default: one per attempt)")
+        parser.add_argument('--employers', type=int, default=200, help="Employers to create (default: 200)")
+        parser.add_argument('--jobs', type=int, default=2000, help="Job postings to create (default: 2000)")
+        parser.add_argument('--applications', type=int, default=None,
+                            help="Total job applications (default: 3 per student)")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed (default: 0)")
+        parser.add_argument('--prefix', default=None,
+                            help="Username/course-code prefix, so datasets can coexist (default: s<seed>)")
+        parser.add_argument('--password', default=DEFAULT_PASSWORD,
+                            help=f"Password for every generated user (default: {DEFAULT_PASSWORD})")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help=f"Rows per INSERT (default: {DEFAULT_BATCH_SIZE})")
+        parser.add_argument('--workers', type=int, default=1,
+                            help="Processes for the per-student tables; ignored on SQLite (default: 1)")
+        parser.add_argument('--database', default='default', help="Database alias (default: default)")
+
+    def handle(self, *args, **options):
+        students = options['students']
+        if students < 1:
+            raise CommandError("--students must be at least 1")
+        using = options['database']
+        if options['workers'] > 1 and connections[using].vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING("SQLite allows a single writer; ignoring --workers"))
+
+        seeder = Seeder(
+            seed=options['seed'],
+            prefix=options['prefix'],
+            batch_size=options['batch_size'],
+            password=options['password'],
+            using=using,
+        )
+        started = time.monotonic()
+
+        def step(label, func, *args, **kwargs):
+            step_started = time.monotonic()
+            result = func(*args, **kwargs)
+            self.stdout.write(f"{label} ({time.monotonic() - step_started:.1f}s)")
+            return result
+
+        step("Reference data", seeder.reference_data)
+        step(f"{students} students", seeder.students, students)
+        step(f"{options['courses']} courses", seeder.courses, options['courses'])
+        step(
+            f"{options['env_courses']} LMS courses", seeder.content, options['env_courses'],
+            modules=options['modules'], lessons=options['lessons'], quizzes=options['quizzes'],
+            questions=options['questions'], choices=options['choices'],
+        )
+        step(
+            f"{options['employers']} employers, {options['jobs']} jobs",
+            seeder.employers, options['employers'], options['jobs'],
+        )
+
+        attempts = options['attempts'] if options['attempts'] is not None else students * 20
+        totals = step(
+            "Per-student rows", seeder.per_student_rows,
+            enrollments=options['enrollments'] if options['enrollments'] is not None else students * 5,
+            attempts=attempts,
+            ledger=options['ledger'] if options['ledger'] is not None else attempts,
+            applications=options['applications'] if options['applications'] is not None else students * 3,
+            workers=options['workers'],
+            log=lambda progress: self.stdout.write(f"  {progress}"),
+        )
+        step("Balances, rollups and search index", seeder.derived_tables)
+
+        summary = ', '.join(f"{value} {key}" for key, value in totals.items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {students} students with {summary} in {time.monotonic() - started:.1f}s"
+        ))
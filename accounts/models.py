@@ -3,8 +3,10 @@ from django.contrib.auth.models import User
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+from eco_nexus.dirty_fields import DirtyFieldsMixin
 
-class StudentProfile(models.Model):
+
+class StudentProfile(DirtyFieldsMixin, models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='student_profile')
     student_id = models.CharField(max_length=20, unique=True)
     department = models.ForeignKey('ums.Department', on_delete=models.SET_NULL, null=True, blank=True)
@@ -19,10 +21,14 @@ class StudentProfile(models.Model):
 
 
 @receiver(post_save, sender=User)
-def create_or_update_student_profile(sender, instance, created, **kwargs):
+def create_or_update_student_profile(sender, instance, created, update_fields=None, **kwargs):
     # Only create for non-staff users by default; can be adjusted later
     if created and not instance.is_staff:
         StudentProfile.objects.create(user=instance, student_id=f"S{instance.id:06d}")
+    elif update_fields is not None and set(update_fields) <= {'last_login'}:
+        # The last_login update on every sign-in
+        return
     else:
         if hasattr(instance, 'student_profile'):
+            # A no-op unless the profile was changed alongside the user
             instance.student_profile.save()
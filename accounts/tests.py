@@ -1,3 +1,265 @@
-from django.test import TestCase
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path, reverse
+from django.utils import timezone
+
+from eco_nexus import bench
+from eco_nexus.metrics import Registry
+from eco_nexus.nplusone import NPlusOneError
+from eco_nexus.sessions.cached_db import SessionStore
+from eco_nexus.testing import PASSWORD, TEST_CACHES, QueryBudgetTestCase
+from eco_nexus.urls import urlpatterns as project_urls
+
+from careers.models import Application, Employer, JobPosting
+from lms.models import Attempt, Choice, CourseModule, EnvCourse, GamificationBalance, Question, Quiz
+from ums.models import Course, Enrollment
+
+from .models import StudentProfile
+
+
+def course_titles(request):
+    # One course query per enrollment
+    enrollments = Enrollment.objects.filter(student_id=request.GET['student']).order_by('pk')[:10]
+    return HttpResponse(', '.join(enrollment.course.title for enrollment in enrollments))
+
+
+def course_titles_joined(request):
+    enrollments = Enrollment.objects.filter(student_id=request.GET['student']).select_related('course')
+    return HttpResponse(', '.join(enrollment.course.title for enrollment in enrollments.order_by('pk')[:10]))
+
+
+# The project's URLs plus views for the N+1 detector tests
+urlpatterns = project_urls + [
+    path('course-titles/', course_titles),
+    path('course-titles/joined/', course_titles_joined),
+]
+
+# A worker that records some metrics and exits without an explicit flush
+WORKER = '''
+import django
+django.setup()
+from eco_nexus import metrics
+for _ in range({count}):
+    metrics.quiz_submissions.inc()
+metrics.observe_request('lms:quiz_take', 'POST', 200, 0.03, 4)
+'''
+
+
+class AccountsQueryBudgetTests(QueryBudgetTestCase):
+    """
+    Query and time budgets for every accounts URL
+    """
+
+    def test_signup(self):
+        self.assertBudget('accounts:signup', 2)
+        self.assertBudget('accounts:signup', 1, user=self.data.student_user)
+
+    def test_login(self):
+        response = self.assertBudget('accounts:login', 0)
+        # Inputs are styled by StudentAuthenticationForm's widgets
+        self.assertContains(response, 'focus:ring-green-200', count=2)
+
+    def test_logout(self):
+        self.assertBudget('accounts:logout', 3, user=self.data.student_user, method='post', status=302)
+
+    def test_profile(self):
+        self.assertBudget('accounts:profile', 0, status=302)
+        self.assertBudget('accounts:profile', 3, user=self.data.student_user)
+        self.assertBudget('accounts:profile', 2, user=self.data.employer_user)
+
+    def test_identity_loaded_with_user(self):
+        response = self.assertBudget('accounts:profile', 3, user=self.data.student_user)
+        identity = response.wsgi_request.identity
+        with self.assertNumQueries(0):
+            self.assertTrue(identity.is_student)
+            self.assertFalse(identity.is_employer)
+            str(identity.student.department)
+
+        response = self.assertBudget('careers:employer_dashboard', 1, user=self.data.student_user, status=302)
+        self.assertRedirects(response, '/', fetch_redirect_response=False)
+
+    def test_unchanged_session_not_saved(self):
+        session = SessionStore()
+        session['theme'] = 'dark'
+        session.create()
+
+        session = SessionStore(session.session_key)
+        session['theme'] = 'dark'
+        self.assertFalse(session.modified)
+        session['theme'] = 'light'
+        self.assertTrue(session.modified)
+
+        # Logged-in sessions are read back from the cache, not the session table
+        client = self.client_for(self.data.student_user)
+        with self.assertNumQueries(0):
+            self.assertEqual(SessionStore(client.session.session_key).get('_auth_user_id'),
+                             str(self.data.student_user.pk))
+
+    @override_settings(SESSION_CLEANUP_BATCH_SIZE=2)
+    def test_clear_expired_sessions_in_batches(self):
+        past = timezone.now() - timedelta(days=1)
+        Session.objects.bulk_create(
+            Session(session_key=f'expired{i}', session_data='', expire_date=past) for i in range(5)
+        )
+        live = Session.objects.create(session_key='live', session_data='',
+                                      expire_date=timezone.now() + timedelta(days=1))
+
+        # Three batches, then an empty select
+        with self.assertNumQueries(7):
+            SessionStore.clear_expired()
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), [live.session_key])
+
+    def test_sign_in_skips_profile_write(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client_for().post(reverse('accounts:login'), {
+                'username': self.data.student_user.username, 'password': PASSWORD,
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse([query['sql'] for query in captured if 'accounts_studentprofile' in query['sql']])
+
+    def test_profile_saves_only_changed_fields(self):
+        profile = StudentProfile.objects.get(pk=self.data.student.pk)
+        with self.assertNumQueries(0):
+            profile.save()
+
+        profile.skills.append('solar design')
+        with CaptureQueriesContext(connection) as captured:
+            profile.save()
+        [update] = [query['sql'] for query in captured]
+        self.assertIn('"skills"', update)
+        self.assertNotIn('"badges"', update)
+        self.assertEqual(profile.get_dirty_fields(), [])
+        self.assertIn('solar design', StudentProfile.objects.get(pk=profile.pk).skills)
+
+    def test_server_timing_only_for_staff(self):
+        self.assertFalse(self.assertBudget('accounts:login', 0).has_header('Server-Timing'))
+        self.assertFalse(self.assertBudget('accounts:profile', 3, user=self.data.student_user)
+                         .has_header('Server-Timing'))
+        response = self.client_for(self.data.staff_user).get(reverse('ums:course_list'))
+        self.assertIn('queries"', response['Server-Timing'])
+        with override_settings(PERF_SERVER_TIMING=True):
+            self.assertTrue(self.assertBudget('accounts:login', 0).has_header('Server-Timing'))
+
+    @override_settings(METRICS_TOKEN='scrape-secret', METRICS_ALLOWED_IPS=['10.0.0.5'])
+    def test_metrics_access(self):
+        url = reverse('metrics')
+        # Loopback is what every request looks like behind a local proxy
+        self.assertEqual(self.client_for().get(url, REMOTE_ADDR='127.0.0.1').status_code, 403)
+        self.assertEqual(self.client_for().get(url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(self.client_for(self.data.student_user).get(url).status_code, 403)
+
+        self.assertEqual(self.client_for().get(url, HTTP_AUTHORIZATION='Bearer scrape-secret').status_code, 200)
+        self.assertEqual(self.client_for().get(url, REMOTE_ADDR='10.0.0.5').status_code, 200)
+        self.assertEqual(self.client_for(self.data.staff_user).get(url).status_code, 200)
+        with override_settings(METRICS_TOKEN=''):
+            self.assertEqual(self.client_for().get(url, HTTP_AUTHORIZATION='Bearer ').status_code, 403)
+
+    def run_metrics_worker(self, directory, count):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'eco_nexus.settings',
+               'METRICS_MULTIPROC_DIR': directory, 'METRICS_FLUSH_INTERVAL': '3600'}
+        subprocess.run([sys.executable, '-c', WORKER.format(count=count)],
+                       cwd=settings.BASE_DIR, env=env, check=True)
+
+    def test_metrics_from_exited_workers(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_MULTIPROC_DIR=directory):
+            self.run_metrics_worker(directory, 50)
+            # A worker that exited before this process, under this process's pid
+            [exited] = Path(directory).glob('*.json')
+            Path(directory, f'{os.getpid()}.json').write_text(exited.read_text())
+            self.run_metrics_worker(directory, 20)
+
+            text = Registry().render()
+            self.assertIn('# TYPE eco_nexus_quiz_submissions_total counter\n', text)
+            self.assertIn('\neco_nexus_quiz_submissions_total 120\n', text)
+            self.assertIn('# TYPE eco_nexus_http_request_duration_seconds histogram\n', text)
+            self.assertIn('eco_nexus_http_request_duration_seconds_bucket{view="lms:quiz_take",le="0.025"} 0\n', text)
+            self.assertIn('eco_nexus_http_request_duration_seconds_bucket{view="lms:quiz_take",le="0.05"} 3\n', text)
+            self.assertIn('eco_nexus_http_request_duration_seconds_count{view="lms:quiz_take"} 3\n', text)
+            self.assertIn('eco_nexus_http_request_queries_sum{view="lms:quiz_take"} 12\n', text)
+
+            # Exited workers were folded into one file, counted once
+            self.assertEqual(sorted(path.name for path in Path(directory).glob('*.json')),
+                             sorted([f'{os.getpid()}.json', 'exited.json']))
+            self.assertIn('\neco_nexus_quiz_submissions_total 120\n', Registry().render())
+
+    @override_settings(ROOT_URLCONF='accounts.tests')
+    def test_nplusone_detected(self):
+        data = {'student': self.data.student.pk}
+        # Query budgets run in 'raise' mode
+        with self.assertRaisesMessage(NPlusOneError, 'Possible N+1 queries in accounts.tests.course_titles'):
+            self.client_for().get('/course-titles/', data)
+
+        with override_settings(NPLUSONE_MODE='log'), self.assertLogs('eco_nexus.nplusone', 'WARNING') as logs:
+            self.assertEqual(self.client_for().get('/course-titles/', data).status_code, 200)
+        [message] = logs.output
+        self.assertIn('10x at accounts/tests.py:', message)
+        self.assertIn('FROM "ums_course"', message)
+
+        # The same page with select_related runs one query
+        self.assertEqual(self.client_for().get('/course-titles/joined/', data).status_code, 200)
+        with override_settings(NPLUSONE_MODE='log'), self.assertNoLogs('eco_nexus.nplusone'):
+            self.client_for().get('/course-titles/joined/', data)
+        with override_settings(NPLUSONE_THRESHOLD=10):
+            self.assertEqual(self.client_for().get('/course-titles/', data).status_code, 200)
+
+
+# The bench threads need committed data
+@override_settings(CACHES=TEST_CACHES)
+class LoadToolTests(TransactionTestCase):
+    """
+    Smoke tests for seed_scale and bench at a tiny scale
+    """
+
+    def seed(self):
+        out = StringIO()
+        call_command(
+            'seed_scale', '--students', '20', '--courses', '5', '--env-courses', '2', '--modules', '2',
+            '--lessons', '1', '--quizzes', '1', '--questions', '2', '--choices', '2',
+            '--employers', '2', '--jobs', '4', '--applications', '30', stdout=out,
+        )
+        return out.getvalue()
+
+    def test_seed_scale(self):
+        output = self.seed()
+        self.assertIn('Seeded 20 students with 100 enrollments, 400 attempts, 400 ledger, 30 applications', output)
+        counts = {model.__name__: model.objects.count() for model in (
+            StudentProfile, Course, Enrollment, EnvCourse, CourseModule, Quiz, Question, Choice,
+            Attempt, GamificationBalance, Employer, JobPosting, Application,
+        )}
+        self.assertEqual(counts, {
+            'StudentProfile': 20, 'Course': 5, 'Enrollment': 100, 'EnvCourse': 2, 'CourseModule': 4, 'Quiz': 4,
+            'Question': 8, 'Choice': 16, 'Attempt': 400, 'GamificationBalance': 20, 'Employer': 2,
+            'JobPosting': 4, 'Application': 30,
+        })
+        # Seat counts are derived from the enrollments
+        self.assertEqual(sum(Course.objects.values_list('enrolled_count', flat=True)), 100)
+
+    def test_bench(self):
+        self.seed()
+        with tempfile.TemporaryDirectory() as directory:
+            for journey in sorted(bench.JOURNEYS):
+                out, path = StringIO(), Path(directory, f'{journey}.json')
+                call_command('bench', '--journey', journey, '--iterations', '1', '--concurrency', '1',
+                             '--warmup', '0', '--output', str(path), stdout=out)
+                self.assertIn(f'Running 1 journeys ({journey}) on 1 users', out.getvalue())
+                self.assertRegex(out.getvalue(), r'\d+ requests in [\d.]+s \([\d.]+ req/s\), 0 errors')
+
+                result = json.loads(path.read_text())
+                self.assertEqual((result['meta']['journeys'], result['errors']), ([journey], 0))
+                self.assertTrue(result['endpoints'], journey)
+                self.assertEqual(sum(stats['requests'] for stats in result['endpoints'].values()),
+                                 result['requests'])
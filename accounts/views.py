@@ -29,7 +29,7 @@ def signup(request):
 
 @login_required
 def profile(request):
-	profile = getattr(request.user, 'student_profile', None)
+	profile = request.identity.student
 	if profile is None:
 		# In case profile wasn't created by signal
 		from .models import StudentProfile
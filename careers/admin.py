@@ -1,4 +1,5 @@
 from django.contrib import admin
+from .analytics import change_status
 from .models import Employer, JobPosting, Application, GreenProfile, EmployerProfile
 
 
@@ -29,9 +30,9 @@ class JobPostingAdmin(admin.ModelAdmin):
 
 @admin.register(Application)
 class ApplicationAdmin(admin.ModelAdmin):
-    list_display = ('student', 'job', 'applied_at')
+    list_display = ('student', 'job', 'status', 'applied_at')
     search_fields = ('student__student_id', 'job__title')
-    list_filter = ('applied_at', 'job__category')
+    list_filter = ('status', 'applied_at', 'job__category')
     readonly_fields = ('applied_at', 'student', 'job')
     ordering = ('-applied_at',)
     fieldsets = (
@@ -39,7 +40,7 @@ class ApplicationAdmin(admin.ModelAdmin):
             'fields': ('student', 'job')
         }),
         ('Application Content', {
-            'fields': ('cover_letter',)
+            'fields': ('status', 'cover_letter',)
         }),
         ('Application Date', {
             'fields': ('applied_at',),
@@ -47,6 +48,15 @@ class ApplicationAdmin(admin.ModelAdmin):
         }),
     )
 
+    def save_model(self, request, obj, form, change):
+        # Status changes go through change_status so the rollups follow them
+        new_status = obj.status
+        if change and 'status' in form.changed_data:
+            obj.status = form.initial['status']
+        super().save_model(request, obj, form, change)
+        if change:
+            change_status(obj, new_status)
+
 
 @admin.register(GreenProfile)
 class GreenProfileAdmin(admin.ModelAdmin):
@@ -0,0 +1,166 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from eco_nexus import metrics
+
+from .models import Application, ApplicationDailyRollup
+
+COUNTERS = ('created', 'net', 'transitions', 'first_reviews', 'first_review_seconds')
+
+
+def increment(employer_id, job_id, day, status, **deltas):
+    """
+    Add ``deltas`` to one rollup row, creating it if needed
+    """
+    key = {'employer_id': employer_id, 'job_id': job_id, 'day': day, 'status': status}
+    updates = {name: F(name) + value for name, value in deltas.items() if value}
+    if not updates:
+        return
+    if ApplicationDailyRollup.objects.filter(**key).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            ApplicationDailyRollup.objects.create(**key, **deltas)
+    except IntegrityError:
+        # Another request created the row first
+        ApplicationDailyRollup.objects.filter(**key).update(**updates)
+
+
+def record_application_created(application):
+    increment(
+        application.job.employer_id, application.job_id,
+        timezone.localdate(application.applied_at), application.status,
+        created=1, net=1,
+    )
+    metrics.job_applications.inc()
+
+
+def record_application_removed(application):
+    increment(
+        application.job.employer_id, application.job_id,
+        timezone.localdate(), application.status,
+        net=-1,
+    )
+
+
+def change_status(application, new_status, now=None):
+    """
+    Move an application to ``new_status`` and roll the change up.
+
+    The row is re-read under a lock so concurrent changes roll up from the
+    status actually stored, not the one each request loaded. ``application``
+    is updated in place. Returns False if the status did not change.
+    """
+    now = now or timezone.now()
+    day = timezone.localdate(now)
+    employer_id = application.job.employer_id
+
+    with transaction.atomic():
+        locked = Application.objects.select_for_update().get(pk=application.pk)
+        old_status = locked.status
+        changed = new_status != old_status
+        if changed:
+            locked.status = new_status
+            first_review = {}
+            if locked.first_reviewed_at is None and old_status == 'pending':
+                locked.first_reviewed_at = now
+                first_review = {
+                    'first_reviews': 1,
+                    'first_review_seconds': int((now - locked.applied_at).total_seconds()),
+                }
+            # Writes only the changed columns
+            locked.save()
+
+            increment(employer_id, locked.job_id, day, old_status, net=-1)
+            increment(employer_id, locked.job_id, day, new_status, net=1, transitions=1, **first_review)
+
+    application.status = locked.status
+    application.first_reviewed_at = locked.first_reviewed_at
+    application.snapshot_fields(['status', 'first_reviewed_at'])
+    return changed
+
+
+def backfill(chunk_size=2000, using='default'):
+    """
+    Rebuild all rollups from the Application table, streaming it in chunks.
+
+    Past status history is not stored, so every application is counted as
+    submitted pending on its ``applied_at`` day and, if it has moved on,
+    as moving to its current status on its first-review day (or the
+    submission day if that is unknown).
+
+    Returns the number of applications read.
+    """
+    totals = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    rows = (
+        Application.objects.using(using)
+        .order_by('id')
+        .values_list('job__employer_id', 'job_id', 'status', 'applied_at', 'first_reviewed_at')
+        .iterator(chunk_size=chunk_size)
+    )
+    count = 0
+    for employer_id, job_id, status, applied_at, first_reviewed_at in rows:
+        count += 1
+        applied_day = timezone.localdate(applied_at)
+        pending = totals[(employer_id, job_id, applied_day, 'pending')]
+        pending['created'] += 1
+        pending['net'] += 1
+        if status == 'pending':
+            continue
+        moved_at = first_reviewed_at or applied_at
+        moved_day = timezone.localdate(moved_at)
+        totals[(employer_id, job_id, moved_day, 'pending')]['net'] -= 1
+        moved = totals[(employer_id, job_id, moved_day, status)]
+        moved['net'] += 1
+        moved['transitions'] += 1
+        if first_reviewed_at is not None:
+            moved['first_reviews'] += 1
+            moved['first_review_seconds'] += int((first_reviewed_at - applied_at).total_seconds())
+
+    with transaction.atomic(using=using):
+        ApplicationDailyRollup.objects.using(using).all().delete()
+        ApplicationDailyRollup.objects.using(using).bulk_create(
+            (
+                ApplicationDailyRollup(employer_id=e, job_id=j, day=d, status=s, **counters)
+                for (e, j, d, s), counters in totals.items()
+            ),
+            batch_size=chunk_size,
+        )
+    return count
+
+
+def employer_trend(employer, days=30, today=None):
+    """
+    Daily figures for an employer's last ``days`` days, read from rollups.
+
+    Returns ``(days, per_job, per_status, first_review)`` where ``per_job``
+    and ``per_status`` map a job id / status to a list of daily counts
+    aligned with ``days``, and ``first_review`` holds the count and average
+    hours to first review over the window.
+    """
+    today = today or timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    day_list = [start + timedelta(days=i) for i in range(days)]
+    index = {day: i for i, day in enumerate(day_list)}
+
+    per_job = defaultdict(lambda: [0] * days)
+    per_status = defaultdict(lambda: [0] * days)
+    reviews = seconds = 0
+    rows = ApplicationDailyRollup.objects.filter(employer=employer, day__gte=start, day__lte=today).values_list(
+        'job_id', 'day', 'status', 'created', 'transitions', 'first_reviews', 'first_review_seconds',
+    )
+    for job_id, day, status, created, transitions, first_reviews, first_review_seconds in rows:
+        per_job[job_id][index[day]] += created
+        per_status[status][index[day]] += transitions
+        reviews += first_reviews
+        seconds += first_review_seconds
+
+    first_review = {
+        'count': reviews,
+        'average_hours': round(seconds / reviews / 3600, 1) if reviews else None,
+    }
+    return day_list, dict(per_job), dict(per_status), first_review
@@ -1,5 +1,8 @@
 from django import forms
 from django.forms import ModelForm
+
+from eco_nexus import reference
+from eco_nexus.reference import ReferenceChoiceField
 from .models import JobPosting, Application
 
 
@@ -95,6 +98,15 @@ class JobFilterForm(forms.Form):
         })
     )
     
+    category = ReferenceChoiceField(
+        reference.job_categories,
+        empty_label='All Categories',
+        required=False,
+        widget=forms.Select(attrs={
+            'class': 'w-full px-4 py-2 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-green-500'
+        })
+    )
+    
     job_type = forms.ChoiceField(
         choices=JOB_TYPE_CHOICES,
         required=False,
@@ -124,13 +136,7 @@ class UpdateApplicationStatusForm(forms.Form):
     """
     Form for employers to update application status
     """
-    STATUS_CHOICES = [
-        ('pending', 'Pending'),
-        ('reviewing', 'Under Review'),
-        ('interviewed', 'Interviewed'),
-        ('rejected', 'Rejected'),
-        ('accepted', 'Accepted'),
-    ]
+    STATUS_CHOICES = Application.STATUS_CHOICES
     
     status = forms.ChoiceField(
         choices=STATUS_CHOICES,
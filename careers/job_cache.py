@@ -0,0 +1,32 @@
+from eco_nexus.detail import QueryPlan
+from eco_nexus.object_cache import ObjectCache
+
+from .models import JobPosting
+
+JOB_CACHE_TIMEOUT = 60 * 10
+
+# What the job detail page reads from a job
+JOB_PLAN = QueryPlan(select_related=('employer',))
+
+
+def build_job(job_id):
+    return JOB_PLAN.apply(JobPosting.objects).filter(pk=job_id).first()
+
+
+jobs = ObjectCache('job', build_job, timeout=JOB_CACHE_TIMEOUT)
+
+
+def get_job(job_id):
+    """
+    Return a JobPosting with its employer from the object cache, or None
+    """
+    job, version = jobs.get_entry(job_id)
+    if job is not None:
+        # For template fragments rendered from this job
+        job.cache_version = version
+    return job
+
+
+def invalidate_jobs(job_ids):
+    for job_id in job_ids:
+        jobs.invalidate(job_id)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from careers.analytics import backfill
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily application rollups from existing Application rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help="Number of applications to read per chunk (default: 2000)",
+        )
+
+    def handle(self, *args, **options):
+        count = backfill(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {count} application(s)"))
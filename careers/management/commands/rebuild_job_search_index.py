@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from careers.models import JobPosting
+from careers.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for job postings"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Number of postings to index per batch (default: 1000)",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        backend = get_backend()
+        jobs = JobPosting.objects.select_related('employer').order_by('id')
+
+        indexed = 0
+        with transaction.atomic():
+            backend.clear()
+            batch = []
+            for job in jobs.iterator(chunk_size=batch_size):
+                batch.append(job)
+                if len(batch) >= batch_size:
+                    backend.index(batch)
+                    indexed += len(batch)
+                    batch = []
+            backend.index(batch)
+            indexed += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} job posting(s) with {type(backend).__name__}"))
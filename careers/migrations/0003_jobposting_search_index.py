@@ -0,0 +1,57 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE careers_jobposting_fts USING fts5("
+            "title, role, location, company_name, description, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            "INSERT INTO careers_jobposting_fts "
+            "(rowid, title, role, location, company_name, description) "
+            "SELECT j.id, j.title, j.role, j.location, e.company_name, j.description "
+            "FROM careers_jobposting j JOIN careers_employer e ON e.id = j.employer_id"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE careers_jobposting_search ("
+            "job_id bigint PRIMARY KEY REFERENCES careers_jobposting (id) "
+            "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX careers_jobposting_search_document_gin "
+            "ON careers_jobposting_search USING GIN (document)"
+        )
+        schema_editor.execute(
+            "INSERT INTO careers_jobposting_search (job_id, document) "
+            "SELECT j.id, "
+            "setweight(to_tsvector('simple', j.title), 'A') || "
+            "setweight(to_tsvector('simple', j.role), 'B') || "
+            "setweight(to_tsvector('simple', j.location), 'C') || "
+            "setweight(to_tsvector('simple', e.company_name), 'B') || "
+            "setweight(to_tsvector('simple', j.description), 'D') "
+            "FROM careers_jobposting j JOIN careers_employer e ON e.id = j.employer_id"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS careers_jobposting_fts")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP TABLE IF EXISTS careers_jobposting_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('careers', '0002_employerprofile'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
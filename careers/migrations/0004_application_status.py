@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_initial'),
+        ('careers', '0003_jobposting_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='application',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('reviewing', 'Under Review'), ('interviewed', 'Interviewed'), ('rejected', 'Rejected'), ('accepted', 'Accepted')], db_index=True, default='pending', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['job', 'status'], name='careers_app_job_id_ac1dbc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['student', 'status'], name='careers_app_student_bb842f_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('careers', '0004_application_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='application',
+            name='first_reviewed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='ApplicationDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('reviewing', 'Under Review'), ('interviewed', 'Interviewed'), ('rejected', 'Rejected'), ('accepted', 'Accepted')], max_length=20)),
+                ('created', models.PositiveIntegerField(default=0)),
+                ('net', models.IntegerField(default=0)),
+                ('transitions', models.PositiveIntegerField(default=0)),
+                ('first_reviews', models.PositiveIntegerField(default=0)),
+                ('first_review_seconds', models.BigIntegerField(default=0)),
+                ('employer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='application_rollups', to='careers.employer')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='application_rollups', to='careers.jobposting')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['employer', 'day'], name='careers_app_employe_0e6a37_idx')],
+                'unique_together': {('employer', 'job', 'day', 'status')},
+            },
+        ),
+    ]
@@ -1,8 +1,14 @@
+import threading
+
 from django.db import models
 from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from eco_nexus.dirty_fields import DirtyFieldsMixin
 
 
-class Employer(models.Model):
+class Employer(DirtyFieldsMixin, models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='employer_profile')
     company_name = models.CharField(max_length=200)
     website = models.URLField(blank=True)
@@ -26,7 +32,7 @@ class JobPosting(models.Model):
         return f"{self.title} at {self.employer.company_name}"
 
 
-class GreenProfile(models.Model):
+class GreenProfile(DirtyFieldsMixin, models.Model):
     student = models.OneToOneField('accounts.StudentProfile', on_delete=models.CASCADE, related_name='green_profile')
     sustainability_score = models.PositiveIntegerField(default=0)
     badges = models.JSONField(default=list, blank=True)
@@ -37,20 +43,64 @@ class GreenProfile(models.Model):
         return f"GreenProfile: {self.student.student_id}"
 
 
-class Application(models.Model):
+class Application(DirtyFieldsMixin, models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('reviewing', 'Under Review'),
+        ('interviewed', 'Interviewed'),
+        ('rejected', 'Rejected'),
+        ('accepted', 'Accepted'),
+    ]
+
     job = models.ForeignKey(JobPosting, on_delete=models.CASCADE, related_name='applications')
     student = models.ForeignKey('accounts.StudentProfile', on_delete=models.CASCADE, related_name='applications')
     resume = models.FileField(upload_to='resumes/', blank=True)
     cover_letter = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True)
     applied_at = models.DateTimeField(auto_now_add=True)
+    first_reviewed_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         unique_together = ('job', 'student')
+        indexes = [
+            models.Index(fields=['job', 'status']),
+            models.Index(fields=['student', 'status']),
+        ]
 
     def __str__(self):
         return f"{self.student.student_id} -> {self.job.title}"
 
 
+class ApplicationDailyRollup(models.Model):
+    """
+    Daily application activity per job and status, maintained incrementally.
+
+    ``created`` counts applications submitted into ``status``, ``net`` is
+    the change in how many applications sit in ``status`` (so summing it
+    over all days gives the current count), ``transitions`` counts moves
+    into ``status`` and ``first_reviews``/``first_review_seconds`` track
+    applications leaving pending for the first time.
+    """
+    employer = models.ForeignKey(Employer, on_delete=models.CASCADE, related_name='application_rollups')
+    job = models.ForeignKey(JobPosting, on_delete=models.CASCADE, related_name='application_rollups')
+    day = models.DateField()
+    status = models.CharField(max_length=20, choices=Application.STATUS_CHOICES)
+    created = models.PositiveIntegerField(default=0)
+    net = models.IntegerField(default=0)
+    transitions = models.PositiveIntegerField(default=0)
+    first_reviews = models.PositiveIntegerField(default=0)
+    first_review_seconds = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('employer', 'job', 'day', 'status')
+        indexes = [
+            models.Index(fields=['employer', 'day']),
+        ]
+
+    def __str__(self):
+        return f"{self.job_id} {self.day} {self.status}: +{self.created} ({self.net:+d})"
+
+
 # Added EmployerProfile model
 class EmployerProfile(models.Model):
     employer = models.OneToOneField(Employer, on_delete=models.CASCADE, related_name='profile')
@@ -60,3 +110,103 @@ class EmployerProfile(models.Model):
 
     def __str__(self):
         return f"Profile for {self.employer.company_name}"
+
+
+@receiver(post_save, sender=JobPosting)
+def index_job_posting(sender, instance, raw=False, using='default', **kwargs):
+    if raw:
+        return
+    from .search import index_jobs
+    index_jobs([instance], using=using)
+
+
+@receiver(post_delete, sender=JobPosting)
+def unindex_job_posting(sender, instance, using='default', **kwargs):
+    from .search import remove_jobs
+    remove_jobs([instance.id], using=using)
+
+
+@receiver(post_save, sender=Employer)
+def reindex_employer_jobs(sender, instance, created, raw=False, using='default', update_fields=None, **kwargs):
+    # Company name is part of every posting's search document
+    if created or raw:
+        return
+    if update_fields is not None and 'company_name' not in update_fields:
+        return
+    from .search import index_jobs
+    index_jobs(instance.jobs.using(using).select_related('employer'), using=using)
+
+
+@receiver([post_save, post_delete], sender=JobPosting)
+@receiver([post_save, post_delete], sender=Employer)
+def invalidate_job_pages(sender, **kwargs):
+    from eco_nexus.page_cache import bump_page_version
+    bump_page_version('jobs')
+
+
+@receiver([post_save, post_delete], sender=JobPosting)
+def invalidate_cached_job(sender, instance, **kwargs):
+    from .job_cache import invalidate_jobs
+    invalidate_jobs([instance.pk])
+
+
+@receiver(post_save, sender=Employer)
+def invalidate_cached_employer_jobs(sender, instance, created, raw=False, **kwargs):
+    # Cached jobs carry their employer
+    if created or raw:
+        return
+    from .job_cache import invalidate_jobs
+    invalidate_jobs(instance.jobs.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=JobPosting)
+def register_job_category(sender, instance, raw=False, **kwargs):
+    # Categories are free text; only a new one changes the registry
+    if raw:
+        return
+    from eco_nexus import reference
+    if instance.category and instance.category not in reference.job_categories.all():
+        reference.job_categories.invalidate()
+
+
+@receiver(post_delete, sender=JobPosting)
+def unregister_job_category(sender, instance, **kwargs):
+    from eco_nexus import reference
+    reference.job_categories.invalidate()
+
+
+@receiver(post_save, sender=Application)
+def rollup_application_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        from .analytics import record_application_created
+        record_application_created(instance)
+
+
+# Jobs being deleted in this thread: their rollups are deleted with them
+_deleting_jobs = threading.local()
+
+
+def jobs_being_deleted():
+    if not hasattr(_deleting_jobs, 'ids'):
+        _deleting_jobs.ids = set()
+    return _deleting_jobs.ids
+
+
+@receiver(pre_delete, sender=JobPosting)
+def mark_job_deleting(sender, instance, **kwargs):
+    # Every pre_delete of a cascade is sent before any row is deleted
+    jobs_being_deleted().add(instance.pk)
+
+
+@receiver(post_delete, sender=JobPosting)
+def unmark_job_deleting(sender, instance, **kwargs):
+    jobs_being_deleted().discard(instance.pk)
+
+
+@receiver(post_delete, sender=Application)
+def rollup_application_removed(sender, instance, **kwargs):
+    # Withdrawals and cascades from a student or user; a cascade from the
+    # job or its employer deletes the job's rollups anyway
+    if instance.job_id not in jobs_being_deleted():
+        from .analytics import record_application_removed
+        record_application_removed(instance)
@@ -0,0 +1,209 @@
+import re
+
+from django.conf import settings
+from django.db import connections, models
+from django.utils.module_loading import import_string
+
+SQLITE_INDEX_TABLE = 'careers_jobposting_fts'
+POSTGRES_INDEX_TABLE = 'careers_jobposting_search'
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    """
+    Split free text into search terms, dropping any query syntax
+    """
+    return TOKEN_RE.findall(text or '')[:10]
+
+
+def job_document(job):
+    """
+    The indexed fields of a job posting, in index column order
+    """
+    return (
+        job.title,
+        job.role,
+        job.location,
+        job.employer.company_name,
+        job.description,
+    )
+
+
+class IcontainsSearchBackend:
+    """
+    Fallback backend: unindexed, unranked substring matching
+    """
+
+    def __init__(self, using='default'):
+        self.using = using
+
+    def search(self, queryset, text):
+        if text:
+            queryset = queryset.filter(
+                models.Q(title__icontains=text) |
+                models.Q(role__icontains=text) |
+                models.Q(location__icontains=text) |
+                models.Q(employer__company_name__icontains=text) |
+                models.Q(description__icontains=text)
+            )
+        # A plain '0' would be read as a column position in ORDER BY
+        return queryset.annotate(search_rank=models.Value(0.0, output_field=models.FloatField()))
+
+    def index(self, jobs):
+        pass
+
+    def remove(self, job_ids):
+        pass
+
+    def clear(self):
+        pass
+
+
+class SQLiteSearchBackend(IcontainsSearchBackend):
+    """
+    SQLite FTS5 virtual table keyed by JobPosting id, ranked with bm25
+    """
+    # bm25 column weights: title, role, location, company_name, description
+    weights = (10.0, 5.0, 2.0, 5.0, 1.0)
+
+    def match_expression(self, terms):
+        return ' '.join('"%s"*' % term for term in terms)
+
+    def search(self, queryset, text):
+        terms = tokenize(text)
+        if not terms:
+            return super().search(queryset, text)
+        weights = ', '.join(str(w) for w in self.weights)
+        return queryset.extra(
+            select={'search_rank': f'bm25({SQLITE_INDEX_TABLE}, {weights})'},
+            tables=[SQLITE_INDEX_TABLE],
+            where=[
+                f'{SQLITE_INDEX_TABLE} MATCH %s',
+                f'{SQLITE_INDEX_TABLE}.rowid = careers_jobposting.id',
+            ],
+            params=[self.match_expression(terms)],
+        )
+
+    def index(self, jobs):
+        rows = [(job.id, *job_document(job)) for job in jobs]
+        if not rows:
+            return
+        with connections[self.using].cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {SQLITE_INDEX_TABLE} WHERE rowid = %s',
+                [(row[0],) for row in rows],
+            )
+            cursor.executemany(
+                f'INSERT INTO {SQLITE_INDEX_TABLE} '
+                f'(rowid, title, role, location, company_name, description) '
+                f'VALUES (%s, %s, %s, %s, %s, %s)',
+                rows,
+            )
+
+    def remove(self, job_ids):
+        with connections[self.using].cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {SQLITE_INDEX_TABLE} WHERE rowid = %s',
+                [(job_id,) for job_id in job_ids],
+            )
+
+    def clear(self):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SQLITE_INDEX_TABLE}')
+
+
+class PostgresSearchBackend(IcontainsSearchBackend):
+    """
+    Weighted tsvector column with a GIN index, ranked with ts_rank
+    """
+    config = 'simple'
+    document_sql = (
+        "setweight(to_tsvector('{config}', %s), 'A') || "
+        "setweight(to_tsvector('{config}', %s), 'B') || "
+        "setweight(to_tsvector('{config}', %s), 'C') || "
+        "setweight(to_tsvector('{config}', %s), 'B') || "
+        "setweight(to_tsvector('{config}', %s), 'D')"
+    )
+
+    def query_expression(self, terms):
+        return ' & '.join('%s:*' % term for term in terms)
+
+    def search(self, queryset, text):
+        terms = tokenize(text)
+        if not terms:
+            return super().search(queryset, text)
+        tsquery = f"to_tsquery('{self.config}', %s)"
+        query = self.query_expression(terms)
+        return queryset.extra(
+            select={'search_rank': f'-ts_rank({POSTGRES_INDEX_TABLE}.document, {tsquery})'},
+            select_params=[query],
+            tables=[POSTGRES_INDEX_TABLE],
+            where=[
+                f'{POSTGRES_INDEX_TABLE}.document @@ {tsquery}',
+                f'{POSTGRES_INDEX_TABLE}.job_id = careers_jobposting.id',
+            ],
+            params=[query],
+        )
+
+    def index(self, jobs):
+        rows = [(job.id, *job_document(job)) for job in jobs]
+        if not rows:
+            return
+        document = self.document_sql.format(config=self.config)
+        with connections[self.using].cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {POSTGRES_INDEX_TABLE} (job_id, document) '
+                f'VALUES (%s, {document}) '
+                f'ON CONFLICT (job_id) DO UPDATE SET document = EXCLUDED.document',
+                rows,
+            )
+
+    def remove(self, job_ids):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {POSTGRES_INDEX_TABLE} WHERE job_id = ANY(%s)',
+                [list(job_ids)],
+            )
+
+    def clear(self):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f'TRUNCATE {POSTGRES_INDEX_TABLE}')
+
+
+BACKENDS_BY_VENDOR = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_backend(using='default'):
+    """
+    Return the job search backend for a database.
+
+    ``CAREERS_SEARCH_BACKEND`` may name a backend class to use instead of
+    the one picked from the database vendor.
+    """
+    backend_path = getattr(settings, 'CAREERS_SEARCH_BACKEND', None)
+    if backend_path:
+        backend_class = import_string(backend_path)
+    else:
+        vendor = connections[using].vendor
+        backend_class = BACKENDS_BY_VENDOR.get(vendor, IcontainsSearchBackend)
+    return backend_class(using=using)
+
+
+def search_jobs(queryset, text):
+    """
+    Restrict a JobPosting queryset to matches for ``text``, annotated with
+    ``search_rank`` (ascending is most relevant first)
+    """
+    return get_backend(queryset.db).search(queryset, text)
+
+
+def index_jobs(jobs, using='default'):
+    get_backend(using).index(jobs)
+
+
+def remove_jobs(job_ids, using='default'):
+    get_backend(using).remove(job_ids)
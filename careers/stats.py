@@ -0,0 +1,51 @@
+from datetime import timedelta
+
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import Application, ApplicationDailyRollup
+
+STATUSES = [status for status, _ in Application.STATUS_CHOICES]
+
+
+def status_breakdown(applications):
+    """
+    Count applications per status with a single grouped query
+    """
+    breakdown = dict.fromkeys(STATUSES, 0)
+    rows = applications.order_by().values('status').annotate(n=Count('id'))
+    for row in rows:
+        breakdown[row['status']] = row['n']
+    return breakdown
+
+
+def employer_application_stats(employer, now=None):
+    """
+    Per-job and per-status application figures for an employer, read from
+    the daily rollups in one grouped query.
+
+    Returns ``(breakdown, per_job, week_total)`` where ``per_job`` maps a
+    job id to ``{'total': n, 'week': n}``.
+    """
+    week_start = timezone.localdate(now) - timedelta(days=6)
+    rows = (
+        ApplicationDailyRollup.objects
+        .filter(employer=employer)
+        .order_by()
+        .values('job_id', 'status')
+        .annotate(
+            current=Sum('net'),
+            week=Sum('created', filter=Q(day__gte=week_start)),
+        )
+    )
+
+    breakdown = dict.fromkeys(STATUSES, 0)
+    per_job = {}
+    week_total = 0
+    for row in rows:
+        breakdown[row['status']] = breakdown.get(row['status'], 0) + row['current']
+        job = per_job.setdefault(row['job_id'], {'total': 0, 'week': 0})
+        job['total'] += row['current']
+        job['week'] += row['week'] or 0
+        week_total += row['week'] or 0
+    return breakdown, per_job, week_total
@@ -1,3 +1,306 @@
-from django.test import TestCase
+import os
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.test import override_settings
+from django.urls import reverse
+
+from eco_nexus.detail import LazyRelationError, QueryPlan
+from eco_nexus.inserts import insert_or_ignore
+from eco_nexus.testing import TEST_CACHES, QueryBudgetTestCase
+
+from .analytics import change_status
+from .job_cache import jobs
+from .models import Application, ApplicationDailyRollup, Employer, JobPosting
+from .search import search_jobs
+
+
+# cache.clear() below must only ever see the test caches
+@override_settings(CACHES=TEST_CACHES)
+class CareersQueryBudgetTests(QueryBudgetTestCase):
+    """
+    Query and time budgets for every careers URL
+    """
+
+    def test_job_list(self):
+        self.assertBudget('careers:job_list', 4)
+        self.assertBudget('careers:job_list', 3, user=self.data.student_user)
+        self.assertBudget('careers:job_list', 3, user=self.data.employer_user)
+
+    def test_job_list_search(self):
+        self.assertBudget('careers:job_list', 4, data={'search': 'sustainability analyst'})
+
+    def test_job_detail(self):
+        kwargs = {'job_id': self.data.job.id}
+        self.assertBudget('careers:job_detail', 3, kwargs=kwargs)
+        self.assertBudget('careers:job_detail', 3, user=self.data.student_user, kwargs=kwargs)
+        self.assertBudget('careers:job_detail', 2, user=self.data.employer_user, kwargs=kwargs)
+
+    def test_apply(self):
+        kwargs = {'job_id': self.data.job.id}
+        self.assertBudget('careers:apply', 0, kwargs=kwargs, status=302)
+        self.assertBudget('careers:apply', 3, user=self.data.student_user, kwargs=kwargs)
+        self.assertBudget('careers:apply', 3, user=self.data.employer_user, kwargs=kwargs)
+
+    def test_apply_submit(self):
+        kwargs = {'job_id': self.data.job.id}
+        data = {'cover_letter': 'I would like to apply.'}
+        self.assertBudget('careers:apply', 3, user=self.data.student_user, kwargs=kwargs, method='post',
+                          data=data, status=302)
+
+    def test_apply_legacy(self):
+        kwargs = {'job_id': self.data.job.id}
+        self.assertBudget('careers:apply_legacy', 0, kwargs=kwargs, status=302)
+        self.assertBudget('careers:apply_legacy', 3, user=self.data.student_user, kwargs=kwargs, status=302)
+
+    def test_my_applications(self):
+        self.assertBudget('careers:my_applications', 0, status=302)
+        self.assertBudget('careers:my_applications', 3, user=self.data.student_user)
+        self.assertBudget('careers:my_applications', 1, user=self.data.employer_user)
+
+    def test_withdraw_application(self):
+        kwargs = {'application_id': self.data.application.id}
+        self.assertBudget('careers:withdraw_application', 0, kwargs=kwargs, method='post', status=302)
+        self.assertBudget('careers:withdraw_application', 1, user=self.data.employer_user, kwargs=kwargs,
+                          method='post', status=302)
+        self.assertBudget('careers:withdraw_application', 5, user=self.data.student_user, kwargs=kwargs,
+                          method='post', status=302)
+
+    def test_employer_dashboard(self):
+        self.assertBudget('careers:employer_dashboard', 0, status=302)
+        self.assertBudget('careers:employer_dashboard', 1, user=self.data.student_user, status=302)
+        response = self.assertBudget('careers:employer_dashboard', 4, user=self.data.employer_user)
+        for action in ('View Applicants', 'Share', 'Post New Job'):
+            self.assertContains(response, action)
+
+    def test_employer_analytics(self):
+        self.assertBudget('careers:employer_analytics', 0, status=302)
+        self.assertBudget('careers:employer_analytics', 1, user=self.data.student_user, status=302)
+        self.assertBudget('careers:employer_analytics', 3, user=self.data.employer_user)
+
+    def test_post_job(self):
+        self.assertBudget('careers:post_job', 0, status=302)
+        self.assertBudget('careers:post_job', 1, user=self.data.student_user, status=302)
+        self.assertBudget('careers:post_job', 1, user=self.data.employer_user)
+
+    def test_post_job_submit(self):
+        data = {
+            'title': 'Energy Auditor', 'role': 'Auditor', 'category': 'energy',
+            'location': 'Remote', 'salary': '50000', 'description': 'Audit buildings.',
+        }
+        self.assertBudget('careers:post_job', 8, user=self.data.employer_user, method='post', data=data,
+                          status=302)
+
+    def test_update_application_status(self):
+        kwargs = {'application_id': self.data.employer_application.id}
+        data = {'status': 'accepted'}
+        self.assertBudget('careers:update_application_status', 0, kwargs=kwargs, method='post', data=data,
+                          status=302)
+        self.assertBudget('careers:update_application_status', 1, user=self.data.student_user, kwargs=kwargs,
+                          method='post', data=data, status=302)
+        self.assertBudget('careers:update_application_status', 8, user=self.data.employer_user, kwargs=kwargs,
+                          method='post', data=data, status=302)
+        # Unchanged now: only the locked re-read
+        self.assertBudget('careers:update_application_status', 5, user=self.data.employer_user, kwargs=kwargs,
+                          method='post', data=data, status=302)
+
+    def test_job_pages_cached_for_anonymous(self):
+        kwargs = {'job_id': self.data.job.id}
+        self.assertEqual(self.assertBudget('careers:job_detail', 3, kwargs=kwargs)['X-Page-Cache'], 'miss')
+        self.assertEqual(self.assertBudget('careers:job_detail', 0, kwargs=kwargs)['X-Page-Cache'], 'hit')
+        # Query strings are part of the key
+        self.assertBudget('careers:job_list', 4, data={'category': 'energy'})
+        self.assertEqual(self.assertBudget('careers:job_list', 0, data={'category': 'energy'})['X-Page-Cache'], 'hit')
+        self.assertEqual(self.assertBudget('careers:job_list', 4, data={'category': 'solar'})['X-Page-Cache'], 'miss')
+
+        # Logged-in users get a fresh page
+        response = self.assertBudget('careers:job_detail', 3, user=self.data.student_user, kwargs=kwargs)
+        self.assertFalse(response.has_header('X-Page-Cache'))
+
+    def test_job_page_cache_invalidated_on_save(self):
+        kwargs = {'job_id': self.data.job.id}
+        self.assertBudget('careers:job_detail', 3, kwargs=kwargs)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.data.job.title = 'Senior Energy Analyst'
+            self.data.job.save()
+
+        response = self.assertBudget('careers:job_detail', 3, kwargs=kwargs)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Senior Energy Analyst')
+
+    def test_stale_job_served_while_rebuilding(self):
+        kwargs = {'job_id': self.data.job.id}
+        self.assertBudget('careers:job_detail', 5, user=self.data.student_user, kwargs=kwargs)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.data.job.title = 'Senior Energy Analyst'
+            self.data.job.save()
+
+        # Another worker holds the rebuild lock: serve the old posting without querying it
+        cache.add(jobs.lock_key(self.data.job.id), 1)
+        response = self.assertBudget('careers:job_detail', 4, user=self.data.student_user, kwargs=kwargs)
+        self.assertNotContains(response, 'Senior Energy Analyst')
+
+        cache.delete(jobs.lock_key(self.data.job.id))
+        response = self.assertBudget('careers:job_detail', 5, user=self.data.student_user, kwargs=kwargs)
+        self.assertContains(response, 'Senior Energy Analyst')
+
+    def test_job_detail_fails_outside_query_plan(self):
+        kwargs = {'job_id': self.data.job.id}
+        # Without the employer in the plan, the template loads it lazily
+        with mock.patch.object(jobs, 'build', lambda job_id: QueryPlan().apply(JobPosting.objects).get(pk=job_id)):
+            with self.assertRaisesMessage(LazyRelationError, 'JobPosting.employer'):
+                self.client_for().get(reverse('careers:job_detail', kwargs=kwargs))
+
+        cache.clear()
+        self.assertBudget('careers:job_detail', 3, kwargs=kwargs)
+
+    def test_apply_inserts_once(self):
+        job = JobPosting.objects.create(employer=self.data.employer, title='Grid Planner', role='Planner',
+                                        location='Remote', salary=50000, category='energy', description='Green jobs')
+        client = self.client_for(self.data.student_user)
+        url = reverse('careers:apply', kwargs={'job_id': job.id})
+        for expected in ('Application submitted', 'already applied'):
+            response = client.post(url, {'cover_letter': 'I would like to apply.'})
+            self.assertIn(expected, str(list(get_messages(response.wsgi_request))))
+        self.assertEqual(Application.objects.filter(job=job, student=self.data.student).count(), 1)
+        # Rolled up once, by the insert's post_save
+        rollup = ApplicationDailyRollup.objects.get(job=job, status='pending')
+        self.assertEqual((rollup.created, rollup.net), (1, 1))
+
+        response = client.get(reverse('careers:apply_legacy', kwargs={'job_id': job.id}))
+        self.assertIn('already applied', str(list(get_messages(response.wsgi_request))))
+
+    def test_insert_or_ignore(self):
+        job = JobPosting.objects.create(employer=self.data.employer, title='Grid Planner', role='Planner',
+                                        location='Remote', salary=50000, category='energy', description='Green jobs')
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            first = Application(job=job, student=self.data.student,
+                                resume=SimpleUploadedFile('cv.pdf', b'%PDF first'))
+            self.assertTrue(insert_or_ignore(first))
+            # The primary key comes back from the INSERT on every backend
+            self.assertEqual(Application.objects.get(job=job, student=self.data.student).pk, first.pk)
+            self.assertFalse(first._state.adding)
+
+            duplicate = Application(job=job, student=self.data.student,
+                                    resume=SimpleUploadedFile('cv.pdf', b'%PDF second'))
+            self.assertFalse(insert_or_ignore(duplicate))
+            self.assertIsNone(duplicate.pk)
+            # The ignored row's upload does not linger in storage
+            self.assertEqual(os.listdir(os.path.join(media_root, 'resumes')), [os.path.basename(first.resume.name)])
+        rollup = ApplicationDailyRollup.objects.get(job=job, status='pending')
+        self.assertEqual((rollup.created, rollup.net), (1, 1))
+
+    def search(self, text):
+        return list(search_jobs(JobPosting.objects.all(), text).order_by('search_rank', '-created_at')
+                    .values_list('title', flat=True))
+
+    def create_search_jobs(self):
+        # The description match is newer, so only ranking puts the title match first
+        for title, description in (('Zephyrwind Technician', 'Maintain turbines.'),
+                                   ('Field Engineer', 'Work on zephyrwind farms.')):
+            JobPosting.objects.create(employer=self.data.employer, title=title, role='Engineer', location='Remote',
+                                      salary=50000, category='energy', description=description)
+
+    def test_search_ranks_title_matches_first(self):
+        self.create_search_jobs()
+        self.assertEqual(self.search('zephyrwind'), ['Zephyrwind Technician', 'Field Engineer'])
+        self.assertEqual(self.search('zephyrwind turbines'), ['Zephyrwind Technician'])
+
+        response = self.client_for().get(reverse('careers:job_list'), {'search': 'zephyrwind'})
+        content = response.content.decode()
+        self.assertLess(content.index('Zephyrwind Technician'), content.index('Field Engineer'))
+
+    def test_search_matches_prefixes(self):
+        self.create_search_jobs()
+        self.assertEqual(self.search('zephyr'), ['Zephyrwind Technician', 'Field Engineer'])
+        self.assertEqual(self.search('zephyr turb'), ['Zephyrwind Technician'])
+        # Query syntax is dropped, not passed to the index
+        self.assertEqual(self.search('"zephyr* ('), ['Zephyrwind Technician', 'Field Engineer'])
+
+    def test_search_follows_edits(self):
+        self.create_search_jobs()
+        job = JobPosting.objects.get(title='Zephyrwind Technician')
+        job.title = 'Turbine Technician'
+        job.save()
+        self.assertEqual(self.search('zephyrwind'), ['Field Engineer'])
+        JobPosting.objects.filter(title='Field Engineer').delete()
+        self.assertEqual(self.search('zephyrwind'), [])
+
+    def test_employer_reindexed_only_on_rename(self):
+        employer = Employer.objects.get(pk=self.data.employer.pk)
+        with mock.patch('careers.search.index_jobs') as index_jobs:
+            employer.verified = not employer.verified
+            employer.website = 'https://example.com/green'
+            employer.save()
+        index_jobs.assert_not_called()
+
+        employer.company_name = 'Quillfeather Energy'
+        employer.save()
+        self.assertIn('Energy Analyst 0', self.search('quillfeather'))
+
+    @override_settings(CAREERS_SEARCH_BACKEND='careers.search.IcontainsSearchBackend')
+    def test_search_fallback_without_index(self):
+        self.create_search_jobs()
+        # Unranked substring matches, newest first
+        self.assertEqual(self.search('ephyrwin'), ['Field Engineer', 'Zephyrwind Technician'])
+        self.assertEqual(self.search('maintain turbines'), ['Zephyrwind Technician'])
+        self.assertBudget('careers:job_list', 4, data={'search': 'zephyrwind'})
+
+    def assertRollupsMatch(self, job):
+        rolled_up = dict(
+            ApplicationDailyRollup.objects.filter(job=job).values('status').annotate(n=Sum('net'))
+            .exclude(n=0).values_list('status', 'n')
+        )
+        actual = dict(Application.objects.filter(job=job).values('status').annotate(n=Count('id'))
+                      .values_list('status', 'n'))
+        self.assertEqual(rolled_up, actual)
+
+    def test_change_status_from_stale_copies(self):
+        job = JobPosting.objects.create(employer=self.data.employer, title='Grid Planner', role='Planner',
+                                        location='Remote', salary=50000, category='energy', description='Green jobs')
+        application = Application.objects.create(job=job, student=self.data.student)
+        # Two requests that both loaded the application while it was pending
+        first, second = Application.objects.get(pk=application.pk), Application.objects.get(pk=application.pk)
+        self.assertTrue(change_status(first, 'reviewing'))
+        self.assertTrue(change_status(second, 'rejected'))
+        self.assertFalse(change_status(first, 'rejected'))
+        self.assertEqual(first.status, 'rejected')
+        self.assertRollupsMatch(job)
+        pending = ApplicationDailyRollup.objects.filter(job=job, status='pending').aggregate(n=Sum('net'))['n']
+        self.assertEqual(pending, 0)
+
+    def test_admin_status_change_rolls_up(self):
+        job = JobPosting.objects.create(employer=self.data.employer, title='Grid Planner', role='Planner',
+                                        location='Remote', salary=50000, category='energy', description='Green jobs')
+        application = Application.objects.create(job=job, student=self.data.student)
+        admin = User.objects.create_superuser('budget-admin', 'admin@example.com', 'budget-pass')
+        url = reverse('admin:careers_application_change', args=[application.pk])
+        response = self.client_for(admin).post(url, {'status': 'interviewed', 'cover_letter': 'Edited.'})
+        self.assertEqual(response.status_code, 302)
+
+        application.refresh_from_db()
+        self.assertEqual((application.status, application.cover_letter), ('interviewed', 'Edited.'))
+        self.assertIsNotNone(application.first_reviewed_at)
+        self.assertRollupsMatch(job)
+
+    def test_cascaded_deletes_roll_up(self):
+        job = JobPosting.objects.create(employer=self.data.employer, title='Grid Planner', role='Planner',
+                                        location='Remote', salary=50000, category='energy', description='Green jobs')
+        leaving = [User.objects.create_user(f'budget-leaving{i}', password='budget-pass') for i in range(3)]
+        for user in leaving:
+            Application.objects.create(job=job, student=user.student_profile)
+        change_status(Application.objects.get(job=job, student=leaving[1].student_profile), 'reviewing')
+
+        leaving[0].student_profile.delete()
+        leaving[1].delete()
+        self.assertEqual(Application.objects.filter(job=job).count(), 1)
+        self.assertRollupsMatch(job)
+
+        # The job's own delete takes its rollups with it
+        job.delete()
+        self.assertFalse(ApplicationDailyRollup.objects.filter(job_id=job.pk).exists())
@@ -15,6 +15,7 @@ urlpatterns = [
     
     # Employer dashboard and management
     path('employer/dashboard/', views.EmployerDashboardView.as_view(), name='employer_dashboard'),
+    path('employer/analytics/', views.EmployerAnalyticsView.as_view(), name='employer_analytics'),
     path('employer/post-job/', views.PostJobView.as_view(), name='post_job'),
     path('employer/applications/<int:application_id>/status/', views.UpdateApplicationStatusView.as_view(), name='update_application_status'),
     
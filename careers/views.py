@@ -1,17 +1,26 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.views.generic import ListView, DetailView, CreateView, TemplateView, FormView
+from django.http import Http404
+from django.views.generic import ListView, CreateView, TemplateView, FormView
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from django.contrib import messages
 from django.urls import reverse_lazy
-from django.db import models
 
 from .models import JobPosting, Application, EmployerProfile
 from .forms import ApplicationForm, JobPostingForm, JobFilterForm
-from accounts.models import StudentProfile
-
-
-class JobListView(ListView):
+from .job_cache import JOB_PLAN, get_job
+from .search import search_jobs
+from .stats import employer_application_stats, status_breakdown
+from .analytics import change_status, employer_trend
+from eco_nexus.detail import PlannedDetailView
+from eco_nexus.identity import EmployerRequiredMixin, StudentRequiredMixin
+from eco_nexus.inserts import insert_or_ignore
+from eco_nexus.page_cache import cache_anonymous_page
+from eco_nexus.pagination import CursorPaginationMixin, estimate_count
+
+
+@method_decorator(cache_anonymous_page('jobs'), name='dispatch')
+class JobListView(CursorPaginationMixin, ListView):
     """
     Display all available job postings with pagination and filtering
     """
@@ -19,10 +28,17 @@ class JobListView(ListView):
     template_name = 'careers/job_list.html'
     context_object_name = 'jobs'
     paginate_by = 12
+    cursor_ordering = ('-created_at', 'id')
+
+    def get_cursor_ordering(self):
+        # Ranked search results keep offset pagination
+        if self.request.GET.get('search'):
+            return None
+        return super().get_cursor_ordering()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['total_jobs'] = JobPosting.objects.count()
+        context['total_jobs'] = estimate_count(JobPosting)
         context['form'] = JobFilterForm(self.request.GET)
         
         return context
@@ -43,21 +59,16 @@ class JobListView(ListView):
         if max_salary:
             queryset = queryset.filter(salary__lte=max_salary)
         
-        # Search by title, role, location, or description
+        # Full-text search over title, role, location, company and description
         search = self.request.GET.get('search')
         if search:
-            queryset = queryset.filter(
-                models.Q(title__icontains=search) |
-                models.Q(role__icontains=search) |
-                models.Q(location__icontains=search) |
-                models.Q(employer__company_name__icontains=search) |
-                models.Q(description__icontains=search)
-            )
+            return search_jobs(queryset, search).order_by('search_rank', '-created_at')
         
         return queryset.order_by('-created_at')
 
 
-class JobDetailView(DetailView):
+@method_decorator(cache_anonymous_page('jobs'), name='dispatch')
+class JobDetailView(PlannedDetailView):
     """
     Display detailed information about a specific job posting
     """
@@ -65,27 +76,32 @@ class JobDetailView(DetailView):
     template_name = 'careers/job_detail.html'
     context_object_name = 'job'
     pk_url_kwarg = 'job_id'
+    plan = JOB_PLAN
+
+    def load_object(self, queryset=None):
+        # Served from the stampede-protected object cache
+        job = get_job(self.kwargs[self.pk_url_kwarg])
+        if job is None:
+            raise Http404("Job not found.")
+        return job
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        job = self.get_object()
+        job = self.object
         
         # Get applications count
         context['applications_count'] = job.applications.count()
         
         # Check if current user already applied
         context['user_applied'] = False
-        if self.request.user.is_authenticated:
-            try:
-                student_profile = self.request.user.student_profile
-                context['user_applied'] = job.applications.filter(
-                    student=student_profile
-                ).exists()
-            except StudentProfile.DoesNotExist:
-                pass
+        student_profile = self.request.identity.student
+        if student_profile is not None:
+            context['user_applied'] = job.applications.filter(
+                student=student_profile
+            ).exists()
         
         # Get similar jobs from same employer
-        context['similar_jobs'] = job.employer.jobs.exclude(id=job.id)[:3]
+        context['similar_jobs'] = JobPosting.objects.filter(employer_id=job.employer_id).exclude(id=job.id)[:3]
         
         return context
 
@@ -107,28 +123,26 @@ class JobApplicationCreateView(CreateView):
         return context
 
     def form_valid(self, form):
-        job_id = self.kwargs.get('job_id')
-        job = get_object_or_404(JobPosting, id=job_id)
+        job = get_job(self.kwargs.get('job_id'))
+        if job is None:
+            raise Http404("Job not found.")
         
-        try:
-            student_profile = self.request.user.student_profile
-        except StudentProfile.DoesNotExist:
+        student_profile = self.request.identity.student
+        if student_profile is None:
             messages.error(self.request, "Student profile not found.")
             return self.form_invalid(form)
         
-        # Check if already applied
-        if Application.objects.filter(job=job, student=student_profile).exists():
-            messages.warning(self.request, "You have already applied for this job.")
-            return redirect('careers:job_detail', job_id=job.id)
-        
-        # Create application
+        # One insert; a second application for the job is ignored
         application = form.save(commit=False)
         application.job = job
         application.student = student_profile
-        application.save()
+        if not insert_or_ignore(application):
+            messages.warning(self.request, "You have already applied for this job.")
+            return redirect('careers:job_detail', job_id=job.id)
         
+        self.object = application
         messages.success(self.request, f"Application submitted for {job.title}!")
-        return super().form_valid(form)
+        return redirect(self.get_success_url())
 
 
 @method_decorator(login_required, name='dispatch')
@@ -141,9 +155,8 @@ class MyApplicationsView(TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        try:
-            student_profile = self.request.user.student_profile
-        except StudentProfile.DoesNotExist:
+        student_profile = self.request.identity.student
+        if student_profile is None:
             return context
         
         # Get all applications by this student
@@ -152,41 +165,33 @@ class MyApplicationsView(TemplateView):
         ).select_related('job', 'job__employer').order_by('-applied_at')
         
         context['applications'] = applications
-        context['applications_count'] = applications.count()
         
-        # Status breakdown
-        context['status_breakdown'] = {
-            'pending': applications.filter(status='pending').count(),
-            'reviewing': applications.filter(status='reviewing').count(),
-            'interviewed': applications.filter(status='interviewed').count(),
-            'rejected': applications.filter(status='rejected').count(),
-            'accepted': applications.filter(status='accepted').count(),
-        }
+        # Status breakdown in one grouped query
+        breakdown = status_breakdown(applications)
+        context['status_breakdown'] = breakdown
+        context['applications_count'] = context['total_applications'] = sum(breakdown.values())
+        context['pending_count'] = breakdown['pending']
+        context['accepted_count'] = breakdown['accepted']
+        context['rejected_count'] = breakdown['rejected']
         
         return context
 
 
-@method_decorator(login_required, name='dispatch')
-class WithdrawApplicationView(TemplateView):
+class WithdrawApplicationView(StudentRequiredMixin, TemplateView):
     """
     Allow student to withdraw an application
     """
     template_name = 'careers/withdraw_application.html'
+    role_redirect_url = 'careers:my_applications'
 
     def post(self, request, *args, **kwargs):
         application_id = kwargs.get('application_id')
         
-        try:
-            student_profile = request.user.student_profile
-        except StudentProfile.DoesNotExist:
-            messages.error(request, "Student profile not found.")
-            return redirect('careers:my_applications')
-        
         # Get application and verify ownership
         application = get_object_or_404(
             Application,
             id=application_id,
-            student=student_profile
+            student=request.identity.student
         )
         
         # Don't allow withdrawal if already rejected or accepted
@@ -201,51 +206,77 @@ class WithdrawApplicationView(TemplateView):
         return redirect('careers:my_applications')
 
 
-class EmployerDashboardView(TemplateView):
+class EmployerDashboardView(EmployerRequiredMixin, TemplateView):
     """
     Dashboard for employers to post jobs and manage applications
     """
     template_name = 'careers/employer_dashboard.html'
 
-    @method_decorator(login_required)
-    def dispatch(self, request, *args, **kwargs):
-        # Check if user is employer
-        if not hasattr(request.user, 'employer_profile'):
-            messages.error(request, "Access denied. Employer profile required.")
-            return redirect('home')
-        return super().dispatch(request, *args, **kwargs)
-
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        employer_profile = self.request.user.employer_profile
+        employer_profile = self.request.identity.employer
+        
+        # Per-job, per-status and this-week counts in a single grouped query
+        breakdown, per_job, week_total = employer_application_stats(employer_profile)
         
         # Get employer's job postings
-        jobs = JobPosting.objects.filter(employer=employer_profile)
+        jobs = list(JobPosting.objects.filter(employer=employer_profile).order_by('-created_at'))
+        for job in jobs:
+            counts = per_job.get(job.id, {})
+            job.applications_count = counts.get('total', 0)
+            job.week_applications_count = counts.get('week', 0)
         context['jobs'] = jobs
-        context['total_jobs_count'] = jobs.count()
+        context['total_jobs_count'] = context['active_jobs_count'] = len(jobs)
         
         # Get all applications for employer's jobs
         applications = Application.objects.filter(
             job__employer=employer_profile
-        ).select_related('student', 'job').order_by('-applied_at')
+        ).select_related('student__user', 'job').order_by('-applied_at')
         
         context['applications'] = applications
-        context['applications_count'] = applications.count()
+        context['recent_applicants'] = applications[:5]
+        context['applications_count'] = context['total_applicants'] = sum(breakdown.values())
+        context['week_applications'] = week_total
         
         # Status breakdown
-        context['status_breakdown'] = {
-            'pending': applications.filter(status='pending').count(),
-            'reviewing': applications.filter(status='reviewing').count(),
-            'interviewed': applications.filter(status='interviewed').count(),
-            'rejected': applications.filter(status='rejected').count(),
-            'accepted': applications.filter(status='accepted').count(),
-        }
+        context['status_breakdown'] = breakdown
+        context['pending_applications'] = breakdown['pending']
+        context['reviewed_applications'] = breakdown['reviewing']
+        context['interviewed_applications'] = breakdown['interviewed']
+        context['hired_applications'] = breakdown['accepted']
         
         return context
 
 
-@method_decorator(login_required, name='dispatch')
-class PostJobView(CreateView):
+class EmployerAnalyticsView(EmployerRequiredMixin, TemplateView):
+    """
+    Application trends for an employer's postings, read from daily rollups
+    """
+    template_name = 'careers/employer_analytics.html'
+    days = 30
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        employer_profile = self.request.identity.employer
+        
+        days, per_job, per_status, first_review = employer_trend(employer_profile, days=self.days)
+        jobs = JobPosting.objects.filter(employer=employer_profile).only('id', 'title').order_by('-created_at')
+        
+        context['days'] = days
+        context['job_trends'] = [
+            {'job': job, 'daily': per_job.get(job.id, [0] * len(days)), 'total': sum(per_job.get(job.id, []))}
+            for job in jobs
+        ]
+        context['status_trends'] = [
+            {'status': label, 'daily': per_status.get(status, [0] * len(days)), 'total': sum(per_status.get(status, []))}
+            for status, label in Application.STATUS_CHOICES
+        ]
+        context['first_review'] = first_review
+        
+        return context
+
+
+class PostJobView(EmployerRequiredMixin, CreateView):
     """
     Allow employers to post new job openings
     """
@@ -254,48 +285,34 @@ class PostJobView(CreateView):
     template_name = 'careers/post_job.html'
     success_url = reverse_lazy('careers:employer_dashboard')
 
-    def dispatch(self, request, *args, **kwargs):
-        if not hasattr(request.user, 'employer_profile'):
-            messages.error(request, "Access denied. Employer profile required.")
-            return redirect('home')
-        return super().dispatch(request, *args, **kwargs)
-
     def form_valid(self, form):
         job = form.save(commit=False)
-        job.employer = self.request.user.employer_profile
+        job.employer = self.request.identity.employer
         job.save()
         messages.success(self.request, f"Job '{job.title}' posted successfully!")
         return super().form_valid(form)
 
 
-@method_decorator(login_required, name='dispatch')
-class UpdateApplicationStatusView(TemplateView):
+class UpdateApplicationStatusView(EmployerRequiredMixin, TemplateView):
     """
     Allow employers to update application status
     """
     template_name = 'careers/update_application_status.html'
 
-    def dispatch(self, request, *args, **kwargs):
-        if not hasattr(request.user, 'employer_profile'):
-            messages.error(request, "Access denied. Employer profile required.")
-            return redirect('home')
-        return super().dispatch(request, *args, **kwargs)
-
     def post(self, request, *args, **kwargs):
         application_id = kwargs.get('application_id')
         new_status = request.POST.get('status')
         
-        employer_profile = request.user.employer_profile
+        employer_profile = request.identity.employer
         
         # Verify the employer owns this job posting
-        application = get_object_or_404(Application, id=application_id)
-        if application.job.employer != employer_profile:
+        application = get_object_or_404(Application.objects.select_related('job'), id=application_id)
+        if application.job.employer_id != employer_profile.id:
             messages.error(request, "Unauthorized access.")
             return redirect('careers:employer_dashboard')
         
-        if new_status in ['pending', 'reviewing', 'interviewed', 'rejected', 'accepted']:
-            application.status = new_status
-            application.save()
+        if new_status in dict(Application.STATUS_CHOICES):
+            change_status(application, new_status)
             messages.success(request, f"Application status updated to {new_status}.")
         
         return redirect('careers:employer_dashboard')
@@ -311,19 +328,18 @@ def job_list(request):
 @login_required
 def apply(request, job_id):
     """Legacy wrapper for JobApplicationCreateView"""
-    job = get_object_or_404(JobPosting, id=job_id)
-    try:
-        student_profile = request.user.student_profile
-    except StudentProfile.DoesNotExist:
+    job = get_job(job_id)
+    if job is None:
+        raise Http404("Job not found.")
+    student_profile = request.identity.student
+    if student_profile is None:
         messages.error(request, "Student profile not found.")
         return redirect('careers:job_list')
     
-    # Check if already applied
-    if Application.objects.filter(job=job, student=student_profile).exists():
+    # One insert; a second application for the job is ignored
+    if not insert_or_ignore(Application(job=job, student=student_profile)):
         messages.warning(request, "You have already applied for this job.")
         return redirect('careers:job_list')
     
-    # Create application
-    Application.objects.create(job=job, student=student_profile)
     messages.success(request, f"Application submitted for {job.title}!")
     return redirect('careers:job_list')
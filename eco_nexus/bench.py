@@ -0,0 +1,504 @@
+"""
+Benchmark harness behind ``manage.py bench``.
+
+Virtual users run scripted journeys (browse jobs, view a course, take a
+quiz, apply for a job, open the employer dashboard, sign in, register for
+a popular course) against the WSGI
+application in-process, or over HTTP against a running server. Every
+request is recorded per endpoint with its latency and SQL query count, and
+``summarize`` turns the recording into throughput and p50/p95/p99 figures
+that can be saved as JSON and compared with an earlier run.
+"""
+import http.client
+import math
+import random
+import re
+import threading
+import time
+from contextlib import ExitStack
+from http.cookies import SimpleCookie
+from importlib import import_module
+from io import BytesIO
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.auth import login
+from django.db import connections
+from django.http import HttpRequest
+from django.urls import resolve, reverse
+from django.utils.crypto import get_random_string
+
+from .middleware import QueryTimer
+from .seeding import DEFAULT_PASSWORD
+
+SEARCH_TERMS = ['analyst', 'solar', 'engineer', 'remote', 'sustainability', 'green']
+SERVER_TIMING_QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+# The register journey piles onto this many courses, as in a registration rush
+RUSH_COURSES = 3
+
+
+class WSGITransport:
+    """
+    Call the WSGI application directly, counting queries in this thread
+    """
+    name = 'wsgi'
+
+    def __init__(self, application=None, host='localhost'):
+        if application is None:
+            from eco_nexus.wsgi import application
+        self.application = application
+        self.host = host
+
+    def __str__(self):
+        return 'in-process WSGI'
+
+    def request(self, method, path, query, headers, body):
+        environ = {
+            'REQUEST_METHOD': method,
+            'SCRIPT_NAME': '',
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SERVER_NAME': self.host,
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REMOTE_ADDR': '127.0.0.1',
+            'HTTP_HOST': self.host,
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': BytesIO(body),
+            'wsgi.errors': BytesIO(),
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in headers.items():
+            key = name.upper().replace('-', '_')
+            environ[key if key == 'CONTENT_TYPE' else f'HTTP_{key}'] = value
+
+        started = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = response_headers
+
+        timer = QueryTimer()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            result = self.application(environ, start_response)
+            try:
+                content = b''.join(result)
+            finally:
+                # Fires request_finished, as a real server would
+                close = getattr(result, 'close', None)
+                if close is not None:
+                    close()
+        return started['status'], started['headers'], content, timer.count
+
+
+class HTTPTransport:
+    """
+    Send requests over HTTP with one keep-alive connection per thread.
+
+    Query counts come from the ``Server-Timing`` header, so they are only
+    reported when the server runs with ``PERF_INSTRUMENTATION`` and
+    ``PERF_SERVER_TIMING`` on.
+    """
+    name = 'http'
+
+    def __init__(self, base_url, timeout=30):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f'Expected an http(s) URL, not {base_url!r}')
+        self.base_url = base_url
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.host = parts.hostname
+        self.port = parts.port
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def __str__(self):
+        return self.base_url
+
+    def connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            cls = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+            connection = self.local.connection = cls(self.host, self.port, timeout=self.timeout)
+        return connection
+
+    def request(self, method, path, query, headers, body):
+        connection = self.connection()
+        target = self.prefix + path + (f'?{query}' if query else '')
+        try:
+            connection.request(method, target, body=body, headers={'Host': self.netloc, **headers})
+            response = connection.getresponse()
+            content = response.read()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            self.local.connection = None
+            raise
+        match = SERVER_TIMING_QUERIES_RE.search(response.getheader('Server-Timing') or '')
+        queries = int(match.group(1)) if match else None
+        return response.status, response.getheaders(), content, queries
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies = []
+        self.queries = []
+        self.statuses = {}
+        self.errors = 0
+
+    def add(self, elapsed, status, queries):
+        self.latencies.append(elapsed)
+        if queries is not None:
+            self.queries.append(queries)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status == 0 or status >= 500:
+            self.errors += 1
+
+
+class Recorder:
+    """
+    Thread-safe per-endpoint collection of latencies, statuses and queries
+    """
+
+    def __init__(self):
+        self.endpoints = {}
+        self.lock = threading.Lock()
+
+    def add(self, label, elapsed, status, queries):
+        with self.lock:
+            self.endpoints.setdefault(label, EndpointStats()).add(elapsed, status, queries)
+
+
+class BenchClient:
+    """
+    One virtual user's cookie jar, issuing requests by URL name.
+
+    POSTs carry the CSRF cookie's secret in ``X-CSRFToken``, so forms can
+    be submitted without scraping the rendered page.
+    """
+
+    def __init__(self, transport, recorder, cookies=None):
+        self.transport = transport
+        self.recorder = recorder
+        self.cookies = {settings.CSRF_COOKIE_NAME: get_random_string(32), **(cookies or {})}
+
+    def get(self, url_name, kwargs=None, query=None, label=None):
+        return self.request('GET', reverse(url_name, kwargs=kwargs), label or f'GET {url_name}', query=query)
+
+    def post(self, url_name, kwargs=None, data=None, label=None):
+        return self.request('POST', reverse(url_name, kwargs=kwargs), label or f'POST {url_name}', data=data)
+
+    def follow(self, response):
+        """
+        GET the redirect target of ``response``, if it is a redirect
+        """
+        if response is None or response.location is None:
+            return None
+        path = urlsplit(response.location).path
+        return self.request('GET', path, f'GET {resolve(path).view_name}')
+
+    def request(self, method, path, label, query=None, data=None):
+        headers = {'Cookie': '; '.join(f'{name}={value}' for name, value in self.cookies.items())}
+        body = b''
+        if method == 'POST':
+            headers['X-CSRFToken'] = self.cookies[settings.CSRF_COOKIE_NAME]
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            body = urlencode(data or {}, doseq=True).encode()
+
+        start = time.perf_counter()
+        try:
+            status, response_headers, content, queries = self.transport.request(
+                method, path, urlencode(query or {}, doseq=True), headers, body,
+            )
+        except (OSError, http.client.HTTPException):
+            if self.recorder is not None:
+                self.recorder.add(label, time.perf_counter() - start, 0, None)
+            return None
+        elapsed = time.perf_counter() - start
+
+        if self.recorder is not None:
+            self.recorder.add(label, elapsed, status, queries)
+        response = BenchResponse(status, response_headers, content)
+        self.store_cookies(response.set_cookies)
+        return response
+
+    def store_cookies(self, set_cookies):
+        for header in set_cookies:
+            for name, morsel in SimpleCookie(header).items():
+                if morsel['max-age'] == '0' or not morsel.value:
+                    self.cookies.pop(name, None)
+                elif name != settings.CSRF_COOKIE_NAME:
+                    # Keep our own CSRF secret; rotating it is the server's business
+                    self.cookies[name] = morsel.value
+
+
+class BenchResponse:
+    def __init__(self, status, headers, content):
+        self.status = status
+        self.content = content
+        self.location = None
+        self.set_cookies = []
+        for name, value in headers:
+            name = name.lower()
+            if name == 'location':
+                self.location = value
+            elif name == 'set-cookie':
+                self.set_cookies.append(value)
+
+
+def session_cookies(user):
+    """
+    Log ``user`` in without a password, the way ``Client.force_login`` does
+    """
+    engine = import_module(settings.SESSION_ENGINE)
+    request = HttpRequest()
+    request.session = engine.SessionStore()
+    login(request, user, backend=settings.AUTHENTICATION_BACKENDS[0])
+    request.session.save()
+    return {settings.SESSION_COOKIE_NAME: request.session.session_key}
+
+
+class Targets:
+    """
+    Object ids the journeys pick from, sampled once before the run, and
+    the seeded users' password
+    """
+
+    def __init__(self, jobs, categories, courses, env_courses, modules, quizzes, students, employers,
+                 password=DEFAULT_PASSWORD):
+        self.jobs = jobs
+        self.categories = categories
+        self.courses = courses
+        self.env_courses = env_courses
+        self.modules = modules
+        self.quizzes = quizzes
+        self.students = students
+        self.employers = employers
+        self.password = password
+
+    @classmethod
+    def load(cls, rng, sample=1000, password=DEFAULT_PASSWORD):
+        from django.contrib.auth.models import User
+
+        from careers.models import JobPosting
+        from lms.models import Choice, CourseModule, EnvCourse, Quiz
+        from ums.models import Course
+
+        def pick(queryset):
+            ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+            return rng.sample(ids, min(sample, len(ids)))
+
+        quiz_ids = pick(Quiz.objects.filter(questions__choices__isnull=False).distinct())
+        quizzes = {}
+        rows = Choice.objects.filter(question__quiz_id__in=quiz_ids).values_list('question__quiz_id', 'question_id', 'id')
+        for quiz_id, question_id, choice_id in rows.order_by('id'):
+            quizzes.setdefault(quiz_id, {}).setdefault(question_id, []).append(choice_id)
+
+        return cls(
+            jobs=pick(JobPosting.objects.all()),
+            categories=sorted(set(JobPosting.objects.values_list('category', flat=True).distinct())),
+            courses=pick(Course.objects.all()),
+            env_courses=pick(EnvCourse.objects.all()),
+            modules=pick(CourseModule.objects.all()),
+            quizzes=sorted(quizzes.items()),
+            students=list(User.objects.filter(pk__in=pick(User.objects.filter(student_profile__isnull=False)))),
+            employers=list(User.objects.filter(pk__in=pick(User.objects.filter(employer_profile__isnull=False)))),
+            password=password,
+        )
+
+
+class VirtualUser:
+    """
+    An anonymous visitor plus, if the data has them, a logged-in student
+    and employer, all sharing one transport
+    """
+
+    def __init__(self, transport, recorder, student=None, employer=None):
+        self.anonymous = BenchClient(transport, recorder)
+        self.student = BenchClient(transport, recorder, session_cookies(student)) if student else None
+        self.employer = BenchClient(transport, recorder, session_cookies(employer)) if employer else None
+
+
+def browse_jobs(user, targets, rng):
+    client = user.student if user.student and rng.random() < 0.5 else user.anonymous
+    client.get('careers:job_list')
+    client.get('careers:job_list', query={'category': rng.choice(targets.categories), 'min_salary': 30000},
+               label='GET careers:job_list?category')
+    client.get('careers:job_list', query={'search': rng.choice(SEARCH_TERMS)}, label='GET careers:job_list?search')
+    client.get('careers:job_detail', kwargs={'job_id': rng.choice(targets.jobs)})
+
+
+def course_detail(user, targets, rng):
+    client = user.student if user.student and rng.random() < 0.5 else user.anonymous
+    client.get('ums:course_detail', kwargs={'course_id': rng.choice(targets.courses)})
+    client.get('lms:course_detail', kwargs={'course_id': rng.choice(targets.env_courses)})
+    client.get('lms:module_detail', kwargs={'module_id': rng.choice(targets.modules)})
+
+
+def take_quiz(user, targets, rng):
+    quiz_id, questions = rng.choice(targets.quizzes)
+    user.student.get('lms:quiz', kwargs={'quiz_id': quiz_id})
+    answers = {f'question_{question_id}': rng.choice(choices) for question_id, choices in questions.items()}
+    user.student.follow(user.student.post('lms:quiz', kwargs={'quiz_id': quiz_id}, data=answers))
+
+
+def apply_job(user, targets, rng):
+    kwargs = {'job_id': rng.choice(targets.jobs)}
+    user.student.get('careers:job_detail', kwargs=kwargs)
+    user.student.get('careers:apply', kwargs=kwargs)
+    user.student.follow(user.student.post('careers:apply', kwargs=kwargs, data={'cover_letter': 'Benchmark run.'}))
+
+
+def employer_dashboard(user, targets, rng):
+    user.employer.get('careers:employer_dashboard')
+    user.employer.get('careers:employer_analytics')
+
+
+def sign_in(user, targets, rng):
+    # A fresh browser each time, as in a morning sign-in burst
+    client = BenchClient(user.anonymous.transport, user.anonymous.recorder)
+    client.get('accounts:login')
+    student = rng.choice(targets.students)
+    client.follow(client.post('accounts:login', data={'username': student.username, 'password': targets.password}))
+
+
+def register(user, targets, rng):
+    # Many different students racing for the same few seats
+    student = rng.choice(targets.students)
+    client = BenchClient(user.anonymous.transport, user.anonymous.recorder, session_cookies(student))
+    kwargs = {'course_id': rng.choice(targets.courses[:RUSH_COURSES])}
+    client.get('ums:course_detail', kwargs=kwargs)
+    client.follow(client.post('ums:enroll', kwargs=kwargs))
+
+
+# name -> (journey, the Targets attributes it needs)
+JOURNEYS = {
+    'browse_jobs': (browse_jobs, ['jobs', 'categories']),
+    'course_detail': (course_detail, ['courses', 'env_courses', 'modules']),
+    'take_quiz': (take_quiz, ['quizzes', 'students']),
+    'apply_job': (apply_job, ['jobs', 'students']),
+    'employer_dashboard': (employer_dashboard, ['employers']),
+    'sign_in': (sign_in, ['students']),
+    'register': (register, ['courses', 'students']),
+}
+
+
+def missing_targets(journeys, targets):
+    return sorted({need for name in journeys for need in JOURNEYS[name][1] if not getattr(targets, need)})
+
+
+def run(transport, journeys, targets, concurrency=1, iterations=None, duration=None, warmup=0, seed=0):
+    """
+    Run ``journeys`` (picked at random per iteration) on ``concurrency``
+    threads until ``iterations`` journeys have run or ``duration`` seconds
+    have passed. Returns the Recorder and the measured wall-clock time.
+    """
+    recorder = Recorder()
+    users = [
+        VirtualUser(
+            transport, recorder,
+            student=targets.students[index % len(targets.students)] if targets.students else None,
+            employer=targets.employers[index % len(targets.employers)] if targets.employers else None,
+        )
+        for index in range(concurrency)
+    ]
+
+    # Warm caches and connections without recording
+    warmup_rng = random.Random(f'{seed}:warmup')
+    warm = VirtualUser(
+        transport, None,
+        student=targets.students[0] if targets.students else None,
+        employer=targets.employers[0] if targets.employers else None,
+    )
+    for _ in range(warmup):
+        JOURNEYS[warmup_rng.choice(journeys)][0](warm, targets, warmup_rng)
+
+    lock = threading.Lock()
+    remaining = [iterations]
+    deadline = time.monotonic() + duration if duration else None
+
+    def claim():
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        with lock:
+            if remaining[0] is None:
+                return True
+            if remaining[0] <= 0:
+                return False
+            remaining[0] -= 1
+            return True
+
+    def worker(index):
+        rng = random.Random(f'{seed}:{index}')
+        try:
+            while claim():
+                JOURNEYS[rng.choice(journeys)][0](users[index], targets, rng)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker, args=(index,), daemon=True) for index in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder, time.perf_counter() - started
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile of an already sorted list
+    """
+    if not values:
+        return None
+    return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]
+
+
+def summarize(recorder, wall):
+    endpoints = {}
+    for label, stats in sorted(recorder.endpoints.items()):
+        latencies = sorted(stats.latencies)
+        endpoints[label] = {
+            'requests': len(latencies),
+            'errors': stats.errors,
+            'statuses': {str(status): count for status, count in sorted(stats.statuses.items())},
+            'throughput': round(len(latencies) / wall, 2) if wall else None,
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'max_ms': round(latencies[-1] * 1000, 2),
+            'queries_mean': round(sum(stats.queries) / len(stats.queries), 2) if stats.queries else None,
+            'queries_max': max(stats.queries) if stats.queries else None,
+        }
+    total = sum(endpoint['requests'] for endpoint in endpoints.values())
+    return {
+        'requests': total,
+        'errors': sum(endpoint['errors'] for endpoint in endpoints.values()),
+        'wall_seconds': round(wall, 3),
+        'throughput': round(total / wall, 2) if wall else None,
+        'endpoints': endpoints,
+    }
+
+
+def compare(current, baseline):
+    """
+    Yield ``(label, metric, before, after, change)`` for every endpoint
+    present in both results; ``change`` is a fraction (0.1 == 10% slower)
+    """
+    for label, after in current['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(label)
+        if before is None:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms', 'queries_mean'):
+            old, new = before.get(metric), after.get(metric)
+            if old is None or new is None:
+                continue
+            yield label, metric, old, new, (new - old) / old if old else None
@@ -0,0 +1,111 @@
+"""
+Two-level cache backend.
+
+``TieredCache`` puts a small per-process cache (L1, normally locmem) in
+front of the shared cache every process sees (L2: Redis, memcached, the
+file or database backend). Reads try L1 first and copy L2 hits into it;
+writes and deletes go to both. L1 entries live at most ``L1_TIMEOUT``
+seconds, which bounds how long another process can serve a value this one
+has replaced, so keys that must be exact across processes (counters,
+locks) should be read with ``incr``/``add`` rather than ``get``.
+
+Configure it as the default cache with the two tiers as their own aliases::
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'eco_nexus.cache.TieredCache',
+            'OPTIONS': {'L1': 'local', 'L2': 'shared', 'L1_TIMEOUT': 5},
+        },
+        'local': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'shared': {...},
+    }
+"""
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+MISSING = object()
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.l1_alias = options.get('L1', 'local')
+        self.l2_alias = options.get('L2', 'shared')
+        self.l1_timeout = options.get('L1_TIMEOUT', 5)
+
+    @property
+    def l1(self):
+        return caches[self.l1_alias]
+
+    @property
+    def l2(self):
+        return caches[self.l2_alias]
+
+    def l1_timeout_for(self, timeout):
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.l2.default_timeout
+        if timeout is None:
+            return self.l1_timeout
+        return min(timeout, self.l1_timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if not self.l2.add(key, value, timeout, version):
+            return False
+        self.l1.set(key, value, self.l1_timeout_for(timeout), version)
+        return True
+
+    def get(self, key, default=None, version=None):
+        value = self.l1.get(key, MISSING, version)
+        if value is MISSING:
+            value = self.l2.get(key, MISSING, version)
+            if value is MISSING:
+                return default
+            self.l1.set(key, value, self.l1_timeout, version)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, timeout, version)
+        self.l1.set(key, value, self.l1_timeout_for(timeout), version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l1.delete(key, version)
+        return self.l2.touch(key, timeout, version)
+
+    def delete(self, key, version=None):
+        self.l1.delete(key, version)
+        return self.l2.delete(key, version)
+
+    def get_many(self, keys, version=None):
+        found = self.l1.get_many(keys, version)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            shared = self.l2.get_many(missing, version)
+            if shared:
+                self.l1.set_many(shared, self.l1_timeout, version)
+            found.update(shared)
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.l2.set_many(data, timeout, version)
+        self.l1.set_many(
+            {key: value for key, value in data.items() if key not in failed},
+            self.l1_timeout_for(timeout), version,
+        )
+        return failed
+
+    def delete_many(self, keys, version=None):
+        self.l1.delete_many(keys, version)
+        self.l2.delete_many(keys, version)
+
+    def has_key(self, key, version=None):
+        return self.l1.has_key(key, version) or self.l2.has_key(key, version)
+
+    def incr(self, key, delta=1, version=None):
+        # Counters are only exact in L2
+        self.l1.delete(key, version)
+        return self.l2.incr(key, delta, version)
+
+    def clear(self):
+        self.l1.clear()
+        self.l2.clear()
@@ -0,0 +1,198 @@
+"""
+Detail views that load their object once, with a declared query plan.
+
+A ``PlannedDetailView`` declares the ``select_related``,
+``prefetch_related`` and annotations its page needs as a ``QueryPlan``.
+The plan is applied to the view's queryset (and can be shared with an
+object cache's build function, so the cached object is loaded the same
+way); ``get_object`` loads the object once and returns the same instance
+for the rest of the request, from ``get``, ``post`` or
+``get_context_data``.
+
+``DETAIL_PLAN_MODE`` checks the plan: while the view runs and its
+template renders, a query issued by a lazy foreign-key or one-to-one
+lookup on the object, or on anything already loaded with it, means the
+plan is missing a relation. ``'log'`` writes an ``eco_nexus.detail``
+warning, ``'warn'`` issues a LazyRelationWarning and ``'raise'`` raises
+LazyRelationError, which the test client re-raises so the test fails.
+"""
+import logging
+import sys
+import warnings
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Model
+from django.db.models.fields import related_descriptors
+from django.views.generic import DetailView
+
+from .nplusone import MODES, call_site
+
+logger = logging.getLogger('eco_nexus.detail')
+
+DESCRIPTORS_FILE = str(Path(related_descriptors.__file__).resolve())
+
+
+class LazyRelationError(Exception):
+    pass
+
+
+class LazyRelationWarning(UserWarning):
+    pass
+
+
+class QueryPlan:
+    """
+    The relations and annotations loaded with an object
+    """
+
+    def __init__(self, select_related=(), prefetch_related=(), annotations=None):
+        self.select_related = tuple(select_related)
+        self.prefetch_related = tuple(prefetch_related)
+        self.annotations = dict(annotations or {})
+
+    def apply(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        if self.annotations:
+            queryset = queryset.annotate(**self.annotations)
+        return queryset
+
+
+def get_mode():
+    mode = getattr(settings, 'DETAIL_PLAN_MODE', 'off') or 'off'
+    if mode not in MODES:
+        raise ValueError(f'DETAIL_PLAN_MODE must be one of {", ".join(MODES)}, not {mode!r}')
+    return mode
+
+
+def loaded_instances(root):
+    """
+    Return ``root`` and every model instance loaded with it (related-object
+    caches, prefetch caches and ``to_attr`` lists), keyed by ``id()``
+    """
+    seen = {}
+    stack = [root]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, (list, tuple)):
+            stack.extend(item)
+        elif isinstance(item, Model) and id(item) not in seen:
+            seen[id(item)] = item
+            stack.extend(value for value in item._state.fields_cache.values() if value is not None)
+            for queryset in getattr(item, '_prefetched_objects_cache', {}).values():
+                stack.extend(queryset._result_cache or ())
+            stack.extend(value for value in vars(item).values() if isinstance(value, list))
+    return seen
+
+
+def lazy_load(frame):
+    """
+    Return ``(instance, field name)`` if a related descriptor lookup is
+    running in ``frame`` or an outer frame
+    """
+    while frame is not None:
+        if frame.f_code.co_filename == DESCRIPTORS_FILE and frame.f_code.co_name == '__get__':
+            instance = frame.f_locals.get('instance')
+            descriptor = frame.f_locals.get('self')
+            if isinstance(instance, Model):
+                field = getattr(descriptor, 'field', None) or getattr(descriptor, 'related', None)
+                return instance, getattr(field, 'name', '?')
+        frame = frame.f_back
+    return None
+
+
+class RelationGuard:
+    """
+    ``connection.execute_wrapper`` hook recording lazy relation loads on
+    a view's object graph
+    """
+
+    def __init__(self, view):
+        self.view = view
+        self.loads = []
+
+    def __call__(self, execute, sql, params, many, context):
+        root = getattr(self.view, 'object', None)
+        if root is not None:
+            found = lazy_load(sys._getframe(1))
+            if found is not None and id(found[0]) in loaded_instances(root):
+                instance, name = found
+                code_location, template_location = call_site(sys._getframe(1))
+                self.loads.append(
+                    f'{type(instance).__name__}.{name} at {code_location or "<unknown>"}'
+                    + (f' (template {template_location})' if template_location else '')
+                )
+        return execute(sql, params, many, context)
+
+    def report(self, mode):
+        if not self.loads:
+            return
+        message = '\n'.join(
+            [f'Relations loaded outside the query plan of {type(self.view).__name__}:']
+            + [f'  {load}' for load in self.loads]
+        )
+        if mode == 'raise':
+            raise LazyRelationError(message)
+        if mode == 'warn':
+            warnings.warn(message, LazyRelationWarning, stacklevel=2)
+        else:
+            logger.warning(message)
+
+
+def guarded(guard):
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(guard))
+    return stack
+
+
+class PlannedDetailView(DetailView):
+    """
+    DetailView loading its object once, with the relations in ``plan``.
+
+    Views served from an object cache override ``load_object`` and share
+    the plan with the cache's build function.
+    """
+    plan = QueryPlan()
+
+    def get_queryset(self):
+        return self.plan.apply(super().get_queryset())
+
+    def load_object(self, queryset=None):
+        return super().get_object(queryset)
+
+    def get_object(self, queryset=None):
+        if queryset is None and getattr(self, 'object', None) is not None:
+            return self.object
+        obj = self.load_object(queryset)
+        if queryset is None:
+            self.object = obj
+        return obj
+
+    def dispatch(self, request, *args, **kwargs):
+        mode = get_mode()
+        if mode == 'off':
+            return super().dispatch(request, *args, **kwargs)
+
+        guard = RelationGuard(self)
+        with guarded(guard):
+            response = super().dispatch(request, *args, **kwargs)
+
+        if hasattr(response, 'render') and not response.is_rendered:
+            # The template renders after dispatch returns: guard that too
+            render = response.render
+
+            def guarded_render():
+                with guarded(guard):
+                    rendered = render()
+                guard.report(mode)
+                return rendered
+            response.render = guarded_render
+        else:
+            guard.report(mode)
+        return response
@@ -0,0 +1,70 @@
+"""
+Dirty-field tracking for models saved far more often than they change.
+
+``DirtyFieldsMixin`` remembers the value of every field an instance was
+loaded (or last saved) with. ``save()`` on a stored instance then writes
+only the fields whose values differ, via ``update_fields``, and skips the
+UPDATE (and the save signals) entirely when nothing changed. JSON fields
+are compared by value, so mutating a list in place counts as a change.
+``auto_now`` fields are written along with any real change.
+
+Creating, ``force_insert`` and an explicit ``update_fields`` behave as
+plain ``save()``.
+"""
+import copy
+
+
+class DirtyFieldsMixin:
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.snapshot_fields()
+        return instance
+
+    def tracked_fields(self):
+        return [field for field in self._meta.concrete_fields if not field.primary_key]
+
+    def snapshot_fields(self, names=None):
+        """
+        Record the current values of ``names`` (default: every loaded field)
+        as clean
+        """
+        if not hasattr(self, 'saved_values'):
+            self.saved_values = {}
+        for field in self.tracked_fields():
+            if field.attname in self.__dict__ and (names is None or field.name in names or field.attname in names):
+                value = self.__dict__[field.attname]
+                # Copy JSON values so in-place changes show up as dirty
+                self.saved_values[field.attname] = copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+
+    def get_dirty_fields(self):
+        """
+        Names of the fields changed since the instance was loaded or saved
+        """
+        saved = getattr(self, 'saved_values', {})
+        return [
+            field.name for field in self.tracked_fields()
+            # Deferred fields that were never loaded or set are not dirty
+            if field.attname in self.__dict__
+            and (field.attname not in saved or saved[field.attname] != self.__dict__[field.attname])
+        ]
+
+    def save(self, *args, **kwargs):
+        if self._state.adding or kwargs.get('force_insert') or kwargs.get('update_fields') is not None or args:
+            super().save(*args, **kwargs)
+            self.snapshot_fields(kwargs.get('update_fields'))
+            return
+
+        dirty = self.get_dirty_fields()
+        if not dirty:
+            return
+        dirty += [
+            field.name for field in self.tracked_fields()
+            if getattr(field, 'auto_now', False) and field.name not in dirty
+        ]
+        super().save(update_fields=dirty, **kwargs)
+        self.snapshot_fields(dirty)
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self.snapshot_fields(fields)
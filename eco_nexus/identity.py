@@ -0,0 +1,117 @@
+"""
+Request identity: the user, their role and their profile from one query.
+
+``IdentityBackend`` loads the session user together with its student
+profile (and that profile's department and semester) and its employer
+profile in a single joined query, so later ``user.student_profile`` or
+``user.employer_profile`` lookups hit the related-object cache instead of
+the database; a missing profile is cached too and costs nothing to probe.
+
+``IdentityMiddleware`` puts an ``Identity`` on ``request.identity`` with
+explicit role checks, and the mixins below use it instead of each view
+catching ``DoesNotExist`` or calling ``hasattr`` on the user.
+"""
+from django.contrib import messages
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.models import User
+from django.core.exceptions import ObjectDoesNotExist
+from django.shortcuts import redirect
+from django.utils.functional import cached_property
+
+IDENTITY_RELATED = ('student_profile__department', 'student_profile__semester', 'employer_profile')
+
+
+class IdentityBackend(ModelBackend):
+    """
+    ModelBackend that loads users with their profiles joined in
+    """
+
+    def get_user(self, user_id):
+        user = User._default_manager.select_related(*IDENTITY_RELATED).filter(pk=user_id).first()
+        if user is None or not self.user_can_authenticate(user):
+            return None
+        return user
+
+
+def related_or_none(user, name):
+    try:
+        return getattr(user, name)
+    except ObjectDoesNotExist:
+        return None
+
+
+class Identity:
+    """
+    Who is making the request, memoized for the request
+    """
+
+    def __init__(self, request):
+        self.request = request
+
+    @property
+    def user(self):
+        return self.request.user
+
+    @property
+    def is_authenticated(self):
+        return self.user.is_authenticated
+
+    @cached_property
+    def student(self):
+        if not self.is_authenticated:
+            return None
+        return related_or_none(self.user, 'student_profile')
+
+    @cached_property
+    def employer(self):
+        if not self.is_authenticated:
+            return None
+        return related_or_none(self.user, 'employer_profile')
+
+    @property
+    def is_student(self):
+        return self.student is not None
+
+    @property
+    def is_employer(self):
+        return self.employer is not None
+
+
+class IdentityMiddleware:
+    """
+    Attach ``request.identity``; must come after AuthenticationMiddleware
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.identity = Identity(request)
+        return self.get_response(request)
+
+
+class RoleRequiredMixin(LoginRequiredMixin):
+    """
+    Require a logged-in user with a role; anyone else is sent to
+    ``role_redirect_url`` with ``role_message``
+    """
+    role = None
+    role_message = None
+    role_redirect_url = 'home'
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.user.is_authenticated and not getattr(request.identity, f'is_{self.role}'):
+            messages.error(request, self.role_message)
+            return redirect(self.role_redirect_url)
+        return super().dispatch(request, *args, **kwargs)
+
+
+class StudentRequiredMixin(RoleRequiredMixin):
+    role = 'student'
+    role_message = "Student profile not found."
+
+
+class EmployerRequiredMixin(RoleRequiredMixin):
+    role = 'employer'
+    role_message = "Access denied. Employer profile required."
@@ -0,0 +1,108 @@
+"""
+Insert-or-ignore writes for rows guarded by a unique constraint.
+
+Checking ``exists()`` before ``create()`` costs two round trips and still
+races: two requests can both see no row and the second insert fails on
+the constraint. ``insert_or_ignore`` sends one ``INSERT ... ON CONFLICT
+DO NOTHING`` (``INSERT OR IGNORE`` on SQLite) and reports whether the row
+went in, so the database settles the race. ``bulk_insert_or_ignore`` does
+the same for many rows in batched statements.
+
+Both are built on Django's own insert compiler, so field defaults and
+``auto_now_add`` values are filled in as for ``save()``. Setting the
+compiler's ``returning_fields`` (as ``Model.save()`` does) is not public
+API; careers.tests pins that the primary key still comes back.
+"""
+from django.db import connections, models, router
+from django.db.models import signals, sql
+from django.db.models.constants import OnConflict
+
+
+def insert_fields(meta, with_pk):
+    return [
+        field for field in meta.local_concrete_fields
+        if not getattr(field, 'generated', False) and (with_pk or field is not meta.auto_field)
+    ]
+
+
+def insert_or_ignore(instance, using=None):
+    """
+    Insert ``instance`` unless it would violate a unique constraint.
+
+    Returns True if the row was inserted; the instance then has its primary
+    key and ``post_save`` is sent with ``created=True``, as for ``save()``.
+    Returns False, sending nothing, if a conflicting row already exists;
+    a file uploaded to the instance is then deleted from storage again.
+    """
+    model = type(instance)
+    meta = model._meta
+    using = using or router.db_for_write(model, instance=instance)
+    connection = connections[using]
+
+    fields = insert_fields(meta, instance.pk is not None)
+    # pre_save stores these while the INSERT is compiled
+    uploads = [
+        field for field in fields
+        if isinstance(field, models.FileField) and getattr(instance, field.attname)
+        and not getattr(instance, field.attname)._committed
+    ]
+    query = sql.InsertQuery(model, on_conflict=OnConflict.IGNORE)
+    query.insert_values(fields, [instance])
+    compiler = query.get_compiler(using=using)
+    if connection.features.can_return_columns_from_insert:
+        compiler.returning_fields = meta.db_returning_fields
+
+    with connection.cursor() as cursor:
+        for statement, params in compiler.as_sql():
+            cursor.execute(statement, params)
+        if compiler.returning_fields:
+            # An ignored insert returns no row
+            row = cursor.fetchone()
+        else:
+            row = (cursor.lastrowid,) if cursor.rowcount == 1 else None
+    if row is None:
+        for field in uploads:
+            getattr(instance, field.attname).delete(save=False)
+        return False
+
+    for field, value in zip(compiler.returning_fields or [meta.pk], row):
+        setattr(instance, field.attname, value)
+    instance._state.adding = False
+    instance._state.db = using
+    if hasattr(instance, 'snapshot_fields'):
+        # DirtyFieldsMixin: the inserted values are clean
+        instance.snapshot_fields()
+    signals.post_save.send(
+        sender=model, instance=instance, created=True, update_fields=None, raw=False, using=using,
+    )
+    return True
+
+
+def bulk_insert_or_ignore(objs, batch_size=None, using=None):
+    """
+    Insert ``objs`` (all of one model) in batched statements, skipping any
+    that conflict with existing rows or each other.
+
+    Like ``bulk_create`` no signals are sent and primary keys are not set.
+    Returns the number of rows inserted.
+    """
+    objs = list(objs)
+    if not objs:
+        return 0
+    model = type(objs[0])
+    meta = model._meta
+    using = using or router.db_for_write(model)
+    connection = connections[using]
+    fields = insert_fields(meta, with_pk=False)
+    max_size = connection.ops.bulk_batch_size(fields, objs)
+    batch_size = min(batch_size, max_size) if batch_size else max_size
+
+    inserted = 0
+    with connection.cursor() as cursor:
+        for start in range(0, len(objs), batch_size):
+            query = sql.InsertQuery(model, on_conflict=OnConflict.IGNORE)
+            query.insert_values(fields, objs[start:start + batch_size])
+            for statement, params in query.get_compiler(using=using).as_sql():
+                cursor.execute(statement, params)
+                inserted += cursor.rowcount
+    return inserted
@@ -0,0 +1,335 @@
+"""
+In-process metrics registry exposed in Prometheus text format.
+
+Each process keeps its own counters and histograms. When
+``METRICS_MULTIPROC_DIR`` is set (one directory shared by every gunicorn
+worker), each process also writes its values to ``<dir>/<pid>.json``
+within ``METRICS_FLUSH_INTERVAL`` seconds of any change and again at exit,
+and ``/metrics`` sums the files of all workers. The first flush of a
+process folds the files of exited workers (including a previous owner of
+its pid) into ``<dir>/exited.json``, so their totals are kept without
+the directory growing with every restart.
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.samples = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self.registry.lock:
+            self.samples[key] = self.samples.get(key, 0) + amount
+        self.registry.changed()
+
+    def dump(self):
+        return [[list(key), value] for key, value in self.samples.items()]
+
+    @staticmethod
+    def merge(into, value):
+        return (into or 0) + value
+
+
+class Histogram(Counter):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self.registry.lock:
+            # Cumulative bucket counts, then +Inf/count, then sum
+            sample = self.samples.get(key)
+            if sample is None:
+                sample = self.samples[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    sample[i] += 1
+            sample[-2] += 1
+            sample[-1] += value
+        self.registry.changed()
+
+    def dump(self):
+        return [[list(key), list(value)] for key, value in self.samples.items()]
+
+    @staticmethod
+    def merge(into, value):
+        if into is None:
+            return list(value)
+        return [a + b for a, b in zip(into, value)]
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self.reset()
+
+    def reset(self):
+        # Flush state is per process
+        self.last_flush = 0.0
+        self.dirty = False
+        self.timer = None
+        self.adopted = None
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.metrics.setdefault(name, Counter(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.metrics.setdefault(name, Histogram(self, name, documentation, labelnames, buckets))
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: {
+                    'kind': metric.kind,
+                    'help': metric.documentation,
+                    'labelnames': list(metric.labelnames),
+                    'buckets': list(getattr(metric, 'buckets', ())),
+                    'samples': metric.dump(),
+                }
+                for name, metric in self.metrics.items()
+            }
+
+    def multiproc_dir(self):
+        return getattr(settings, 'METRICS_MULTIPROC_DIR', None)
+
+    def changed(self):
+        directory = self.multiproc_dir()
+        if not directory:
+            return
+        interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0)
+        with self.lock:
+            self.dirty = True
+            wait = interval - (time.monotonic() - self.last_flush)
+            if wait > 0:
+                # Flushed by the timer, however idle the process goes
+                if self.timer is None:
+                    self.timer = threading.Timer(wait, self.flush_pending)
+                    self.timer.daemon = True
+                    self.timer.start()
+                return
+        self.flush(directory)
+
+    def flush_pending(self):
+        with self.lock:
+            self.timer = None
+            pending = self.dirty
+        directory = self.multiproc_dir()
+        if pending and directory:
+            self.flush(directory)
+
+    def flush(self, directory):
+        with self.lock:
+            self.last_flush = time.monotonic()
+            self.dirty = False
+        os.makedirs(directory, exist_ok=True)
+        if self.adopted != directory:
+            self.adopt_exited(directory)
+            self.adopted = directory
+        write_json(Path(directory) / f'{os.getpid()}.json', self.snapshot())
+
+    def adopt_exited(self, directory):
+        """
+        Fold the files of processes that are no longer running into
+        ``exited.json`` and delete them
+        """
+        with directory_lock(directory):
+            exited = Path(directory) / 'exited.json'
+            snapshots, paths = [read_json(exited)], []
+            for path in Path(directory).glob('*.json'):
+                if not path.stem.isdigit():
+                    continue
+                pid = int(path.stem)
+                # A file under our own pid was left by an exited process
+                if pid == os.getpid() or not pid_running(pid):
+                    snapshots.append(read_json(path))
+                    paths.append(path)
+            if not paths:
+                return
+            write_json(exited, merge_snapshots(snapshots))
+            for path in paths:
+                path.unlink(missing_ok=True)
+
+    def collect(self):
+        """
+        Merged snapshot of this process, or of every worker in multiprocess mode
+        """
+        directory = self.multiproc_dir()
+        if not directory:
+            return self.snapshot()
+        self.flush(directory)
+        # Not while a starting worker is moving files into exited.json
+        with directory_lock(directory, shared=True):
+            return merge_snapshots(read_json(path) for path in Path(directory).glob('*.json'))
+
+    def render(self):
+        lines = []
+        for name, data in sorted(self.collect().items()):
+            lines.append(f"# HELP {name} {data['help']}")
+            lines.append(f"# TYPE {name} {data['kind']}")
+            for labels, value in sorted(data['samples']):
+                pairs = list(zip(data['labelnames'], labels))
+                if data['kind'] == 'counter':
+                    lines.append(f'{name}{format_labels(pairs)} {format_value(value)}')
+                    continue
+                for bound, count in zip(data['buckets'], value):
+                    lines.append(f'{name}_bucket{format_labels(pairs + [("le", format_value(bound))])} {count}')
+                lines.append(f'{name}_bucket{format_labels(pairs + [("le", "+Inf")])} {value[-2]}')
+                lines.append(f'{name}_count{format_labels(pairs)} {value[-2]}')
+                lines.append(f'{name}_sum{format_labels(pairs)} {format_value(value[-1])}')
+        return '\n'.join(lines) + '\n'
+
+
+def merge_snapshots(snapshots):
+    merged = {}
+    for snapshot in snapshots:
+        for name, data in snapshot.items():
+            target = merged.setdefault(name, {**data, 'samples': {}})
+            merge = Histogram.merge if data['kind'] == 'histogram' else Counter.merge
+            for labels, value in data['samples']:
+                key = tuple(labels)
+                target['samples'][key] = merge(target['samples'].get(key), value)
+    for data in merged.values():
+        data['samples'] = [[list(key), value] for key, value in data['samples'].items()]
+    return merged
+
+
+def read_json(path):
+    try:
+        return json.loads(Path(path).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def write_json(path, data):
+    handle, tmp_path = tempfile.mkstemp(dir=Path(path).parent, suffix='.tmp')
+    with os.fdopen(handle, 'w') as tmp:
+        json.dump(data, tmp)
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def directory_lock(directory, shared=False):
+    import fcntl
+
+    with open(Path(directory) / '.lock', 'a') as handle:
+        fcntl.flock(handle, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def pid_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def format_labels(pairs):
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def format_value(value):
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+registry = Registry()
+# Increments since the last flush are written before the process exits
+atexit.register(registry.flush_pending)
+if hasattr(os, 'register_at_fork'):
+    # A forked worker starts with no timer of its own
+    os.register_at_fork(after_in_child=registry.reset)
+
+http_requests = registry.counter(
+    'eco_nexus_http_requests_total', 'HTTP requests by view, method and status', ('view', 'method', 'status'),
+)
+http_latency = registry.histogram(
+    'eco_nexus_http_request_duration_seconds', 'Request latency by view', ('view',),
+)
+http_queries = registry.histogram(
+    'eco_nexus_http_request_queries', 'SQL queries per request by view', ('view',), QUERY_COUNT_BUCKETS,
+)
+cache_requests = registry.counter(
+    'eco_nexus_cache_requests_total', 'Application cache lookups by cache and result', ('cache', 'result'),
+)
+object_cache_rebuild = registry.histogram(
+    'eco_nexus_object_cache_rebuild_seconds', 'Object cache rebuild time by cache', ('cache',),
+)
+quiz_submissions = registry.counter(
+    'eco_nexus_quiz_submissions_total', 'Graded quiz submissions',
+)
+job_applications = registry.counter(
+    'eco_nexus_job_applications_total', 'Job applications created',
+)
+
+
+def observe_request(view, method, status, duration, queries):
+    http_requests.inc(view=view, method=method, status=status)
+    http_latency.observe(duration, view=view)
+    http_queries.observe(queries, view=view)
+
+
+def cache_lookup(cache_name, hit):
+    cache_requests.inc(cache=cache_name, result='hit' if hit else 'miss')
+
+
+def client_ip(request):
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def has_metrics_token(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    scheme, _, value = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    return bool(token) and scheme.lower() == 'bearer' and constant_time_compare(value.strip(), token)
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint, open to staff, to requests bearing
+    METRICS_TOKEN and to METRICS_ALLOWED_IPS.
+
+    No addresses are allowed by default: behind a local reverse proxy every
+    request comes from loopback.
+    """
+    allowed_ips = getattr(settings, 'METRICS_ALLOWED_IPS', [])
+    if not (request.user.is_staff or has_metrics_token(request) or client_ip(request) in allowed_ips):
+        raise PermissionDenied
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
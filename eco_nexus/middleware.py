@@ -0,0 +1,173 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics, nplusone
+
+logger = logging.getLogger('eco_nexus.perf')
+
+
+class QueryTimer:
+    """
+    ``connection.execute_wrapper`` hook that counts queries and their time
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class RequestTimings:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = QueryTimer()
+        self.render_start = None
+        self.render_duration = 0.0
+
+    def start_render(self):
+        self.render_start = time.perf_counter()
+
+    def end_render(self, response):
+        if self.render_start is not None:
+            self.render_duration += time.perf_counter() - self.render_start
+            self.render_start = None
+        return response
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match._func_path
+
+
+class PerformanceMiddleware:
+    """
+    Record per-request timings and report them as the per-view request
+    metrics in ``eco_nexus.metrics``, a ``Server-Timing`` header and one
+    DEBUG-level ``eco_nexus.perf`` log line.
+
+    Captures the resolved view name, SQL query count and time, template
+    render time (for TemplateResponse-based views) and total time. The
+    header goes to staff users, or to everyone with ``PERF_SERVER_TIMING``
+    on. Turned off entirely by ``PERF_INSTRUMENTATION = False``, in which
+    case Django drops the middleware from the stack.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERF_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        request._perf_timings = timings
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timings.queries))
+            response = self.get_response(request)
+
+        total = time.perf_counter() - timings.start
+        view_name = self.view_name(request)
+        self.report(request, response, view_name, timings, total)
+        return response
+
+    def process_template_response(self, request, response):
+        timings = getattr(request, '_perf_timings', None)
+        if timings is not None:
+            # Rendering happens right after the last template-response hook
+            timings.start_render()
+            response.add_post_render_callback(timings.end_render)
+        return response
+
+    def view_name(self, request):
+        return view_name(request)
+
+    def show_server_timing(self, request):
+        # Query counts and timings say too much about the app to show everyone
+        if getattr(settings, 'PERF_SERVER_TIMING', False):
+            return True
+        user = getattr(request, 'user', None)
+        return user is not None and user.is_staff
+
+    def report(self, request, response, view_name, timings, total):
+        queries = timings.queries
+        metrics.observe_request(view_name, request.method, response.status_code, total, queries.count)
+        if self.show_server_timing(request):
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={queries.duration * 1000:.1f};desc="{queries.count} queries"',
+                f'tpl;dur={timings.render_duration * 1000:.1f}',
+                f'total;dur={total * 1000:.1f}',
+            ])
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+        logger.debug(
+            'view=%s method=%s status=%s total_ms=%.1f db_ms=%.1f queries=%d template_ms=%.1f',
+            view_name, request.method, response.status_code,
+            total * 1000, queries.duration * 1000, queries.count, timings.render_duration * 1000,
+            extra={
+                'perf': {
+                    'view': view_name,
+                    'method': request.method,
+                    'path': request.path,
+                    'status': response.status_code,
+                    'total_ms': round(total * 1000, 1),
+                    'db_ms': round(queries.duration * 1000, 1),
+                    'queries': queries.count,
+                    'template_ms': round(timings.render_duration * 1000, 1),
+                },
+            },
+        )
+
+
+class NPlusOneMiddleware:
+    """
+    Flag SQL statements repeated from the same call site within a request.
+
+    ``NPLUSONE_MODE`` selects what happens when a fingerprint repeats more
+    than ``NPLUSONE_THRESHOLD`` times: ``'log'`` writes an
+    ``eco_nexus.nplusone`` warning, ``'warn'`` issues an NPlusOneWarning
+    and ``'raise'`` raises NPlusOneError, which the test client re-raises
+    so the test fails. A view can set ``nplusone_threshold`` to its own
+    limit, or to None to opt out.
+
+    The mode is read per request so tests can use ``override_settings``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = nplusone.get_mode()
+        if mode == 'off':
+            return self.get_response(request)
+
+        fingerprinter = nplusone.QueryFingerprinter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(fingerprinter))
+            response = self.get_response(request)
+
+        threshold = self.threshold(request)
+        if threshold is not None:
+            nplusone.report(view_name(request), fingerprinter, threshold, mode)
+        return response
+
+    def threshold(self, request):
+        match = getattr(request, 'resolver_match', None)
+        view_class = getattr(getattr(match, 'func', None), 'view_class', None)
+        default = getattr(settings, 'NPLUSONE_THRESHOLD', 5)
+        return getattr(view_class, 'nplusone_threshold', default)
@@ -0,0 +1,133 @@
+"""
+N+1 query detection.
+
+Every query a request runs is fingerprinted by its normalized SQL plus the
+project code (and template line, if any) that issued it. A fingerprint
+seen more than the threshold number of times in one request is almost
+always a query inside a loop: a lazy foreign key in ``__str__``, a
+``.count`` per row in a template, and so on.
+"""
+import logging
+import re
+import sys
+import warnings
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger('eco_nexus.nplusone')
+
+MODES = ('off', 'log', 'warn', 'raise')
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+IN_LIST_RE = re.compile(r'\bIN \((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+SPACE_RE = re.compile(r'\s+')
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+class NPlusOneWarning(UserWarning):
+    pass
+
+
+def normalize_sql(sql):
+    """
+    Reduce a statement to its shape: literals and IN-list lengths removed
+    """
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    sql = IN_LIST_RE.sub('IN (...)', sql)
+    return SPACE_RE.sub(' ', sql).strip()
+
+
+PROJECT_ROOT = str(Path(settings.BASE_DIR).resolve())
+THIS_FILE = str(Path(__file__).resolve())
+
+
+def is_project_frame(filename):
+    return (
+        filename.startswith(PROJECT_ROOT)
+        and filename != THIS_FILE
+        and 'site-packages' not in filename
+    )
+
+
+def call_site(frame):
+    """
+    Return ``(code_location, template_location)`` for the query being run.
+
+    ``code_location`` is the innermost project frame; ``template_location``
+    the innermost template node being rendered, if any.
+    """
+    code_location = template_location = None
+    while frame is not None and not (code_location and template_location):
+        if code_location is None and is_project_frame(frame.f_code.co_filename):
+            code_location = f'{frame.f_code.co_filename[len(PROJECT_ROOT) + 1:]}:{frame.f_lineno}'
+        if template_location is None and frame.f_code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            origin = getattr(node, 'origin', None)
+            token = getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                template_location = f'{origin.template_name or origin.name}:{token.lineno}'
+        frame = frame.f_back
+    return code_location, template_location
+
+
+class QueryFingerprinter:
+    """
+    ``connection.execute_wrapper`` hook counting queries per fingerprint
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+        self.samples = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        code_location, template_location = call_site(sys._getframe(1))
+        fingerprint = (normalize_sql(sql), code_location, template_location)
+        self.counts[fingerprint] += 1
+        self.samples.setdefault(fingerprint, sql)
+        return execute(sql, params, many, context)
+
+    def repeated(self, threshold):
+        return [
+            (fingerprint, count)
+            for fingerprint, count in self.counts.most_common()
+            if count > threshold
+        ]
+
+
+def get_mode():
+    mode = getattr(settings, 'NPLUSONE_MODE', 'off') or 'off'
+    if mode not in MODES:
+        raise ValueError(f'NPLUSONE_MODE must be one of {", ".join(MODES)}, not {mode!r}')
+    return mode
+
+
+def format_report(view_name, repeated, samples):
+    lines = [f'Possible N+1 queries in {view_name}:']
+    for fingerprint, count in repeated:
+        statement, code_location, template_location = fingerprint
+        lines.append(
+            f'  {count}x at {code_location or "<unknown>"}'
+            + (f' (template {template_location})' if template_location else '')
+            + f': {samples[fingerprint]}'
+        )
+    return '\n'.join(lines)
+
+
+def report(view_name, fingerprinter, threshold, mode):
+    repeated = fingerprinter.repeated(threshold)
+    if not repeated:
+        return
+    message = format_report(view_name, repeated, fingerprinter.samples)
+    if mode == 'raise':
+        raise NPlusOneError(message)
+    if mode == 'warn':
+        warnings.warn(message, NPlusOneWarning, stacklevel=2)
+    else:
+        logger.warning(message)
@@ -0,0 +1,150 @@
+"""
+Read-through object cache with stampede protection.
+
+An ``ObjectCache`` wraps a build function (usually a query plus whatever
+the detail page needs alongside the object) and caches its result per
+key. Three things keep a hot key from sending every worker to the
+database at once:
+
+* Single flight: a rebuild takes a short lock (``cache.add``); only the
+  holder runs the build function.
+* Stale while revalidate: invalidating a key bumps its version instead of
+  deleting the entry, so while the lock holder rebuilds, everyone else is
+  served the previous value. Entries are kept ``stale_timeout`` seconds
+  past their expiry for the same reason.
+* Probabilistic early refresh: a reader may rebuild a fresh entry shortly
+  before it expires, more likely the closer it is to expiry and the longer
+  the last build took (the "XFetch" rule), so expiries are spread out.
+
+Only a reader that finds no entry at all has to wait for the lock holder.
+Hits, misses, stale serves and early refreshes are counted per cache
+name in ``eco_nexus_cache_requests_total``, and rebuild time in
+``eco_nexus_object_cache_rebuild_seconds``.
+
+``get_entry`` also returns the version a value was built at, so template
+fragments can be keyed on it, and ``served_stale`` tells the page cache
+not to store a page rendered from a stale value.
+"""
+import contextvars
+import math
+import random
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+from . import metrics
+
+POLL_INTERVAL = 0.05
+
+stale_reads = contextvars.ContextVar('object_cache_stale_reads', default=False)
+
+
+def served_stale():
+    return stale_reads.get()
+
+
+def reset_stale_reads():
+    stale_reads.set(False)
+
+
+class ObjectCache:
+    def __init__(self, name, build, timeout=300, stale_timeout=60, lock_timeout=10, beta=1.0):
+        self.name = name
+        self.build = build
+        self.timeout = timeout
+        self.stale_timeout = stale_timeout
+        self.lock_timeout = lock_timeout
+        self.beta = beta
+
+    def data_key(self, key):
+        return f'obj:{self.name}:{key}'
+
+    def version_key(self, key):
+        return f'obj:{self.name}:{key}:version'
+
+    def lock_key(self, key):
+        return f'obj:{self.name}:{key}:lock'
+
+    def get(self, key):
+        """
+        Return the cached value for ``key``, building it if necessary
+        """
+        return self.get_entry(key)[0]
+
+    def get_entry(self, key):
+        """
+        Return ``(value, version)`` for ``key``, building it if necessary
+        """
+        data_key, version_key = self.data_key(key), self.version_key(key)
+        found = cache.get_many([data_key, version_key])
+        version = found.get(version_key) or self.current_version(version_key)
+        entry = found.get(data_key)
+
+        if entry is not None:
+            entry_version, value, expires, delta = entry
+            if entry_version == version and not self.refresh_early(expires, delta):
+                metrics.cache_lookup(self.name, True)
+                return value, version
+
+        if cache.add(self.lock_key(key), 1, self.lock_timeout):
+            if entry is None:
+                metrics.cache_requests.inc(cache=self.name, result='miss')
+            else:
+                metrics.cache_requests.inc(cache=self.name, result='early' if entry[0] == version else 'stale')
+            try:
+                return self.rebuild(key, version), version
+            finally:
+                cache.delete(self.lock_key(key))
+
+        if entry is not None:
+            # Someone else is rebuilding: serve what we have
+            if entry[0] == version:
+                metrics.cache_lookup(self.name, True)
+            else:
+                metrics.cache_requests.inc(cache=self.name, result='stale')
+                stale_reads.set(True)
+            return entry[1], entry[0]
+
+        # Nothing to serve: wait for the rebuild, then build it ourselves
+        # if the lock holder died or is taking too long
+        metrics.cache_requests.inc(cache=self.name, result='wait')
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            entry = cache.get(data_key)
+            if entry is not None and entry[0] == version:
+                return entry[1], version
+        return self.rebuild(key, version), version
+
+    def rebuild(self, key, version):
+        start = time.perf_counter()
+        value = self.build(key)
+        delta = time.perf_counter() - start
+        metrics.object_cache_rebuild.observe(delta, cache=self.name)
+        cache.set(
+            self.data_key(key),
+            (version, value, time.time() + self.timeout, delta),
+            self.timeout + self.stale_timeout,
+        )
+        return value
+
+    def refresh_early(self, expires, delta):
+        # XFetch: -log(U) is exponentially distributed, so the chance of an
+        # early rebuild rises sharply as expiry approaches
+        return time.time() - delta * self.beta * math.log(1 - random.random()) >= expires
+
+    def current_version(self, version_key):
+        # add() so concurrent first readers agree on one version
+        cache.add(version_key, uuid.uuid4().hex, None)
+        return cache.get(version_key)
+
+    def invalidate(self, key):
+        """
+        Mark ``key`` stale once the current transaction commits; readers are
+        served the old value until one of them has rebuilt it
+        """
+        transaction.on_commit(
+            lambda: cache.set(self.version_key(key), uuid.uuid4().hex, None)
+        )
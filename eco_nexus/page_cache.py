@@ -0,0 +1,156 @@
+"""
+Full-page caching for anonymous visitors and version stamps for fragments.
+
+Cached pages are keyed on the host, path and sorted query string, plus
+the current version of every content group the page shows (``'courses'``,
+``'env_courses'``, ``'jobs'``). Model signals call ``bump_page_version``
+for a group when its rows change, which retires every page and template
+fragment built from the old version without having to find their keys.
+Counts that change on other tables (enrollments, applications) are only
+as fresh as ``PAGE_CACHE_TIMEOUT``.
+
+Authenticated users always get a freshly rendered page; templates cache
+the parts that are the same for everyone with ``{% cache %}``, varying
+on ``cache_versions.<group>`` from the ``cache_versions`` context
+processor.
+"""
+import hashlib
+import uuid
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+
+from . import metrics, object_cache
+
+# Response headers not replayed from the cache
+UNCACHED_HEADERS = {'set-cookie', 'server-timing', 'x-page-cache'}
+
+
+def version_cache_key(group):
+    return f'page:{group}:version'
+
+
+def get_page_versions(groups):
+    """
+    Return the current version stamp of each group, in order
+    """
+    keys = [version_cache_key(group) for group in groups]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # add() so concurrent first readers agree on one version
+            cache.add(key, uuid.uuid4().hex, None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_page_version(group):
+    """
+    Retire cached pages and fragments for a group once the current
+    transaction commits
+    """
+    transaction.on_commit(
+        lambda: cache.set(version_cache_key(group), uuid.uuid4().hex, None)
+    )
+
+
+def page_cache_key(request, groups):
+    query = urlencode(sorted(
+        (name, value) for name, values in request.GET.lists() for value in values
+    ))
+    url = hashlib.md5(f'{request.get_host()}{request.path}?{query}'.encode()).hexdigest()
+    return f"page:{':'.join(get_page_versions(groups))}:{url}"
+
+
+def is_cacheable_request(request):
+    if request.method not in ('GET', 'HEAD') or settings.PAGE_CACHE_TIMEOUT <= 0:
+        return False
+    if request.user.is_authenticated:
+        return False
+    # Flash messages are rendered into the page
+    return not len(get_messages(request))
+
+
+def is_cacheable_response(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        # Rendered from an object another worker is still rebuilding
+        and not object_cache.served_stale()
+        # The page contains a CSRF token tied to this visitor's cookie
+        and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+    )
+
+
+def cache_anonymous_page(*groups, timeout=None):
+    """
+    View decorator caching the whole response for anonymous visitors,
+    invalidated when any of ``groups`` is bumped
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not is_cacheable_request(request):
+                return view_func(request, *args, **kwargs)
+            object_cache.reset_stale_reads()
+
+            key = page_cache_key(request, groups)
+            cached = cache.get(key)
+            metrics.cache_lookup('page', cached is not None)
+            if cached is not None:
+                status, headers, content = cached
+                response = HttpResponse(content, status=status)
+                for name, value in headers:
+                    response[name] = value
+                response['X-Page-Cache'] = 'hit'
+                return response
+
+            def store(response):
+                if is_cacheable_response(request, response):
+                    headers = [
+                        (name, value) for name, value in response.items()
+                        if name.lower() not in UNCACHED_HEADERS
+                    ]
+                    cache.set(key, (response.status_code, headers, response.content),
+                              timeout or settings.PAGE_CACHE_TIMEOUT)
+                return response
+
+            response = view_func(request, *args, **kwargs)
+            response['X-Page-Cache'] = 'miss'
+            if getattr(response, 'is_rendered', True):
+                store(response)
+            else:
+                response.add_post_render_callback(store)
+            return response
+        return wrapper
+    return decorator
+
+
+class CacheVersions:
+    """
+    Template-side lookup of group versions: ``cache_versions.jobs``
+    """
+
+    def __init__(self):
+        self.versions = {}
+
+    def __getitem__(self, group):
+        if group not in self.versions:
+            self.versions[group] = get_page_versions([group])[0]
+        return self.versions[group]
+
+
+def cache_versions(request):
+    """
+    Context processor for ``{% cache %}`` fragments of shared content
+    """
+    return {
+        'cache_versions': CacheVersions(),
+        'fragment_cache_timeout': settings.FRAGMENT_CACHE_TIMEOUT,
+    }
@@ -0,0 +1,200 @@
+"""
+Keyset (cursor) pagination for list views.
+
+Offset pagination costs a COUNT(*) per page and gets slower the deeper the
+page, because the database still walks every skipped row. Keyset pagination
+instead remembers the sort key of the last row shown and asks for the rows
+after it, so page 500 costs the same as page 1. Cursors are opaque,
+URL-safe tokens.
+"""
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from django.http import Http404
+
+
+class CursorPage:
+    """
+    A page of results with opaque next/previous cursors.
+
+    Quacks enough like ``django.core.paginator.Page`` for templates that
+    only iterate it and test ``has_next``/``has_previous``.
+    """
+    is_cursor = True
+    number = None
+    paginator = None
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def encode_cursor(direction, values):
+    payload = json.dumps({'d': direction, 'k': values}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, model, ordering):
+    """
+    Return ``(direction, values)`` for a cursor token, raising Http404 if it
+    is malformed or does not match the ordering
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        direction, values = payload['d'], payload['k']
+        if direction not in ('next', 'prev') or len(values) != len(ordering):
+            raise ValueError
+        values = [
+            model._meta.get_field(field.lstrip('-')).to_python(value)
+            for field, value in zip(ordering, values)
+        ]
+    except (binascii.Error, ValueError, KeyError, TypeError, ValidationError):
+        raise Http404("Invalid cursor.")
+    return direction, values
+
+
+def keyset_filter(ordering, values, reverse=False):
+    """
+    Build the lexicographic "comes after" condition for a sort key, e.g.
+    for ``('-created_at', 'id')``:
+
+        created_at < v0 OR (created_at = v0 AND id > v1)
+    """
+    condition = Q()
+    for i, field in enumerate(ordering):
+        name = field.lstrip('-')
+        descending = field.startswith('-') != reverse
+        term = Q(**{f"{name}__{'lt' if descending else 'gt'}": values[i]})
+        for previous_field, previous_value in zip(ordering[:i], values[:i]):
+            term &= Q(**{previous_field.lstrip('-'): previous_value})
+        condition |= term
+    return condition
+
+
+def reverse_ordering(ordering):
+    return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+
+
+def row_key(obj, ordering):
+    # value_to_string keeps full precision (DjangoJSONEncoder drops microseconds)
+    return [obj._meta.get_field(field.lstrip('-')).value_to_string(obj) for field in ordering]
+
+
+def paginate_by_cursor(queryset, ordering, page_size, cursor=None):
+    """
+    Return the CursorPage of ``queryset`` that follows ``cursor``.
+
+    ``ordering`` must end in a unique column so every row has a distinct key.
+    """
+    ordering = tuple(ordering)
+    direction, values = ('next', None)
+    if cursor:
+        direction, values = decode_cursor(cursor, queryset.model, ordering)
+
+    if direction == 'prev':
+        queryset = queryset.filter(keyset_filter(ordering, values, reverse=True))
+        rows = list(queryset.order_by(*reverse_ordering(ordering))[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        has_previous, has_next = has_more, True
+    else:
+        if values is not None:
+            queryset = queryset.filter(keyset_filter(ordering, values))
+        rows = list(queryset.order_by(*ordering)[:page_size + 1])
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        has_previous = values is not None
+
+    next_cursor = previous_cursor = None
+    if rows and has_next:
+        next_cursor = encode_cursor('next', row_key(rows[-1], ordering))
+    if rows and has_previous:
+        previous_cursor = encode_cursor('prev', row_key(rows[0], ordering))
+    return CursorPage(rows, next_cursor, previous_cursor)
+
+
+def estimate_count(model, using='default', timeout=300):
+    """
+    Cheap row count for display purposes.
+
+    Uses the planner statistics on PostgreSQL and a briefly cached exact
+    count elsewhere.
+    """
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row and row[0] >= 0:
+            return row[0]
+    key = f'estimate_count:{using}:{model._meta.label_lower}'
+    return cache.get_or_set(key, lambda: model._default_manager.using(using).count(), timeout)
+
+
+class CursorPaginationMixin:
+    """
+    Opt-in keyset pagination for ListView subclasses.
+
+    Set ``cursor_ordering`` to the view's sort columns (ending in a unique
+    column). Cursor mode is used when ``cursor_pagination`` is true (or, if
+    left as None, when ``settings.CURSOR_PAGINATION`` is), and whenever the
+    request already carries a cursor.
+    """
+    cursor_ordering = None
+    cursor_pagination = None
+    cursor_query_param = 'cursor'
+
+    def get_cursor_ordering(self):
+        return self.cursor_ordering
+
+    def use_cursor_pagination(self):
+        if self.get_cursor_ordering() is None:
+            return False
+        if self.cursor_query_param in self.request.GET:
+            return True
+        if self.cursor_pagination is None:
+            return getattr(settings, 'CURSOR_PAGINATION', False)
+        return self.cursor_pagination
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_cursor_pagination():
+            return super().paginate_queryset(queryset, page_size)
+        page = paginate_by_cursor(
+            queryset,
+            self.get_cursor_ordering(),
+            page_size,
+            self.request.GET.get(self.cursor_query_param),
+        )
+        return (None, page, page.object_list, page.has_other_pages())
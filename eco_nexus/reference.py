@@ -0,0 +1,129 @@
+"""
+In-process registry of near-static reference data.
+
+Departments, semesters and job categories change a few times a term but
+are shown on nearly every filter form. Each ``ReferenceTable`` keeps its
+rows in process memory and checks a version stamp in the shared cache on
+every read; saving a row bumps the stamp (on commit), and every worker
+reloads the table the next time it reads it. Reads are therefore free of
+queries except for the first one after a change, and at most
+``CACHE_L1_TIMEOUT`` seconds stale in other processes.
+
+Rows are shared between requests and threads: treat them as read-only.
+"""
+import threading
+import uuid
+
+from django import forms
+from django.core.cache import cache
+from django.db import transaction
+
+from . import metrics
+
+
+class ReferenceTable:
+    def __init__(self, name, load):
+        self.name = name
+        self.load = load
+        self.lock = threading.Lock()
+        # (version, rows, rows by pk), swapped in as one object
+        self.state = (None, (), {})
+
+    def version_key(self):
+        return f'reference:{self.name}:version'
+
+    def current_version(self):
+        version = cache.get(self.version_key())
+        if version is None:
+            # add() so concurrent first readers agree on one version
+            cache.add(self.version_key(), uuid.uuid4().hex, None)
+            version = cache.get(self.version_key())
+        return version
+
+    def current_state(self):
+        version = self.current_version()
+        state = self.state
+        if state[0] != version:
+            with self.lock:
+                state = self.state
+                if state[0] != version:
+                    rows = tuple(self.load())
+                    state = self.state = (version, rows, {getattr(row, 'pk', row): row for row in rows})
+            metrics.cache_lookup(f'reference_{self.name}', False)
+        else:
+            metrics.cache_lookup(f'reference_{self.name}', True)
+        return state
+
+    def all(self):
+        return self.current_state()[1]
+
+    def get(self, pk, default=None):
+        return self.current_state()[2].get(pk, default)
+
+    def invalidate(self):
+        """
+        Have every process reload the table once the current transaction
+        commits
+        """
+        transaction.on_commit(
+            lambda: cache.set(self.version_key(), uuid.uuid4().hex, None)
+        )
+
+
+class ReferenceChoiceField(forms.ChoiceField):
+    """
+    Choice field over a reference table, cleaning to the row itself.
+
+    A drop-in for ``ModelChoiceField`` on reference data that renders and
+    validates without touching the database.
+    """
+
+    def __init__(self, table, *, empty_label='---------', label_from_row=str, **kwargs):
+        self.table = table
+        self.empty_label = empty_label
+        self.label_from_row = label_from_row
+        super().__init__(choices=self.table_choices, **kwargs)
+
+    def table_choices(self):
+        return [('', self.empty_label)] + [
+            (getattr(row, 'pk', row), self.label_from_row(row)) for row in self.table.all()
+        ]
+
+    def prepare_value(self, value):
+        return getattr(value, 'pk', value)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        for row in self.table.all():
+            if str(getattr(row, 'pk', row)) == str(value):
+                return row
+        raise forms.ValidationError(self.error_messages['invalid_choice'], code='invalid_choice',
+                                    params={'value': value})
+
+    def validate(self, value):
+        if value is None and self.required:
+            raise forms.ValidationError(self.error_messages['required'], code='required')
+
+    def has_changed(self, initial, data):
+        return str(self.prepare_value(initial) or '') != str(self.prepare_value(data) or '')
+
+
+def load_departments():
+    from ums.models import Department
+    return Department.objects.order_by('name')
+
+
+def load_semesters():
+    from ums.models import Semester
+    return Semester.objects.order_by('start_date')
+
+
+def load_job_categories():
+    from careers.models import JobPosting
+    return JobPosting.objects.exclude(category='').order_by('category').values_list('category', flat=True).distinct()
+
+
+departments = ReferenceTable('departments', load_departments)
+semesters = ReferenceTable('semesters', load_semesters)
+job_categories = ReferenceTable('job_categories', load_job_categories)
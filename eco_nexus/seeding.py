@@ -0,0 +1,340 @@
+"""
+Synthetic data generation for load testing (``manage.py seed_scale``).
+
+Everything is written with ``bulk_create`` in batches, which also skips
+the per-row ``post_save`` signals (student profiles, search indexing,
+application rollups, GPAs) and the course seat counters; the derived
+tables are rebuilt in one pass at the end instead.
+
+Output is deterministic for a given seed: reference rows come from one
+seeded RNG, and each chunk of the large per-student tables (enrollments,
+grades, attempts, ledger, applications) has its own RNG derived from the
+seed, the table and the chunk number. Chunks can therefore be generated
+and inserted by a process pool in any order and still produce the same
+rows.
+"""
+import random
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from multiprocessing import get_context
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connections
+
+from . import reference
+from .page_cache import bump_page_version
+
+DEFAULT_PASSWORD = 'seed-pass'
+DEFAULT_BATCH_SIZE = 5000
+CHUNK_STUDENTS = 1000
+# Cycled rather than drawn, so the seeded RNG stream is unchanged; None is unlimited
+COURSE_CAPACITIES = [None, 40, 80, 150]
+
+DEPARTMENTS = [
+    ('Environmental Science', 'ENVS'), ('Computer Science', 'CS'), ('Business Administration', 'BUS'),
+    ('Engineering', 'ENG'), ('Economics', 'ECON'), ('Urban Planning', 'UP'), ('Public Policy', 'POL'),
+    ('Biology', 'BIO'), ('Chemistry', 'CHEM'), ('Architecture', 'ARCH'),
+]
+JOB_CATEGORIES = ['energy', 'policy', 'conservation', 'agriculture', 'transport', 'waste', 'water']
+LOCATIONS = ['Dhaka', 'Chittagong', 'Sylhet', 'Khulna', 'Rajshahi', 'Remote']
+GRADES = ['A', 'A-', 'B+', 'B', 'B-', 'C+', 'C', 'D', 'F']
+BADGES = ['Quiz Whiz', 'Green Starter', 'Eco Champion', 'Carbon Cutter']
+
+
+def chunk_rng(seed, table, chunk):
+    return random.Random(f'{seed}:{table}:{chunk}')
+
+
+def spread(total, index, count):
+    """
+    Share of ``total`` for item ``index`` of ``count`` when spread evenly
+    """
+    return total // count + (1 if index < total % count else 0)
+
+
+class Seeder:
+    """
+    Builds each part of the dataset and keeps what later parts refer to.
+
+    ``prefix`` namespaces usernames and course codes so several seeded
+    datasets can share a database.
+    """
+
+    def __init__(self, seed=0, prefix=None, batch_size=DEFAULT_BATCH_SIZE, password=DEFAULT_PASSWORD,
+                 using='default'):
+        self.seed = seed
+        self.prefix = prefix if prefix is not None else f's{seed}'
+        self.batch_size = batch_size
+        self.using = using
+        self.rng = random.Random(seed)
+        self.password = make_password(password)
+
+    def bulk_create(self, model, objs, **kwargs):
+        return model.objects.using(self.using).bulk_create(objs, batch_size=self.batch_size, **kwargs)
+
+    def reference_data(self, semesters=6):
+        """
+        Departments (shared between datasets), semesters and instructors
+        """
+        from ums.models import Department, Semester
+
+        Department.objects.using(self.using).bulk_create(
+            [Department(name=name, code=code) for name, code in DEPARTMENTS], ignore_conflicts=True,
+        )
+        self.departments = list(
+            Department.objects.using(self.using).filter(code__in=[code for _, code in DEPARTMENTS])
+        )
+        self.semesters = self.bulk_create(Semester, [
+            Semester(name=f'{self.prefix} Term {i + 1}', start_date=date(2024, 1, 15) + timedelta(days=122 * i),
+                     end_date=date(2024, 5, 15) + timedelta(days=122 * i))
+            for i in range(semesters)
+        ])
+        self.instructors = self.bulk_create(User, [
+            User(username=f'{self.prefix}-instructor{i}', first_name='Instructor', last_name=str(i),
+                 password=self.password, is_staff=True)
+            for i in range(max(5, len(self.departments) * 2))
+        ])
+
+    def students(self, count):
+        from accounts.models import StudentProfile
+
+        users = self.bulk_create(User, (
+            User(username=f'{self.prefix}-student{i}', first_name='Student', last_name=str(i),
+                 email=f'{self.prefix}-student{i}@example.com', password=self.password)
+            for i in range(count)
+        ))
+        self.student_profiles = self.bulk_create(StudentProfile, (
+            StudentProfile(user=user, student_id=f'{self.prefix}{i:07d}'[-20:],
+                           department=self.rng.choice(self.departments), semester=self.rng.choice(self.semesters))
+            for i, user in enumerate(users)
+        ))
+        return self.student_profiles
+
+    def courses(self, count):
+        from ums.models import Course
+
+        self.ums_courses = self.bulk_create(Course, (
+            Course(department=self.rng.choice(self.departments), semester=self.rng.choice(self.semesters),
+                   instructor=self.rng.choice(self.instructors), credits=self.rng.choice([1, 2, 3, 3, 4]),
+                   capacity=COURSE_CAPACITIES[i % len(COURSE_CAPACITIES)],
+                   title=f'Sustainability Topics {i}', code=f'{self.prefix}-C{i:05d}'[-20:],
+                   description='Course description.')
+            for i in range(count)
+        ))
+        return self.ums_courses
+
+    def content(self, count, modules=6, lessons=4, quizzes=2, questions=8, choices=4):
+        """
+        EnvCourses with their module, lesson, quiz, question and choice tree
+        """
+        from lms.models import Choice, CourseModule, EnvCourse, LessonContent, Question, Quiz
+
+        ums_courses = getattr(self, 'ums_courses', None) or [None]
+        self.env_courses = self.bulk_create(EnvCourse, (
+            EnvCourse(title=f'Environment {i}', description='Sustainability basics.',
+                      related_ums_course=self.rng.choice(ums_courses), points_reward=100)
+            for i in range(count)
+        ))
+        self.modules = self.bulk_create(CourseModule, (
+            CourseModule(course=course, title=f'Module {i + 1}', order=i)
+            for course in self.env_courses for i in range(modules)
+        ))
+        self.bulk_create(LessonContent, (
+            LessonContent(module=module, content_type=self.rng.choice(['text', 'video']), title=f'Lesson {i + 1}',
+                          body='Lorem ipsum dolor sit amet. ' * 40)
+            for module in self.modules for i in range(lessons)
+        ))
+        self.quizzes = self.bulk_create(Quiz, (
+            Quiz(module=module, title=f'Quiz {i + 1}') for module in self.modules for i in range(quizzes)
+        ))
+        question_rows = self.bulk_create(Question, (
+            Question(quiz=quiz, text=f'Question {i + 1}?') for quiz in self.quizzes for i in range(questions)
+        ))
+        self.bulk_create(Choice, (
+            Choice(question=question, text=f'Choice {i + 1}', is_correct=(i == 0))
+            for question in question_rows for i in range(choices)
+        ))
+        self.questions_per_quiz = questions
+        return self.env_courses
+
+    def employers(self, count, jobs):
+        from careers.models import Employer, JobPosting
+
+        users = self.bulk_create(User, (
+            User(username=f'{self.prefix}-employer{i}', first_name='Employer', last_name=str(i),
+                 password=self.password)
+            for i in range(count)
+        ))
+        self.employer_profiles = self.bulk_create(Employer, (
+            Employer(user=user, company_name=f'Green Company {i}', website=f'https://company{i}.example.com',
+                     verified=self.rng.random() < 0.8)
+            for i, user in enumerate(users)
+        ))
+        self.jobs = self.bulk_create(JobPosting, (
+            JobPosting(employer=self.employer_profiles[i % count], title=f'Sustainability Analyst {i}',
+                       role=self.rng.choice(['Analyst', 'Engineer', 'Consultant', 'Researcher', 'Intern']),
+                       location=self.rng.choice(LOCATIONS), salary=self.rng.randint(200, 1500) * 100,
+                       category=self.rng.choice(JOB_CATEGORIES), description='Help us build a greener future.')
+            for i in range(jobs)
+        ))
+        return self.employer_profiles
+
+    def per_student_rows(self, enrollments=0, attempts=0, ledger=0, applications=0, workers=1, log=None):
+        """
+        Generate the large per-student tables, chunked by student.
+
+        Totals are spread evenly over the students. With ``workers`` > 1
+        chunks are generated and inserted by a process pool (not on SQLite,
+        which allows only one writer at a time).
+        """
+        student_ids = [profile.id for profile in self.student_profiles]
+        context = {
+            'seed': self.seed,
+            'using': self.using,
+            'batch_size': self.batch_size,
+            'student_count': len(student_ids),
+            'course_ids': [course.id for course in getattr(self, 'ums_courses', [])],
+            'instructor_ids': [user.id for user in self.instructors],
+            'quiz_ids': [quiz.id for quiz in getattr(self, 'quizzes', [])],
+            'questions_per_quiz': getattr(self, 'questions_per_quiz', 0),
+            'job_ids': [job.id for job in getattr(self, 'jobs', [])],
+            'totals': {
+                'enrollments': enrollments, 'attempts': attempts,
+                'ledger': ledger, 'applications': applications,
+            },
+        }
+        tasks = [
+            (context, chunk, chunk * CHUNK_STUDENTS, student_ids[chunk * CHUNK_STUDENTS:(chunk + 1) * CHUNK_STUDENTS])
+            for chunk in range((len(student_ids) + CHUNK_STUDENTS - 1) // CHUNK_STUDENTS)
+        ]
+
+        if connections[self.using].vendor == 'sqlite':
+            workers = 1
+        totals = dict.fromkeys(context['totals'], 0)
+        if workers > 1:
+            # Children open their own connections
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('fork')) as pool:
+                results = pool.map(seed_student_chunk, tasks)
+                for counts in results:
+                    self._add_counts(totals, counts, log)
+        else:
+            for task in tasks:
+                self._add_counts(totals, seed_student_chunk(task), log)
+        return totals
+
+    def _add_counts(self, totals, counts, log):
+        for key, value in counts.items():
+            totals[key] += value
+        if log is not None:
+            log(', '.join(f'{key}={value}' for key, value in totals.items()))
+
+    def derived_tables(self):
+        """
+        Rebuild what the skipped signals would have maintained
+        """
+        from careers.analytics import backfill
+        from careers.models import JobPosting
+        from careers.search import get_backend
+        from lms.gamification import compute_balances
+        from lms.models import GamificationBalance
+        from ums.gpa import recompute
+        from ums.registration import recount_seats
+
+        GamificationBalance.objects.using(self.using).all().delete()
+        self.bulk_create(GamificationBalance, (
+            GamificationBalance(student_id=student_id, total_points=points, badges=badges, event_counts=counts)
+            for student_id, (points, badges, counts) in compute_balances(using=self.using).items()
+        ))
+        backfill(chunk_size=self.batch_size, using=self.using)
+        recompute(chunk_size=self.batch_size, using=self.using)
+        recount_seats(using=self.using)
+        backend = get_backend(self.using)
+        jobs = JobPosting.objects.using(self.using).select_related('employer').order_by('id')
+        backend.index(jobs.iterator(chunk_size=self.batch_size))
+
+        # Running workers reload reference data and drop cached pages
+        for table in (reference.departments, reference.semesters, reference.job_categories):
+            table.invalidate()
+        for group in ('courses', 'env_courses', 'jobs'):
+            bump_page_version(group)
+
+
+def seed_student_chunk(task):
+    """
+    Generate and insert one chunk of per-student rows; returns row counts
+    """
+    from careers.models import Application
+    from lms.models import Attempt, GamificationLedger
+    from ums.models import Enrollment, GradeSubmission
+
+    context, chunk, first_index, student_ids = task
+    seed, using, batch_size = context['seed'], context['using'], context['batch_size']
+    count = context['student_count']
+    totals = context['totals']
+    counts = {}
+
+    def insert(model, objs):
+        return len(model.objects.using(using).bulk_create(objs, batch_size=batch_size))
+
+    courses = context['course_ids']
+    if courses and totals['enrollments']:
+        rng = chunk_rng(seed, 'enrollments', chunk)
+        enrollments, grades = [], []
+        for offset, student_id in enumerate(student_ids):
+            n = min(len(courses), spread(totals['enrollments'], first_index + offset, count))
+            for course_id in rng.sample(courses, n):
+                enrollments.append(Enrollment(student_id=student_id, course_id=course_id))
+                if rng.random() < 0.6:
+                    grades.append(GradeSubmission(student_id=student_id, course_id=course_id,
+                                                  grade=rng.choice(GRADES),
+                                                  submitted_by_id=rng.choice(context['instructor_ids'])))
+        counts['enrollments'] = insert(Enrollment, enrollments)
+        insert(GradeSubmission, grades)
+
+    quizzes = context['quiz_ids']
+    if quizzes and (totals['attempts'] or totals['ledger']):
+        rng = chunk_rng(seed, 'attempts', chunk)
+        questions = context['questions_per_quiz']
+        attempts, ledger = [], []
+        for offset, student_id in enumerate(student_ids):
+            n_attempts = spread(totals['attempts'], first_index + offset, count)
+            n_ledger = spread(totals['ledger'], first_index + offset, count)
+            for i in range(n_attempts):
+                quiz_id, score = rng.choice(quizzes), rng.randint(0, questions)
+                attempts.append(Attempt(student_id=student_id, quiz_id=quiz_id, score=score))
+                if i < n_ledger:
+                    ledger.append(GamificationLedger(
+                        student_id=student_id, event='quiz_completed', points=score * 10,
+                        badge_awarded='Quiz Whiz' if score == questions else '',
+                        payload={'quiz_id': quiz_id, 'score': score, 'total_questions': questions},
+                    ))
+            for _ in range(max(0, n_ledger - n_attempts)):
+                ledger.append(GamificationLedger(
+                    student_id=student_id, event=rng.choice(['module_finished', 'lesson_viewed']),
+                    points=rng.choice([0, 5, 20]), badge_awarded=rng.choice(BADGES) if rng.random() < 0.01 else '',
+                ))
+            # Flush as we go to bound memory on large runs
+            if len(attempts) >= batch_size:
+                counts['attempts'] = counts.get('attempts', 0) + insert(Attempt, attempts)
+                attempts = []
+            if len(ledger) >= batch_size:
+                counts['ledger'] = counts.get('ledger', 0) + insert(GamificationLedger, ledger)
+                ledger = []
+        counts['attempts'] = counts.get('attempts', 0) + insert(Attempt, attempts)
+        counts['ledger'] = counts.get('ledger', 0) + insert(GamificationLedger, ledger)
+
+    jobs = context['job_ids']
+    if jobs and totals['applications']:
+        rng = chunk_rng(seed, 'applications', chunk)
+        statuses = [status for status, _ in Application.STATUS_CHOICES]
+        applications = []
+        for offset, student_id in enumerate(student_ids):
+            n = min(len(jobs), spread(totals['applications'], first_index + offset, count))
+            for job_id in rng.sample(jobs, n):
+                applications.append(Application(job_id=job_id, student_id=student_id,
+                                                status=rng.choice(statuses), cover_letter='Hello!'))
+        counts['applications'] = insert(Application, applications)
+
+    return counts
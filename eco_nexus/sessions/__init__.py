@@ -0,0 +1,60 @@
+"""
+Session engines that only write sessions whose contents changed.
+
+``SessionMiddleware`` saves a session (and re-sends its cookie) whenever
+``session.modified`` is set, and code sets it on every assignment, even
+of a value the session already holds. These engines snapshot the session
+as it was loaded and report it modified only if its key or serialized
+contents differ from that snapshot, so a request that touches the
+session without changing it costs no write.
+
+``SESSION_BACKEND`` picks the engine (see settings):
+
+* ``eco_nexus.sessions.cached_db``: the database, read through the
+  shared cache; authenticated requests normally read no session row.
+* ``eco_nexus.sessions.db``: the database only.
+* ``eco_nexus.sessions.signed_cookies``: no server-side state at all, for
+  stateless workers; sessions cannot be revoked before they expire.
+
+The database engines delete expired sessions in batches of
+``SESSION_CLEANUP_BATCH_SIZE`` so ``manage.py clearsessions``, run
+periodically, never holds a long lock on the session table.
+"""
+from django.conf import settings
+from django.utils import timezone
+
+
+class UnchangedSessionMixin:
+    snapshot = None
+
+    @property
+    def modified(self):
+        if not self.marked_modified:
+            return False
+        if self.snapshot is None or not hasattr(self, '_session_cache'):
+            return True
+        return self.snapshot != (self.session_key, self.serializer().dumps(self._session_cache))
+
+    @modified.setter
+    def modified(self, value):
+        self.marked_modified = value
+
+    def load(self):
+        data = super().load()
+        self.snapshot = (self.session_key, self.serializer().dumps(data))
+        return data
+
+
+class BatchedCleanupMixin:
+    @classmethod
+    def clear_expired(cls):
+        model = cls.get_model_class()
+        now = timezone.now()
+        while True:
+            keys = list(
+                model.objects.filter(expire_date__lt=now)
+                .values_list('session_key', flat=True)[:settings.SESSION_CLEANUP_BATCH_SIZE]
+            )
+            if not keys:
+                break
+            model.objects.filter(session_key__in=keys).delete()
@@ -0,0 +1,7 @@
+from django.contrib.sessions.backends import cached_db
+
+from . import BatchedCleanupMixin, UnchangedSessionMixin
+
+
+class SessionStore(UnchangedSessionMixin, BatchedCleanupMixin, cached_db.SessionStore):
+    pass
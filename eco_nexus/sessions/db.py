@@ -0,0 +1,7 @@
+from django.contrib.sessions.backends import db
+
+from . import BatchedCleanupMixin, UnchangedSessionMixin
+
+
+class SessionStore(UnchangedSessionMixin, BatchedCleanupMixin, db.SessionStore):
+    pass
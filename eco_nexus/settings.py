@@ -59,15 +59,43 @@ INSTALLED_APPS = [
 TAILWIND_APP_NAME = 'theme'
 
 MIDDLEWARE = [
+    'eco_nexus.middleware.NPlusOneMiddleware',
+    'eco_nexus.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'eco_nexus.identity.IdentityMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Per-request timings (request metrics, Server-Timing header and a DEBUG
+# eco_nexus.perf log line). On by default in production; the middleware
+# removes itself when off. The header goes to staff users only unless
+# PERF_SERVER_TIMING is on.
+PERF_INSTRUMENTATION = env.bool('PERF_INSTRUMENTATION', default=not DEBUG)
+PERF_SERVER_TIMING = env.bool('PERF_SERVER_TIMING', default=False)
+
+# N+1 query detection (see eco_nexus.nplusone): 'off', 'log', 'warn' or
+# 'raise'. Set NPLUSONE_MODE=raise when running tests to fail on N+1s.
+NPLUSONE_MODE = env('NPLUSONE_MODE', default='log' if DEBUG else 'off')
+NPLUSONE_THRESHOLD = env.int('NPLUSONE_THRESHOLD', default=5)
+
+# Lazy relation loads outside a detail view's query plan (see
+# eco_nexus.detail): 'off', 'log', 'warn' or 'raise'.
+DETAIL_PLAN_MODE = env('DETAIL_PLAN_MODE', default='raise' if DEBUG else 'off')
+
+# Prometheus metrics at /metrics (see eco_nexus.metrics). Set the directory
+# to one shared by all gunicorn workers so the endpoint sums every process.
+METRICS_MULTIPROC_DIR = env('METRICS_MULTIPROC_DIR', default=None)
+METRICS_FLUSH_INTERVAL = env.float('METRICS_FLUSH_INTERVAL', default=1.0)
+# Scrapers authenticate with "Authorization: Bearer <METRICS_TOKEN>", or by
+# address. Only list addresses that are not shared with a reverse proxy.
+METRICS_TOKEN = env('METRICS_TOKEN', default='')
+METRICS_ALLOWED_IPS = env.list('METRICS_ALLOWED_IPS', default=[])
+
 ROOT_URLCONF = 'eco_nexus.urls'
 
 TEMPLATES = [
@@ -80,6 +108,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'eco_nexus.page_cache.cache_versions',
             ],
         },
     },
@@ -97,6 +126,52 @@ DATABASES = {
 }
 
 
+# Caches: a per-process L1 in front of a shared L2 (see eco_nexus.cache).
+# Point CACHE_URL at Redis or memcached in production; the file cache
+# default is shared by every process on one machine.
+CACHES = {
+    'default': {
+        'BACKEND': 'eco_nexus.cache.TieredCache',
+        'OPTIONS': {
+            'L1': 'local',
+            'L2': 'shared',
+            'L1_TIMEOUT': env.int('CACHE_L1_TIMEOUT', default=5),
+        },
+    },
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'eco-nexus-l1',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    'shared': env.cache('CACHE_URL', default=f"filecache://{BASE_DIR / '.cache'}?max_entries=20000"),
+}
+
+# Anonymous full-page cache and shared template fragments (see
+# eco_nexus.page_cache). Set PAGE_CACHE_TIMEOUT=0 to turn pages off.
+PAGE_CACHE_TIMEOUT = env.int('PAGE_CACHE_TIMEOUT', default=60)
+FRAGMENT_CACHE_TIMEOUT = env.int('FRAGMENT_CACHE_TIMEOUT', default=600)
+
+
+# Sessions (see eco_nexus.sessions): 'cached_db' reads sessions through the
+# shared cache (never the per-process L1, so a logout is seen by every
+# worker at once), 'db' uses the database only and 'signed_cookies' keeps
+# them in the cookie for stateless workers. With a database engine, run
+# `manage.py clearsessions` periodically (e.g. hourly from cron).
+SESSION_BACKEND = env('SESSION_BACKEND', default='cached_db')
+SESSION_ENGINE = f'eco_nexus.sessions.{SESSION_BACKEND}'
+SESSION_CACHE_ALIAS = 'shared'
+SESSION_CLEANUP_BATCH_SIZE = env.int('SESSION_CLEANUP_BATCH_SIZE', default=1000)
+
+
+# Session users are loaded with their student/employer profile joined in
+# (see eco_nexus.identity). ModelBackend stays listed so sessions created
+# before the switch still resolve.
+AUTHENTICATION_BACKENDS = [
+    'eco_nexus.identity.IdentityBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -139,10 +214,42 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Keyset pagination for list views that support it (see eco_nexus.pagination)
+CURSOR_PAGINATION = env.bool('CURSOR_PAGINATION', default=False)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+# Logging
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'eco_nexus.perf': {
+            'handlers': ['console'],
+            # DEBUG shows a line per request
+            'level': env('PERF_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+        'eco_nexus.nplusone': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        'eco_nexus.detail': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 # Authentication redirects
 LOGIN_URL = 'accounts:login'
 LOGIN_REDIRECT_URL = 'accounts:profile'
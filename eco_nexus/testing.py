@@ -0,0 +1,168 @@
+"""
+Seeded dataset and query-budget assertions for the per-app test suites.
+
+``seed_dataset`` bulk-loads a realistic amount of data (thousands of
+students, hundreds of courses, tens of thousands of attempts, ledger rows
+and applications) with ``eco_nexus.seeding`` and returns the users and
+objects the tests request pages for. The users the tests log in as own
+far more rows than any page shows, so a query issued per row blows the budget instead of hiding in
+a small fixture. Set ``PERF_TEST_SCALE`` to grow or shrink the dataset;
+budgets must hold at any scale.
+
+Each request also has a wall-clock ceiling, generous enough for a slow CI
+machine but not for a page that has started doing real work per row.
+``QUERY_BUDGET_TIME_SCALE`` multiplies every ceiling (``0`` turns them
+off, e.g. under a profiler or coverage).
+"""
+import os
+import time
+from types import SimpleNamespace
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .seeding import Seeder
+
+PASSWORD = 'budget-pass'
+
+
+def scaled(count, scale):
+    return max(1, int(count * scale))
+
+
+def seed_dataset(scale=None, seed=0):
+    """
+    Bulk-load the dataset and return a namespace of the objects tests use
+    """
+    from careers.models import Application, JobPosting
+    from lms.models import Attempt
+    from ums.models import Enrollment, GradeSubmission
+
+    if scale is None:
+        scale = float(os.environ.get('PERF_TEST_SCALE', '1'))
+    seeder = Seeder(seed=seed, prefix='budget', batch_size=2000, password=PASSWORD)
+    rng = seeder.rng
+
+    seeder.reference_data()
+    students = seeder.students(max(11, scaled(3000, scale)))
+    courses = seeder.courses(scaled(300, scale))
+    seeder.content(scaled(150, scale))
+    employers = seeder.employers(scaled(60, scale), scaled(360, scale))
+
+    seeder.per_student_rows(
+        enrollments=scaled(15000, scale),
+        attempts=scaled(30000, scale),
+        ledger=scaled(30000, scale),
+        applications=scaled(20000, scale),
+    )
+
+    # The users the tests log in as, with far more rows than one page shows
+    student = students[0]
+    employer = employers[0]
+    employer_jobs = JobPosting.objects.bulk_create(
+        JobPosting(employer=employer, title=f'Energy Analyst {i}', role='Analyst', location='Remote',
+                   salary=50000, category='energy', description='Green jobs')
+        for i in range(30)
+    )
+    Enrollment.objects.bulk_create(
+        [Enrollment(student=student, course=course) for course in courses[:40]], ignore_conflicts=True,
+    )
+    GradeSubmission.objects.bulk_create(
+        [GradeSubmission(student=student, course=course, grade=rng.choice(['A', 'B+', 'C']))
+         for course in courses[:40]],
+        ignore_conflicts=True,
+    )
+    attempt = Attempt.objects.create(student=student, quiz=seeder.quizzes[0], score=5)
+    Attempt.objects.bulk_create(
+        Attempt(student=student, quiz=quiz, score=rng.randint(0, 8)) for quiz in seeder.quizzes[:60]
+    )
+    Application.objects.bulk_create(
+        [Application(job=job, student=other, status='pending') for job in employer_jobs for other in students[:11]]
+        + [Application(job=job, student=student, status='reviewing') for job in seeder.jobs[:30]],
+        ignore_conflicts=True,
+    )
+
+    seeder.derived_tables()
+
+    return SimpleNamespace(
+        student_user=student.user,
+        student=student,
+        employer_user=employer.user,
+        employer=employer,
+        staff_user=seeder.instructors[0],
+        course=courses[0],
+        env_course=seeder.env_courses[0],
+        module=seeder.modules[0],
+        quiz=seeder.quizzes[0],
+        attempt=attempt,
+        job=employer_jobs[0],
+        enrollment=Enrollment.objects.filter(student=student).first(),
+        application=Application.objects.filter(student=student).exclude(status__in=['rejected', 'accepted']).first(),
+        employer_application=Application.objects.filter(job__employer=employer).first(),
+    )
+
+
+# Both cache tiers in process memory, so clearing them between tests never
+# touches a cache shared with a running server or another test run
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'eco_nexus.cache.TieredCache',
+        'OPTIONS': {'L1': 'local', 'L2': 'shared', 'L1_TIMEOUT': 5},
+    },
+    'local': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'budget-l1'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'budget-l2'},
+}
+
+
+@override_settings(NPLUSONE_MODE='raise', DETAIL_PLAN_MODE='raise', CACHES=TEST_CACHES)
+class QueryBudgetTestCase(TestCase):
+    """
+    Base class asserting per-request query and wall-clock budgets.
+
+    Budgets are fixed numbers, not functions of the data, so a page that
+    starts issuing a query per row fails here. Requests run with a cold
+    cache (the worst case), with N+1 detection and detail-view query
+    plan checks in raise mode.
+    """
+    time_limit = 5.0
+    time_scale = float(os.environ.get('QUERY_BUDGET_TIME_SCALE', '1'))
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_dataset()
+
+    def setUp(self):
+        cache.clear()
+
+    def client_for(self, user=None):
+        client = Client(SERVER_NAME='localhost')
+        if user is not None:
+            client.force_login(user)
+        return client
+
+    def assertBudget(self, url_name, queries, user=None, kwargs=None, method='get', data=None,
+                     status=200, time_limit=None):
+        """
+        Request a named URL and assert its status, query count and time
+        """
+        client = self.client_for(user)
+        url = reverse(url_name, kwargs=kwargs)
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = getattr(client, method)(url, data or {})
+            elapsed = time.perf_counter() - start
+
+        who = user.username if user is not None else 'anonymous'
+        self.assertEqual(response.status_code, status, f'{method.upper()} {url} as {who}')
+        self.assertLessEqual(
+            len(captured), queries,
+            f'{method.upper()} {url} as {who} ran {len(captured)} queries (budget {queries}):\n'
+            + '\n'.join(query['sql'] for query in captured.captured_queries),
+        )
+        if self.time_scale:
+            limit = (time_limit or self.time_limit) * self.time_scale
+            self.assertLess(elapsed, limit, f'{method.upper()} {url} as {who} took {elapsed:.2f}s (limit {limit:g}s)')
+        return response
@@ -20,10 +20,14 @@ from django.views.generic import TemplateView
 from django.conf import settings
 from django.conf.urls.static import static
 
+from .metrics import metrics_view
+from .page_cache import cache_anonymous_page
+
 urlpatterns = [
-    path('', TemplateView.as_view(template_name='landing.html'), name='home'),
+    path('', cache_anonymous_page()(TemplateView.as_view(template_name='landing.html')), name='home'),
     path('dashboard/', TemplateView.as_view(template_name='dashboard.html'), name='dashboard'),
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('accounts/', include('accounts.urls')),
     path('ums/', include('ums.urls')),
     path('lms/', include('lms.urls')),
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import EnvCourse, CourseModule, LessonContent, Quiz, Question, Choice, Attempt, GamificationLedger
+from .models import EnvCourse, CourseModule, LessonContent, Quiz, Question, Choice, Attempt, GamificationLedger, GamificationBalance
 
 
 @admin.register(EnvCourse)
@@ -63,3 +63,11 @@ class GamificationLedgerAdmin(admin.ModelAdmin):
     list_filter = ('event', 'badge_awarded', 'created_at')
     readonly_fields = ('created_at',)
     ordering = ('-created_at',)
+
+
+@admin.register(GamificationBalance)
+class GamificationBalanceAdmin(admin.ModelAdmin):
+    list_display = ('student', 'total_points', 'updated_at')
+    search_fields = ('student__user__username', 'student__student_id')
+    readonly_fields = ('student', 'total_points', 'badges', 'event_counts', 'updated_at')
+    ordering = ('-total_points',)
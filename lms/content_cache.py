@@ -0,0 +1,143 @@
+from django.core.cache import cache
+
+from eco_nexus.object_cache import ObjectCache
+
+from .models import Choice, CourseModule, EnvCourse, LessonContent, Question, Quiz
+from .outline import course_tree_queryset
+
+COURSE_TREE_TIMEOUT = 60 * 60 * 24
+
+
+class CourseTree:
+    """
+    A course's full content tree (modules, lessons, quizzes, questions and
+    choices) as prefetched model instances, with lookups by id.
+
+    Parent links (``module.course``, ``quiz.module``, ...) and child
+    managers (``module.quizzes.all()``, ``quiz.questions.all()``, ...) are
+    all served from the prefetch caches, so rendering from a tree costs no
+    queries.
+    """
+
+    def __init__(self, course):
+        self.course = course
+        self.modules = {module.id: module for module in course.outline_modules}
+        self.quizzes = {
+            quiz.id: quiz
+            for module in course.outline_modules
+            for quiz in module.quizzes.all()
+        }
+
+
+def parent_cache_key(kind, object_id):
+    return f'lms:{kind}:{object_id}:course'
+
+
+def build_course_tree(course_id):
+    course = course_tree_queryset().filter(pk=course_id).first()
+    if course is None:
+        return None
+    tree = CourseTree(course)
+    cache.set_many(
+        {
+            **{parent_cache_key('coursemodule', pk): course_id for pk in tree.modules},
+            **{parent_cache_key('quiz', pk): course_id for pk in tree.quizzes},
+        },
+        COURSE_TREE_TIMEOUT,
+    )
+    return tree
+
+
+course_trees = ObjectCache('course_tree', build_course_tree, timeout=COURSE_TREE_TIMEOUT)
+
+
+def get_course_tree(course_id):
+    """
+    Return the CourseTree for a course, or None if the course does not exist
+    """
+    return course_trees.get(course_id)
+
+
+def bump_course_version(course_id):
+    """
+    Retire the cached tree for a course once the current transaction
+    commits; readers get the old tree until it has been rebuilt
+    """
+    course_trees.invalidate(course_id)
+
+
+def _get_from_tree(model, object_id, lookup, course_id_field):
+    kind = model._meta.model_name
+    course_id = cache.get(parent_cache_key(kind, object_id))
+    if course_id is not None:
+        tree = get_course_tree(course_id)
+        if tree is not None and object_id in lookup(tree):
+            return lookup(tree)[object_id]
+    # Not indexed yet, or moved since it was: find its course in the database
+    course_id = model.objects.filter(pk=object_id).values_list(course_id_field, flat=True).first()
+    if course_id is None:
+        return None
+    tree = get_course_tree(course_id)
+    if tree is None:
+        return None
+    return lookup(tree).get(object_id)
+
+
+def get_module(module_id):
+    """
+    Return a CourseModule from its course's cached tree, or None
+    """
+    return _get_from_tree(CourseModule, module_id, lambda tree: tree.modules, 'course_id')
+
+
+def get_quiz(quiz_id):
+    """
+    Return a Quiz from its course's cached tree, or None
+    """
+    return _get_from_tree(Quiz, quiz_id, lambda tree: tree.quizzes, 'module__course_id')
+
+
+# The field linking each content model to its parent
+PARENT_FIELDS = {
+    CourseModule: 'course_id',
+    LessonContent: 'module_id',
+    Quiz: 'module_id',
+    Question: 'quiz_id',
+    Choice: 'question_id',
+}
+
+
+def course_id_for(instance, parent_id=None):
+    """
+    Resolve the EnvCourse id that owns any object in the content tree, or
+    that would own it under the parent ``parent_id``
+    """
+    if isinstance(instance, EnvCourse):
+        return instance.pk
+    attname = PARENT_FIELDS.get(instance._meta.concrete_model)
+    if attname is None:
+        return None
+    if parent_id is None:
+        parent_id = getattr(instance, attname)
+    if isinstance(instance, CourseModule):
+        return parent_id
+    if isinstance(instance, (LessonContent, Quiz)):
+        parent, path = CourseModule, 'course_id'
+    elif isinstance(instance, Question):
+        parent, path = Quiz, 'module__course_id'
+    else:
+        parent, path = Question, 'quiz__module__course_id'
+    return parent.objects.filter(pk=parent_id).values_list(path, flat=True).first()
+
+
+def previous_course_id_for(instance):
+    """
+    The EnvCourse id that owned ``instance`` before it was moved to another
+    parent, or None if it was not moved
+    """
+    attname = PARENT_FIELDS.get(instance._meta.concrete_model)
+    # DirtyFieldsMixin: the parent it was loaded with
+    saved = getattr(instance, 'saved_values', {})
+    if attname is None or saved.get(attname, getattr(instance, attname)) == getattr(instance, attname):
+        return None
+    return course_id_for(instance, saved[attname])
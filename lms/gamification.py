@@ -0,0 +1,62 @@
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from .models import GamificationBalance, GamificationLedger
+
+
+def record_event(student, event, points=0, badge='', payload=None):
+    """
+    Append a ledger entry and fold it into the student's balance.
+
+    The balance row is locked for the duration of the transaction so
+    concurrent submissions for the same student serialize on it instead
+    of overwriting each other's totals.
+    """
+    with transaction.atomic():
+        entry = GamificationLedger.objects.create(
+            student=student,
+            event=event,
+            points=points,
+            badge_awarded=badge,
+            payload=payload or {},
+        )
+        balance, _ = GamificationBalance.objects.select_for_update().get_or_create(student=student)
+        balance.apply(entry)
+        balance.save()
+    return entry, balance
+
+
+def get_balance(student):
+    """
+    Return the student's balance, or an unsaved empty one if they have
+    no ledger activity yet
+    """
+    try:
+        return GamificationBalance.objects.get(student=student)
+    except GamificationBalance.DoesNotExist:
+        return GamificationBalance(student=student)
+
+
+def compute_balances(student_ids=None, using='default'):
+    """
+    Rebuild balances from the ledger with three grouped queries.
+
+    Returns a dict of student id -> (total_points, badges, event_counts).
+    """
+    ledger = GamificationLedger.objects.using(using).order_by()
+    if student_ids is not None:
+        ledger = ledger.filter(student_id__in=student_ids)
+
+    balances = {}
+    for row in ledger.values('student_id').annotate(total=Sum('points')):
+        balances[row['student_id']] = (row['total'] or 0, [], {})
+
+    for row in ledger.values('student_id', 'event').annotate(n=Count('id')):
+        balances[row['student_id']][2][row['event']] = row['n']
+
+    badges = ledger.exclude(badge_awarded='').values_list('student_id', 'badge_awarded').order_by('created_at', 'id')
+    for student_id, badge in badges:
+        if badge not in balances[student_id][1]:
+            balances[student_id][1].append(badge)
+
+    return balances
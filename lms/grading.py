@@ -0,0 +1,110 @@
+from django.core.cache import cache
+from django.db import transaction
+
+from eco_nexus import metrics
+
+from .gamification import record_event
+from .models import Attempt, Choice, Question
+
+POINTS_PER_CORRECT_ANSWER = 10
+ANSWER_KEY_TIMEOUT = 60 * 60 * 24
+
+
+class AnswerKey:
+    """
+    Immutable snapshot of a quiz's questions and their correct choices
+    """
+    __slots__ = ('quiz_id', 'choices', 'correct')
+
+    def __init__(self, quiz_id, choices, correct):
+        self.quiz_id = quiz_id
+        # question id -> frozenset of every choice id belonging to it
+        self.choices = choices
+        # question id -> frozenset of correct choice ids
+        self.correct = correct
+
+    @property
+    def question_count(self):
+        return len(self.choices)
+
+    def grade(self, data):
+        """
+        Score submitted answers (``question_<id>`` -> choice id) in memory
+        """
+        score = 0
+        for question_id, correct in self.correct.items():
+            selected = data.get(f'question_{question_id}')
+            if not selected:
+                continue
+            try:
+                selected = int(selected)
+            except (TypeError, ValueError):
+                continue
+            if selected in correct:
+                score += 1
+        return score
+
+
+def answer_key_cache_key(quiz_id):
+    return f'lms:quiz:{quiz_id}:answer_key'
+
+
+def load_answer_key(quiz_id):
+    """
+    Build the answer key for a quiz straight from the database
+    """
+    choices = {qid: set() for qid in Question.objects.filter(quiz_id=quiz_id).values_list('id', flat=True)}
+    correct = {qid: set() for qid in choices}
+    rows = Choice.objects.filter(question__quiz_id=quiz_id).values_list('question_id', 'id', 'is_correct')
+    for question_id, choice_id, is_correct in rows:
+        choices[question_id].add(choice_id)
+        if is_correct:
+            correct[question_id].add(choice_id)
+    return AnswerKey(
+        quiz_id,
+        {qid: frozenset(ids) for qid, ids in choices.items()},
+        {qid: frozenset(ids) for qid, ids in correct.items()},
+    )
+
+
+def get_answer_key(quiz_id):
+    """
+    Return the cached answer key for a quiz, loading it on a miss
+    """
+    key = answer_key_cache_key(quiz_id)
+    answer_key = cache.get(key)
+    metrics.cache_lookup('answer_key', answer_key is not None)
+    if answer_key is None:
+        answer_key = load_answer_key(quiz_id)
+        cache.set(key, answer_key, ANSWER_KEY_TIMEOUT)
+    return answer_key
+
+
+def invalidate_answer_key(quiz_id):
+    cache.delete(answer_key_cache_key(quiz_id))
+
+
+def grade_submission(quiz, student, data):
+    """
+    Grade a quiz submission and persist the attempt and ledger entry together.
+
+    Returns ``(attempt, balance, answer_key)``.
+    """
+    answer_key = get_answer_key(quiz.id)
+    score = answer_key.grade(data)
+
+    with transaction.atomic():
+        attempt = Attempt.objects.create(quiz=quiz, student=student, score=score)
+        entry, balance = record_event(
+            student,
+            'quiz_completed',
+            points=score * POINTS_PER_CORRECT_ANSWER,
+            payload={
+                'quiz_id': quiz.id,
+                'quiz_title': quiz.title,
+                'score': score,
+                'total_questions': answer_key.question_count,
+            },
+        )
+    metrics.quiz_submissions.inc()
+    return attempt, balance, answer_key
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from lms.gamification import compute_balances
+from lms.models import GamificationBalance
+
+
+class Command(BaseCommand):
+    help = "Rebuild GamificationBalance rows from the GamificationLedger and report drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help="Only report students whose balance has drifted from the ledger; do not write",
+        )
+
+    def handle(self, *args, **options):
+        expected = compute_balances()
+        current = {b.student_id: b for b in GamificationBalance.objects.all()}
+
+        drifted = []
+        for student_id in set(expected) | set(current):
+            points, badges, event_counts = expected.get(student_id, (0, [], {}))
+            balance = current.get(student_id)
+            if balance is None:
+                if points or event_counts:
+                    drifted.append(student_id)
+                continue
+            if (balance.total_points != points
+                    or set(balance.badges) != set(badges)
+                    or balance.event_counts != event_counts):
+                drifted.append(student_id)
+
+        for student_id in sorted(drifted):
+            self.stdout.write(f"Drift for student {student_id}")
+
+        if options['check']:
+            if drifted:
+                self.stdout.write(self.style.WARNING(f"{len(drifted)} balance(s) out of sync with the ledger"))
+            else:
+                self.stdout.write(self.style.SUCCESS("All balances match the ledger"))
+            return
+
+        with transaction.atomic():
+            for student_id in drifted:
+                points, badges, event_counts = expected.get(student_id, (0, [], {}))
+                GamificationBalance.objects.update_or_create(
+                    student_id=student_id,
+                    defaults={
+                        'total_points': points,
+                        'badges': badges,
+                        'event_counts': event_counts,
+                    },
+                )
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(drifted)} balance(s)"))
@@ -1,4 +1,8 @@
 from django.db import models
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from eco_nexus.dirty_fields import DirtyFieldsMixin
 
 
 class EnvCourse(models.Model):
@@ -11,7 +15,7 @@ class EnvCourse(models.Model):
         return self.title
 
 
-class CourseModule(models.Model):
+class CourseModule(DirtyFieldsMixin, models.Model):
     course = models.ForeignKey(EnvCourse, on_delete=models.CASCADE, related_name='modules')
     title = models.CharField(max_length=200)
     order = models.PositiveIntegerField(default=0)
@@ -23,7 +27,7 @@ class CourseModule(models.Model):
         return f"{self.course.title} / {self.title}"
 
 
-class LessonContent(models.Model):
+class LessonContent(DirtyFieldsMixin, models.Model):
     module = models.ForeignKey(CourseModule, on_delete=models.CASCADE, related_name='contents')
     content_type = models.CharField(max_length=20, choices=[('video', 'Video'), ('text', 'Text')])
     title = models.CharField(max_length=200)
@@ -34,7 +38,7 @@ class LessonContent(models.Model):
         return self.title
 
 
-class Quiz(models.Model):
+class Quiz(DirtyFieldsMixin, models.Model):
     module = models.ForeignKey(CourseModule, on_delete=models.CASCADE, related_name='quizzes')
     title = models.CharField(max_length=200)
 
@@ -42,7 +46,7 @@ class Quiz(models.Model):
         return self.title
 
 
-class Question(models.Model):
+class Question(DirtyFieldsMixin, models.Model):
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='questions')
     text = models.TextField()
 
@@ -50,7 +54,7 @@ class Question(models.Model):
         return self.text[:50]
 
 
-class Choice(models.Model):
+class Choice(DirtyFieldsMixin, models.Model):
     question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='choices')
     text = models.CharField(max_length=255)
     is_correct = models.BooleanField(default=False)
@@ -82,3 +86,73 @@ class GamificationLedger(models.Model):
 
     def __str__(self):
         return f"{self.student.student_id} {self.event} +{self.points}"
+
+
+class GamificationBalance(models.Model):
+    """
+    Running totals for a student's GamificationLedger, kept in step with
+    every ledger insert so reads never have to re-sum the ledger.
+    """
+    student = models.OneToOneField('accounts.StudentProfile', on_delete=models.CASCADE, related_name='gamification_balance')
+    total_points = models.IntegerField(default=0)
+    badges = models.JSONField(default=list, blank=True)
+    event_counts = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def apply(self, entry):
+        """
+        Fold a single ledger entry into the running totals
+        """
+        self.total_points += entry.points
+        self.event_counts[entry.event] = self.event_counts.get(entry.event, 0) + 1
+        if entry.badge_awarded and entry.badge_awarded not in self.badges:
+            self.badges.append(entry.badge_awarded)
+
+    def __str__(self):
+        return f"{self.student.student_id}: {self.total_points} pts"
+
+
+@receiver([post_save, post_delete], sender=Question)
+def invalidate_answer_key_for_question(sender, instance, **kwargs):
+    from .grading import invalidate_answer_key
+    # A question moved to another quiz leaves the old quiz's key too
+    for quiz_id in {instance.quiz_id, getattr(instance, 'saved_values', {}).get('quiz_id')} - {None}:
+        invalidate_answer_key(quiz_id)
+
+
+@receiver([post_save, post_delete], sender=Choice)
+def invalidate_answer_key_for_choice(sender, instance, **kwargs):
+    from .grading import invalidate_answer_key
+    question_ids = {instance.question_id, getattr(instance, 'saved_values', {}).get('question_id')} - {None}
+    for quiz_id in Question.objects.filter(id__in=question_ids).values_list('quiz_id', flat=True).distinct():
+        invalidate_answer_key(quiz_id)
+
+
+@receiver([post_save, post_delete], sender=EnvCourse)
+@receiver([post_save, post_delete], sender=CourseModule)
+@receiver([post_save, post_delete], sender=LessonContent)
+@receiver([post_save, post_delete], sender=Quiz)
+@receiver([post_save, post_delete], sender=Question)
+@receiver([post_save, post_delete], sender=Choice)
+def invalidate_course_tree(sender, instance, **kwargs):
+    from .content_cache import bump_course_version, course_id_for, previous_course_id_for
+    # An object moved to another course leaves the old course's tree too
+    for course_id in {course_id_for(instance), previous_course_id_for(instance)} - {None}:
+        bump_course_version(course_id)
+
+
+@receiver([post_save, post_delete], sender=EnvCourse)
+@receiver([post_save, post_delete], sender=CourseModule)
+@receiver([post_save, post_delete], sender=LessonContent)
+def invalidate_course_pages(sender, **kwargs):
+    # The catalog shows module and lesson counts
+    from eco_nexus.page_cache import bump_page_version
+    bump_page_version('env_courses')
+
+
+@receiver([post_save, pre_delete], sender='ums.Course')
+def invalidate_course_trees_for_ums_course(sender, instance, **kwargs):
+    # The related UMS course is rendered as part of the tree
+    from .content_cache import bump_course_version
+    for course_id in EnvCourse.objects.filter(related_ums_course=instance).values_list('id', flat=True):
+        bump_course_version(course_id)
@@ -0,0 +1,53 @@
+from django.db.models import Count, Prefetch
+
+from .models import Choice, CourseModule, EnvCourse, LessonContent, Question, Quiz
+
+
+def annotate_course_counts(queryset):
+    """
+    Annotate an EnvCourse queryset with ``modules_count`` and ``lesson_count``
+    in the same query
+    """
+    return queryset.annotate(
+        modules_count=Count('modules', distinct=True),
+        lesson_count=Count('modules__contents'),
+    )
+
+
+def outline_modules_queryset(defer_bodies=True):
+    """
+    Modules in order, each annotated with ``quiz_count`` and carrying its
+    lessons as ``lessons`` (bodies deferred unless asked for)
+    """
+    lessons = LessonContent.objects.order_by('id')
+    if defer_bodies:
+        lessons = lessons.defer('body')
+    return (
+        CourseModule.objects
+        .annotate(quiz_count=Count('quizzes'))
+        .prefetch_related(Prefetch('contents', queryset=lessons, to_attr='lessons'))
+        .order_by('order')
+    )
+
+
+def course_outline_queryset(defer_bodies=True):
+    """
+    EnvCourse queryset that loads the whole outline (related UMS course,
+    modules, quiz counts and lessons) in three queries regardless of
+    module count. Modules land on ``outline_modules``.
+    """
+    return EnvCourse.objects.select_related('related_ums_course').prefetch_related(
+        Prefetch('modules', queryset=outline_modules_queryset(defer_bodies), to_attr='outline_modules')
+    )
+
+
+def course_tree_queryset():
+    """
+    The outline plus lesson bodies, quizzes, questions and choices: the
+    full content tree in six queries
+    """
+    return course_outline_queryset(defer_bodies=False).prefetch_related(
+        Prefetch('outline_modules__quizzes', queryset=Quiz.objects.order_by('id')),
+        Prefetch('outline_modules__quizzes__questions', queryset=Question.objects.order_by('id')),
+        Prefetch('outline_modules__quizzes__questions__choices', queryset=Choice.objects.order_by('id')),
+    )
@@ -1,3 +1,163 @@
-from django.test import TestCase
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db.models import Sum
+from django.urls import reverse
+
+from eco_nexus.testing import QueryBudgetTestCase
+
+from .gamification import compute_balances, get_balance, record_event
+from .content_cache import get_course_tree, get_module, get_quiz
+from .grading import get_answer_key
+from .models import Attempt, Choice, CourseModule, EnvCourse, GamificationBalance, GamificationLedger, Quiz
+
+
+class LmsQueryBudgetTests(QueryBudgetTestCase):
+    """
+    Query and time budgets for every lms URL
+    """
+
+    def test_course_list(self):
+        self.assertBudget('lms:course_list', 4)
+        self.assertBudget('lms:course_list', 3, user=self.data.student_user)
+        self.assertBudget('lms:course_list', 3, user=self.data.employer_user)
+
+    def test_env_course_list(self):
+        self.assertBudget('lms:env_course_list', 4)
+        self.assertBudget('lms:env_course_list', 3, user=self.data.student_user)
+
+    def test_course_detail(self):
+        kwargs = {'course_id': self.data.env_course.id}
+        self.assertBudget('lms:course_detail', 6, kwargs=kwargs)
+        self.assertBudget('lms:course_detail', 1, user=self.data.student_user, kwargs=kwargs)
+        self.assertBudget('lms:course_detail', 1, user=self.data.employer_user, kwargs=kwargs)
+
+    def test_module_detail(self):
+        kwargs = {'module_id': self.data.module.id}
+        self.assertBudget('lms:module_detail', 7, kwargs=kwargs)
+        self.assertBudget('lms:module_detail', 2, user=self.data.student_user, kwargs=kwargs)
+        self.assertBudget('lms:module_detail', 1, user=self.data.employer_user, kwargs=kwargs)
+
+    def test_quiz(self):
+        kwargs = {'quiz_id': self.data.quiz.id}
+        self.assertBudget('lms:quiz', 0, kwargs=kwargs, status=302)
+        self.assertBudget('lms:quiz', 8, user=self.data.student_user, kwargs=kwargs)
+        self.assertBudget('lms:quiz', 1, user=self.data.employer_user, kwargs=kwargs)
+
+    def test_quiz_submit(self):
+        kwargs = {'quiz_id': self.data.quiz.id}
+        self.assertBudget('lms:quiz', 0, kwargs=kwargs, method='post', status=302)
+        self.assertBudget('lms:quiz', 18, user=self.data.student_user, kwargs=kwargs, method='post', status=302)
+        self.assertBudget('lms:quiz', 1, user=self.data.employer_user, kwargs=kwargs, method='post', status=302)
+
+    def test_quiz_results(self):
+        kwargs = {'quiz_id': self.data.attempt.quiz_id, 'attempt_id': self.data.attempt.id}
+        self.assertBudget('lms:quiz_results', 0, kwargs=kwargs, status=302)
+        self.assertBudget('lms:quiz_results', 13, user=self.data.student_user, kwargs=kwargs)
+        self.assertBudget('lms:quiz_results', 1, user=self.data.employer_user, kwargs=kwargs, status=404)
+
+    def test_dashboard(self):
+        self.assertBudget('lms:dashboard', 0, status=302)
+        self.assertBudget('lms:dashboard', 4, user=self.data.student_user)
+        self.assertBudget('lms:dashboard', 1, user=self.data.employer_user)
+
+    def answers(self, quiz, correct=True):
+        return {
+            f'question_{question_id}': choice_id
+            for question_id, choice_id in Choice.objects.filter(question__quiz=quiz, is_correct=correct)
+            .values_list('question_id', 'id')
+        }
+
+    def test_balance_follows_ledger(self):
+        student = self.data.student
+        client = self.client_for(self.data.student_user)
+        for quiz, correct in ((self.data.quiz, True), (self.data.quiz, False), (self.data.attempt.quiz, True)):
+            client.post(reverse('lms:quiz', kwargs={'quiz_id': quiz.id}), self.answers(quiz, correct))
+
+        balance = get_balance(student)
+        ledger = GamificationLedger.objects.filter(student=student)
+        self.assertEqual(balance.total_points, ledger.aggregate(total=Sum('points'))['total'])
+        self.assertEqual(balance.event_counts['quiz_completed'], ledger.filter(event='quiz_completed').count())
+        self.assertEqual(
+            (balance.total_points, balance.badges, balance.event_counts), compute_balances([student.id])[student.id],
+        )
+
+    def test_badges_deduplicated(self):
+        student = self.data.student
+        before = list(get_balance(student).badges)
+        for _ in range(2):
+            record_event(student, 'course_completed', points=50, badge='Green Pioneer')
+        record_event(student, 'course_completed', points=50, badge='Carbon Cutter')
+
+        badges = get_balance(student).badges
+        self.assertEqual(badges, before + ['Green Pioneer', 'Carbon Cutter'])
+        self.assertEqual(compute_balances([student.id])[student.id][1], badges)
+
+    def test_rebuild_gamification_balances(self):
+        student = self.data.student
+        record_event(student, 'course_completed', points=50, badge='Green Pioneer')
+        expected = get_balance(student)
+        GamificationBalance.objects.filter(student=student).update(total_points=-1, badges=[])
+
+        out = StringIO()
+        call_command('rebuild_gamification_balances', '--check', stdout=out)
+        self.assertIn(f'Drift for student {student.id}', out.getvalue())
+        self.assertIn('1 balance(s) out of sync', out.getvalue())
+        # --check writes nothing
+        self.assertEqual(get_balance(student).total_points, -1)
+
+        call_command('rebuild_gamification_balances', stdout=StringIO())
+        balance = get_balance(student)
+        self.assertEqual((balance.total_points, balance.badges), (expected.total_points, expected.badges))
+
+        out = StringIO()
+        call_command('rebuild_gamification_balances', '--check', stdout=out)
+        self.assertIn('All balances match the ledger', out.getvalue())
+
+    def test_grading_uses_current_answer_key(self):
+        quiz = self.data.quiz
+        url = reverse('lms:quiz', kwargs={'quiz_id': quiz.id})
+        client = self.client_for(self.data.student_user)
+        answers = self.answers(quiz)
+        client.post(url, answers)
+        self.assertEqual(Attempt.objects.filter(quiz=quiz).latest('id').score, len(answers))
+        wrong = self.answers(quiz, correct=False)
+        client.post(url, wrong)
+        self.assertEqual(Attempt.objects.filter(quiz=quiz).latest('id').score, 0)
+
+        # Move one question's correct answer; the cached key must follow
+        question_id = next(iter(answers))
+        old = Choice.objects.get(id=answers[question_id])
+        new = Choice.objects.get(id=wrong[question_id])
+        old.is_correct, new.is_correct = False, True
+        old.save()
+        new.save()
+        self.assertIn(new.id, get_answer_key(quiz.id).correct[new.question_id])
+
+        client.post(url, answers)
+        self.assertEqual(Attempt.objects.filter(quiz=quiz).latest('id').score, len(answers) - 1)
+        client.post(url, wrong)
+        self.assertEqual(Attempt.objects.filter(quiz=quiz).latest('id').score, 1)
+
+    def test_moved_content_leaves_old_course_tree(self):
+        source = self.data.env_course
+        target = EnvCourse.objects.exclude(pk=source.pk).first()
+        module = CourseModule.objects.filter(course=source).first()
+        quiz = Quiz.objects.filter(module__course=source).exclude(module=module).first()
+        target_module = CourseModule.objects.filter(course=target).first()
+        # Both trees cached
+        self.assertIn(module.id, get_course_tree(source.id).modules)
+        self.assertNotIn(module.id, get_course_tree(target.id).modules)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            module.course = target
+            module.save()
+            quiz.module = target_module
+            quiz.save()
+
+        self.assertNotIn(module.id, get_course_tree(source.id).modules)
+        self.assertIn(module.id, get_course_tree(target.id).modules)
+        self.assertNotIn(quiz.id, get_course_tree(source.id).quizzes)
+        self.assertIn(quiz.id, get_course_tree(target.id).quizzes)
+        self.assertEqual(get_module(module.id).course_id, target.id)
+        self.assertEqual(get_quiz(quiz.id).module_id, target_module.id)
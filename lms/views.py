@@ -1,18 +1,23 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.views.generic import ListView, DetailView, FormView, TemplateView
+from django.http import Http404
+from django.views.generic import ListView, FormView, TemplateView
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from django.contrib import messages
 from django.db import models
 
-from .models import (
-    EnvCourse, CourseModule, LessonContent, Quiz, Question, 
-    Choice, Attempt, GamificationLedger
-)
-from accounts.models import StudentProfile
+from .models import EnvCourse, CourseModule, Quiz, Question, Attempt
+from eco_nexus.detail import PlannedDetailView
+from eco_nexus.page_cache import cache_anonymous_page
+from eco_nexus.pagination import CursorPaginationMixin, estimate_count
+from .gamification import get_balance
+from .grading import POINTS_PER_CORRECT_ANSWER, grade_submission
+from .outline import annotate_course_counts
+from .content_cache import get_course_tree, get_module, get_quiz
 
 
-class EnvCourseListView(ListView):
+@method_decorator(cache_anonymous_page('env_courses'), name='dispatch')
+class EnvCourseListView(CursorPaginationMixin, ListView):
     """
     Display all available environmental courses
     """
@@ -20,17 +25,18 @@ class EnvCourseListView(ListView):
     template_name = 'lms/course_list.html'
     context_object_name = 'courses'
     paginate_by = 12
+    cursor_ordering = ('-id',)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
         # Check which courses user is enrolled in (for future enhancement)
-        context['total_courses'] = EnvCourse.objects.count()
+        context['total_courses'] = estimate_count(EnvCourse)
         
         return context
 
     def get_queryset(self):
-        queryset = EnvCourse.objects.prefetch_related('modules')
+        queryset = annotate_course_counts(EnvCourse.objects.all())
         
         # Search by title or description
         search = self.request.GET.get('search')
@@ -43,7 +49,7 @@ class EnvCourseListView(ListView):
         return queryset.order_by('-id')
 
 
-class EnvCourseDetailView(DetailView):
+class EnvCourseDetailView(PlannedDetailView):
     """
     Display detailed information about an environmental course
     """
@@ -52,19 +58,23 @@ class EnvCourseDetailView(DetailView):
     context_object_name = 'course'
     pk_url_kwarg = 'course_id'
 
+    def load_object(self, queryset=None):
+        # Served from the versioned course-tree cache
+        tree = get_course_tree(self.kwargs[self.pk_url_kwarg])
+        if tree is None:
+            raise Http404("Course not found.")
+        return tree.course
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        course = self.get_object()
+        course = self.object
         
         # Get all modules for this course
-        context['modules'] = course.modules.all().order_by('order')
-        context['modules_count'] = context['modules'].count()
+        context['modules'] = course.outline_modules
+        context['modules_count'] = len(course.outline_modules)
         
         # Get total lessons
-        lesson_count = 0
-        for module in context['modules']:
-            lesson_count += module.contents.count()
-        context['lesson_count'] = lesson_count
+        context['lesson_count'] = sum(len(module.lessons) for module in course.outline_modules)
         
         # Get related UMS course if exists
         if course.related_ums_course:
@@ -73,7 +83,7 @@ class EnvCourseDetailView(DetailView):
         return context
 
 
-class CourseModuleDetailView(DetailView):
+class CourseModuleDetailView(PlannedDetailView):
     """
     Display module content and lessons
     """
@@ -82,12 +92,19 @@ class CourseModuleDetailView(DetailView):
     context_object_name = 'module'
     pk_url_kwarg = 'module_id'
 
+    def load_object(self, queryset=None):
+        # Served from the versioned course-tree cache
+        module = get_module(self.kwargs[self.pk_url_kwarg])
+        if module is None:
+            raise Http404("Module not found.")
+        return module
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        module = self.get_object()
+        module = self.object
         
         # Get all lesson content for this module
-        context['lessons'] = module.contents.all().order_by('id')
+        context['lessons'] = module.lessons
         
         # Get all quizzes for this module
         context['quizzes'] = module.quizzes.all()
@@ -96,25 +113,22 @@ class CourseModuleDetailView(DetailView):
         context['course'] = module.course
         
         # Check user progress if authenticated
-        if self.request.user.is_authenticated:
-            try:
-                student_profile = self.request.user.student_profile
-                context['student_profile'] = student_profile
-                
-                # Check completed quizzes
-                completed_quizzes = Attempt.objects.filter(
-                    student=student_profile,
-                    quiz__module=module
-                ).values_list('quiz_id', flat=True)
-                context['completed_quiz_ids'] = list(completed_quizzes)
-            except StudentProfile.DoesNotExist:
-                pass
+        student_profile = self.request.identity.student
+        if student_profile is not None:
+            context['student_profile'] = student_profile
+            
+            # Check completed quizzes
+            completed_quizzes = Attempt.objects.filter(
+                student=student_profile,
+                quiz__module=module
+            ).values_list('quiz_id', flat=True)
+            context['completed_quiz_ids'] = list(completed_quizzes)
         
         return context
 
 
 @method_decorator(login_required, name='dispatch')
-class QuizView(DetailView):
+class QuizView(PlannedDetailView):
     """
     Display quiz questions for the student to answer
     """
@@ -123,13 +137,20 @@ class QuizView(DetailView):
     context_object_name = 'quiz'
     pk_url_kwarg = 'quiz_id'
 
+    def load_object(self, queryset=None):
+        # Served from the versioned course-tree cache
+        quiz = get_quiz(self.kwargs[self.pk_url_kwarg])
+        if quiz is None:
+            raise Http404("Quiz not found.")
+        return quiz
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        quiz = self.get_object()
+        quiz = self.object
         
         # Get all questions with their choices
-        context['questions'] = quiz.questions.all().prefetch_related('choices')
-        context['questions_count'] = context['questions'].count()
+        context['questions'] = quiz.questions.all()
+        context['questions_count'] = len(context['questions'])
         
         # Get parent module and course
         context['module'] = quiz.module
@@ -143,60 +164,16 @@ class QuizView(DetailView):
         """
         quiz = self.get_object()
         
-        try:
-            student_profile = request.user.student_profile
-        except StudentProfile.DoesNotExist:
+        student_profile = request.identity.student
+        if student_profile is None:
             messages.error(request, "Student profile not found.")
             return redirect('lms:course_list')
         
-        # Calculate score
-        score = 0
-        submitted_answers = {}
+        # Grade against the cached answer key and persist in one transaction
+        attempt, balance, answer_key = grade_submission(quiz, student_profile, request.POST)
+        points_earned = attempt.score * POINTS_PER_CORRECT_ANSWER
         
-        questions = quiz.questions.all()
-        for question in questions:
-            selected_choice_id = request.POST.get(f'question_{question.id}')
-            
-            if selected_choice_id:
-                try:
-                    choice = Choice.objects.get(id=selected_choice_id, question=question)
-                    submitted_answers[question.id] = {
-                        'choice': choice,
-                        'is_correct': choice.is_correct
-                    }
-                    
-                    if choice.is_correct:
-                        score += 1
-                except Choice.DoesNotExist:
-                    pass
-        
-        # Create attempt record
-        attempt = Attempt.objects.create(
-            quiz=quiz,
-            student=student_profile,
-            score=score
-        )
-        
-        # Create gamification entry
-        points_earned = score * 10  # 10 points per correct answer
-        GamificationLedger.objects.create(
-            student=student_profile,
-            event='quiz_completed',
-            points=points_earned,
-            payload={
-                'quiz_id': quiz.id,
-                'quiz_title': quiz.title,
-                'score': score,
-                'total_questions': questions.count()
-            }
-        )
-        
-        # Update student gamification points
-        total_points = GamificationLedger.objects.filter(
-            student=student_profile
-        ).aggregate(models.Sum('points'))['points__sum'] or 0
-        
-        messages.success(request, f"Quiz completed! You scored {score}/{questions.count()}. +{points_earned} points!")
+        messages.success(request, f"Quiz completed! You scored {attempt.score}/{answer_key.question_count}. +{points_earned} points! Total: {balance.total_points}")
         
         return redirect('lms:quiz_results', quiz_id=quiz.id, attempt_id=attempt.id)
 
@@ -214,13 +191,14 @@ class QuizResultsView(TemplateView):
         quiz_id = self.kwargs.get('quiz_id')
         attempt_id = self.kwargs.get('attempt_id')
         
-        try:
-            student_profile = self.request.user.student_profile
-        except StudentProfile.DoesNotExist:
-            return context
+        student_profile = self.request.identity.student
+        if student_profile is None:
+            raise Http404("Student profile not found.")
         
-        # Get quiz and attempt
-        quiz = get_object_or_404(Quiz, id=quiz_id)
+        # Get quiz (from the course-tree cache) and attempt
+        quiz = get_quiz(quiz_id)
+        if quiz is None:
+            raise Http404("Quiz not found.")
         attempt = get_object_or_404(Attempt, id=attempt_id, student=student_profile, quiz=quiz)
         
         context['quiz'] = quiz
@@ -229,12 +207,13 @@ class QuizResultsView(TemplateView):
         context['course'] = quiz.module.course
         
         # Calculate percentage
-        total_questions = quiz.questions.count()
+        total_questions = len(quiz.questions.all())
         context['percentage'] = (attempt.score / total_questions * 100) if total_questions > 0 else 0
         context['total_questions'] = total_questions
+        context['total_points'] = get_balance(student_profile).total_points
         
         # Get all questions with correct answers
-        context['questions'] = quiz.questions.all().prefetch_related('choices')
+        context['questions'] = quiz.questions.all()
         
         # Get all attempts for this quiz by this student
         context['all_attempts'] = Attempt.objects.filter(
@@ -255,9 +234,8 @@ class StudentDashboardView(TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        try:
-            student_profile = self.request.user.student_profile
-        except StudentProfile.DoesNotExist:
+        student_profile = self.request.identity.student
+        if student_profile is None:
             return context
         
         context['student_profile'] = student_profile
@@ -265,32 +243,25 @@ class StudentDashboardView(TemplateView):
         # Get all quiz attempts
         attempts = Attempt.objects.filter(student=student_profile).order_by('-taken_on')
         context['recent_attempts'] = attempts[:10]
-        context['total_attempts'] = attempts.count()
-        
-        # Calculate total points and badges
-        gamification_entries = GamificationLedger.objects.filter(student=student_profile)
-        context['total_points'] = gamification_entries.aggregate(
-            models.Sum('points')
-        )['points__sum'] or 0
+        summary = attempts.aggregate(total=models.Count('id'), average=models.Avg('score'))
+        context['total_attempts'] = summary['total']
         
-        # Get unique badges
-        badges = gamification_entries.filter(
-            badge_awarded__isnull=False
-        ).values_list('badge_awarded', flat=True).distinct()
-        context['badges'] = list(badges)
-        context['badges_count'] = len(context['badges'])
+        # Points and badges come from the materialized balance
+        balance = get_balance(student_profile)
+        context['total_points'] = balance.total_points
+        context['badges'] = balance.badges
+        context['badges_count'] = len(balance.badges)
         
         # Calculate average quiz score
-        if attempts.exists():
-            avg_score = sum(a.score for a in attempts) / attempts.count()
-            context['average_score'] = round(avg_score, 2)
-        else:
-            context['average_score'] = 0
+        context['average_score'] = round(summary['average'] or 0, 2)
         
         # Get quiz statistics
+        question_counts = Question.objects.filter(quiz=models.OuterRef('quiz')).values('quiz').annotate(
+            n=models.Count('id')
+        ).values('n')
         context['quiz_stats'] = {
-            'total_completed': attempts.count(),
-            'perfect_scores': attempts.filter(score=models.F('quiz__questions__count')).count(),
+            'total_completed': summary['total'],
+            'perfect_scores': attempts.filter(score=models.Subquery(question_counts)).count(),
         }
         
         return context
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Department, Semester, Course, Enrollment, GradeSubmission
+from django.db.models import F
+
+from .models import Department, Semester, Course, Enrollment, GradeSubmission, WaitlistEntry
 
 @admin.register(Department)
 class DepartmentAdmin(admin.ModelAdmin):
@@ -13,7 +15,7 @@ class SemesterAdmin(admin.ModelAdmin):
 
 @admin.register(Course)
 class CourseAdmin(admin.ModelAdmin):
-    list_display = ("code", "title", "department", "semester", "credits", "instructor")
+    list_display = ("code", "title", "department", "semester", "credits", "instructor", "enrolled_count", "capacity")
     search_fields = ("code", "title")
     list_filter = ("department", "semester")
 
@@ -22,6 +24,22 @@ class EnrollmentAdmin(admin.ModelAdmin):
     list_display = ("student", "course", "enrolled_on")
     list_filter = ("course",)
 
+    def get_readonly_fields(self, request, obj=None):
+        # Moving an enrollment would leave both courses' seat counts wrong
+        return ("student", "course") if obj is not None else ()
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if not change:
+            # Registrar enrollments take a seat regardless of capacity;
+            # deletes give it back through the post_delete receiver
+            Course.objects.filter(pk=obj.course_id).update(enrolled_count=F("enrolled_count") + 1)
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ("course", "student", "joined_at")
+    list_filter = ("course",)
+
 @admin.register(GradeSubmission)
 class GradeSubmissionAdmin(admin.ModelAdmin):
     list_display = ("course", "student", "grade", "submitted_by", "submitted_on")
@@ -0,0 +1,29 @@
+from eco_nexus.detail import QueryPlan
+from eco_nexus.object_cache import ObjectCache
+
+from .models import Course
+
+COURSE_CACHE_TIMEOUT = 60 * 10
+
+# What the course detail page reads from a course
+COURSE_PLAN = QueryPlan(select_related=('department', 'semester'))
+
+
+def build_course(course_id):
+    return COURSE_PLAN.apply(Course.objects).filter(pk=course_id).first()
+
+
+courses = ObjectCache('course', build_course, timeout=COURSE_CACHE_TIMEOUT)
+
+
+def get_course(course_id):
+    """
+    Return a Course with its department and semester from the object
+    cache, or None
+    """
+    return courses.get(course_id)
+
+
+def invalidate_courses(course_ids):
+    for course_id in course_ids:
+        courses.invalidate(course_id)
@@ -1,4 +1,8 @@
 from django import forms
+
+from eco_nexus import reference
+from eco_nexus.reference import ReferenceChoiceField
+from .grade_sheets import SHEET_EXTENSIONS, GradeSheetError, read_sheet
 from .models import Enrollment, GradeSubmission
 
 
@@ -64,6 +68,31 @@ class GradeSubmissionForm(forms.ModelForm):
         return grade
 
 
+class GradeSheetForm(forms.Form):
+    """
+    Form for instructors to upload a course's grades in one sheet
+    """
+    sheet = forms.FileField(
+        label='Grade sheet',
+        help_text='CSV or XLSX with student_id and grade columns',
+        widget=forms.ClearableFileInput(attrs={
+            'class': 'form-control',
+            'accept': ','.join(SHEET_EXTENSIONS),
+        })
+    )
+
+    def clean_sheet(self):
+        """
+        Parse the upload; ``rows`` holds its ``(line, row)`` pairs
+        """
+        sheet = self.cleaned_data['sheet']
+        try:
+            self.rows = read_sheet(sheet, sheet.name)
+        except GradeSheetError as e:
+            raise forms.ValidationError(str(e))
+        return sheet
+
+
 class CourseFilterForm(forms.Form):
     """
     Form for filtering courses
@@ -81,16 +110,9 @@ class CourseFilterForm(forms.Form):
         })
     )
     
-    department = forms.ModelChoiceField(
-        queryset=None,
+    department = ReferenceChoiceField(
+        reference.departments,
         required=False,
         label='Department',
         widget=forms.Select(attrs={'class': 'form-control'})
     )
-    
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        
-        # Import here to avoid circular imports
-        from .models import Department
-        self.fields['department'].queryset = Department.objects.all()
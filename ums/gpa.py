@@ -0,0 +1,170 @@
+"""
+GPA engine: letter grades weighted by course credits.
+
+Each graded course adds ``credits`` and ``points * credits`` quality
+points to the student's ``SemesterGPA`` row for the course's semester; a
+GPA is quality points over credits. Saving or deleting one grade moves
+those totals by the difference (``apply_grade_change``) and refreshes
+``StudentProfile.gpa`` from the student's few semester rows, so a grade
+never causes a rescan of GradeSubmission. ``recompute`` rebuilds
+everything from GradeSubmission a chunk of students at a time.
+
+Letters not in ``GRADE_POINTS`` (pass/fail, withdrawals, incompletes)
+carry no credits and do not count.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F, Sum
+
+from accounts.models import StudentProfile
+
+from .models import Course, GradeSubmission, SemesterGPA
+
+GRADE_POINTS = {
+    'A+': Decimal('4.0'), 'A': Decimal('4.0'), 'A-': Decimal('3.7'),
+    'B+': Decimal('3.3'), 'B': Decimal('3.0'), 'B-': Decimal('2.7'),
+    'C+': Decimal('2.3'), 'C': Decimal('2.0'), 'C-': Decimal('1.7'),
+    'D+': Decimal('1.3'), 'D': Decimal('1.0'), 'D-': Decimal('0.7'),
+    'F': Decimal('0.0'),
+}
+
+GPA_PLACES = Decimal('0.01')
+
+
+def gpa_from(quality_points, credits):
+    if not credits:
+        return None
+    return (Decimal(quality_points) / credits).quantize(GPA_PLACES)
+
+
+def apply_grade_change(student_id, before, after):
+    """
+    Fold one grade change into the student's GPAs.
+
+    ``before`` and ``after`` are the submission's ``(course_id, grade)``
+    before and after the change, None when it did not or no longer exists.
+    """
+    course_ids = {state[0] for state in (before, after) if state is not None and state[1] in GRADE_POINTS}
+    if not course_ids:
+        return
+    courses = dict(
+        (pk, (semester_id, credits))
+        for pk, semester_id, credits in Course.objects.filter(pk__in=course_ids).values_list('pk', 'semester_id', 'credits')
+    )
+
+    deltas = defaultdict(lambda: [0, Decimal(0)])
+    for sign, state in ((-1, before), (1, after)):
+        if state is None or state[0] not in courses or state[1] not in GRADE_POINTS:
+            continue
+        semester_id, credits = courses[state[0]]
+        deltas[semester_id][0] += sign * credits
+        deltas[semester_id][1] += sign * credits * GRADE_POINTS[state[1]]
+
+    with transaction.atomic():
+        for semester_id, (credits, quality_points) in deltas.items():
+            if credits or quality_points:
+                increment(student_id, semester_id, credits, quality_points)
+        totals = SemesterGPA.objects.filter(student_id=student_id).aggregate(
+            credits=Sum('credits'), quality_points=Sum('quality_points'),
+        )
+        StudentProfile.objects.filter(pk=student_id).update(
+            gpa=gpa_from(totals['quality_points'] or 0, totals['credits'])
+        )
+
+
+def increment(student_id, semester_id, credits, quality_points):
+    """
+    Add to one SemesterGPA row, creating it if needed
+    """
+    key = {'student_id': student_id, 'semester_id': semester_id}
+    updates = {'credits': F('credits') + credits, 'quality_points': F('quality_points') + quality_points}
+    if SemesterGPA.objects.filter(**key).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            SemesterGPA.objects.create(**key, credits=credits, quality_points=quality_points)
+    except IntegrityError:
+        # Another request created the row first
+        SemesterGPA.objects.filter(**key).update(**updates)
+
+
+def semester_totals(first_id, last_id, student_ids=None, using='default'):
+    """
+    Credits and quality points per (student, semester) for the students
+    with ids in ``first_id..last_id``, from one grouped query
+    """
+    grades = GradeSubmission.objects.using(using).filter(
+        student_id__gte=first_id, student_id__lte=last_id, grade__in=list(GRADE_POINTS),
+    )
+    if student_ids is not None:
+        grades = grades.filter(student_id__in=student_ids)
+    rows = (
+        grades.order_by()
+        .values_list('student_id', 'course__semester_id', 'grade')
+        .annotate(credits=Sum('course__credits'))
+    )
+    totals = defaultdict(lambda: [0, Decimal(0)])
+    for student_id, semester_id, grade, credits in rows:
+        semester = totals[(student_id, semester_id)]
+        semester[0] += credits
+        semester[1] += credits * GRADE_POINTS[grade]
+    return totals
+
+
+def recompute(chunk_size=5000, student_ids=None, using='default'):
+    """
+    Rebuild SemesterGPA rows and ``StudentProfile.gpa`` from GradeSubmission
+    for every student (or just ``student_ids``), ``chunk_size`` students at
+    a time: one grouped query and a few batched writes per chunk, so memory
+    stays bounded however many students there are.
+
+    Returns the number of students recomputed.
+    """
+    students = StudentProfile.objects.using(using).order_by('pk')
+    if student_ids is not None:
+        student_ids = set(student_ids)
+        if not student_ids:
+            return 0
+        students = students.filter(pk__in=student_ids)
+
+    count = 0
+    last_id = 0
+    while True:
+        chunk = list(students.filter(pk__gt=last_id).values_list('pk', flat=True)[:chunk_size])
+        if not chunk:
+            return count
+        first_id, last_id = chunk[0], chunk[-1]
+        count += len(chunk)
+
+        totals = semester_totals(first_id, last_id, student_ids, using=using)
+        overall = defaultdict(lambda: [0, Decimal(0)])
+        for (student_id, _), (credits, quality_points) in totals.items():
+            overall[student_id][0] += credits
+            overall[student_id][1] += quality_points
+
+        with transaction.atomic(using=using):
+            SemesterGPA.objects.using(using).filter(student_id__in=chunk).delete()
+            write_chunk(
+                [(student_id, semester_id, credits, quality_points)
+                 for (student_id, semester_id), (credits, quality_points) in totals.items()],
+                [(gpa_from(overall[student_id][1], overall[student_id][0]), student_id) for student_id in chunk],
+                using=using,
+            )
+
+
+def write_chunk(semester_rows, profile_rows, using='default'):
+    # Plain executemany: bulk_create and bulk_update spend most of a
+    # recompute building their SQL rather than running it
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    semester_table = quote(SemesterGPA._meta.db_table)
+    profile_table = quote(StudentProfile._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {semester_table} (student_id, semester_id, credits, quality_points) '
+            f'VALUES (%s, %s, %s, %s)',
+            semester_rows,
+        )
+        cursor.executemany(f'UPDATE {profile_table} SET gpa = %s WHERE id = %s', profile_rows)
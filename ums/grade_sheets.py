@@ -0,0 +1,165 @@
+"""
+Grade-sheet import: a whole course's grades from one CSV or XLSX file.
+
+A sheet has a header row with ``student_id`` and ``grade`` columns (any
+order, case-insensitive; other columns are ignored). Every row is checked
+before anything is written, against two queries: the students' profiles
+and their enrollments in the course. A sheet with any bad row imports
+nothing and reports every problem by line number; a clean sheet is
+upserted with ``bulk_create(update_conflicts=True)`` in one transaction
+and the affected students' GPAs are recomputed in one batch.
+
+Reading XLSX files needs openpyxl.
+"""
+import csv
+import io
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import StudentProfile
+
+from .gpa import GRADE_POINTS, recompute
+from .models import Enrollment, GradeSubmission
+
+# Grades without points: pass, no pass, withdrawn, incomplete
+UNGRADED = ('P', 'NP', 'W', 'I')
+GRADES = (*GRADE_POINTS, *UNGRADED)
+
+COLUMNS = ('student_id', 'grade')
+SHEET_EXTENSIONS = ('.csv', '.xlsx')
+
+
+class GradeSheetError(ValueError):
+    """
+    The file cannot be read as a grade sheet at all
+    """
+
+
+@dataclass
+class GradeSheetResult:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    errors: list = field(default_factory=list)
+
+    @property
+    def ok(self):
+        return not self.errors
+
+
+def read_sheet(file, name):
+    """
+    Read an uploaded sheet into a list of ``(line, row)`` pairs, where
+    ``row`` maps lower-cased column names to stripped strings
+    """
+    name = name.lower()
+    if name.endswith('.csv'):
+        rows = read_csv(file)
+    elif name.endswith('.xlsx'):
+        rows = read_xlsx(file)
+    else:
+        raise GradeSheetError(f"Grade sheets must be {' or '.join(SHEET_EXTENSIONS)} files")
+
+    if not rows:
+        raise GradeSheetError("The grade sheet is empty")
+    header = [str(column or '').strip().lower() for column in rows[0]]
+    missing = [column for column in COLUMNS if column not in header]
+    if missing:
+        raise GradeSheetError(f"The grade sheet has no {', '.join(missing)} column")
+
+    sheet = []
+    for line, values in enumerate(rows[1:], start=2):
+        row = {column: '' if value is None else str(value).strip() for column, value in zip(header, values)}
+        row = {column: row.get(column, '') for column in COLUMNS}
+        if any(row.values()):
+            sheet.append((line, row))
+    return sheet
+
+
+def read_csv(file):
+    try:
+        text = file.read().decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise GradeSheetError("CSV grade sheets must be UTF-8 encoded")
+    return list(csv.reader(io.StringIO(text)))
+
+
+def read_xlsx(file):
+    try:
+        import openpyxl
+    except ImportError:
+        raise GradeSheetError("Reading .xlsx grade sheets needs openpyxl; upload a .csv file instead")
+    try:
+        workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+        try:
+            return list(workbook.active.iter_rows(values_only=True))
+        finally:
+            workbook.close()
+    except Exception as e:
+        raise GradeSheetError(f"Cannot read the workbook: {e}")
+
+
+def import_grades(course, rows, submitted_by=None, batch_size=1000):
+    """
+    Validate the ``(line, row)`` pairs from ``read_sheet`` and, if all
+    are valid, upsert them as ``course``'s grades.
+
+    Returns a GradeSheetResult; its ``errors`` list ``(line, message)``
+    pairs, and nothing is written when there are any.
+    """
+    result = GradeSheetResult()
+    student_ids = {row['student_id'] for _, row in rows}
+    profiles = dict(
+        StudentProfile.objects.filter(student_id__in=student_ids).values_list('student_id', 'pk')
+    )
+    enrolled = set(
+        Enrollment.objects.filter(course=course, student_id__in=profiles.values()).values_list('student_id', flat=True)
+    )
+
+    grades = {}
+    seen = {}
+    for line, row in rows:
+        student_id, grade = row['student_id'], row['grade'].upper()
+        if not student_id:
+            result.errors.append((line, "Missing student ID"))
+        elif student_id in seen:
+            result.errors.append((line, f"Student {student_id} is already graded on line {seen[student_id]}"))
+        elif student_id not in profiles:
+            result.errors.append((line, f"Unknown student ID {student_id}"))
+        elif profiles[student_id] not in enrolled:
+            result.errors.append((line, f"Student {student_id} is not enrolled in {course.code}"))
+        elif grade not in GRADES:
+            result.errors.append((line, f"Invalid grade {row['grade']!r}; expected one of {', '.join(GRADES)}"))
+        else:
+            grades[profiles[student_id]] = grade
+        seen.setdefault(student_id, line)
+    if result.errors:
+        return result
+
+    existing = dict(
+        GradeSubmission.objects.filter(course=course, student_id__in=grades).values_list('student_id', 'grade')
+    )
+    changed = {pk: grade for pk, grade in grades.items() if existing.get(pk) != grade}
+    result.created = sum(1 for pk in changed if pk not in existing)
+    result.updated = len(changed) - result.created
+    result.unchanged = len(grades) - len(changed)
+    if not changed:
+        return result
+
+    now = timezone.now()
+    with transaction.atomic():
+        # Bulk writes skip the per-grade GPA signals; one recompute covers them
+        GradeSubmission.objects.bulk_create(
+            [
+                GradeSubmission(course=course, student_id=pk, grade=grade, submitted_by=submitted_by, submitted_on=now)
+                for pk, grade in changed.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['course', 'student'],
+            update_fields=['grade', 'submitted_by', 'submitted_on'],
+            batch_size=batch_size,
+        )
+        recompute(student_ids=changed)
+    return result
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import StudentProfile
+from ums.models import Course
+from ums.registration import enroll_cohort
+
+
+class Command(BaseCommand):
+    help = (
+        "Enroll a cohort of students in a course in batched statements, skipping students already enrolled. "
+        "Select the cohort by department, semester and/or explicit student IDs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('course', help="Code of the course to enroll the cohort in")
+        parser.add_argument('--department', default=None, help="Only students in the department with this code")
+        parser.add_argument('--semester', default=None, help="Only students in the semester with this name")
+        parser.add_argument('--student-id', action='append', dest='student_ids', default=None,
+                            help="Student ID to enroll; repeat for several")
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Number of enrollments written per statement (default: 1000)",
+        )
+
+    def handle(self, *args, **options):
+        if not (options['department'] or options['semester'] or options['student_ids']):
+            raise CommandError("Select the cohort with --department, --semester or --student-id")
+        try:
+            course = Course.objects.get(code=options['course'])
+        except Course.DoesNotExist:
+            raise CommandError(f"No course with code {options['course']}")
+
+        students = StudentProfile.objects.order_by('pk')
+        if options['department']:
+            students = students.filter(department__code=options['department'])
+        if options['semester']:
+            students = students.filter(semester__name=options['semester'])
+        if options['student_ids']:
+            students = students.filter(student_id__in=options['student_ids'])
+        student_ids = list(students.values_list('pk', flat=True))
+
+        created = enroll_cohort(course, student_ids, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Enrolled {created} of {len(student_ids)} student(s) in {course.code}; "
+            f"{len(student_ids) - created} were already enrolled"
+        ))
@@ -0,0 +1,53 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from ums.grade_sheets import GradeSheetError, import_grades, read_sheet
+from ums.models import Course
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a course's grades from a CSV or XLSX sheet with student_id and grade columns. "
+        "Nothing is imported unless every row is valid."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Grade sheet (.csv or .xlsx)")
+        parser.add_argument('--course', required=True, help="Code of the course being graded")
+        parser.add_argument('--submitted-by', default=None, help="Username to record as the grader")
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Number of grades written per statement (default: 1000)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            course = Course.objects.get(code=options['course'])
+        except Course.DoesNotExist:
+            raise CommandError(f"No course with code {options['course']}")
+        submitted_by = None
+        if options['submitted_by']:
+            try:
+                submitted_by = User.objects.get(username=options['submitted_by'])
+            except User.DoesNotExist:
+                raise CommandError(f"No user named {options['submitted_by']}")
+
+        try:
+            with open(options['path'], 'rb') as f:
+                rows = read_sheet(f, options['path'])
+        except OSError as e:
+            raise CommandError(f"Cannot read {options['path']}: {e}")
+        except GradeSheetError as e:
+            raise CommandError(str(e))
+
+        result = import_grades(course, rows, submitted_by=submitted_by, batch_size=options['batch_size'])
+        if not result.ok:
+            for line, message in result.errors:
+                self.stderr.write(f"Line {line}: {message}")
+            raise CommandError(f"{len(result.errors)} invalid row(s); no grades were imported")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported grades for {course.code}: {result.created} new, {result.updated} updated, "
+            f"{result.unchanged} unchanged"
+        ))
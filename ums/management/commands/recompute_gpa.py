@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ums.gpa import recompute
+
+
+class Command(BaseCommand):
+    help = "Rebuild every student's semester and cumulative GPA from their grade submissions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help="Number of students to recompute per chunk (default: 5000)",
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+        count = recompute(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Recomputed GPAs for {count} student(s)"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from ums.registration import recount_seats
+
+
+class Command(BaseCommand):
+    help = "Reset every course's enrolled_count from its enrollments, e.g. after a bulk load"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help="Database alias (default: default)")
+
+    def handle(self, *args, **options):
+        count = recount_seats(using=options['database'])
+        self.stdout.write(self.style.SUCCESS(f"Recounted seats for {count} course(s)"))
@@ -1,5 +1,11 @@
+import threading
+
 from django.db import models
 from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from eco_nexus.dirty_fields import DirtyFieldsMixin
 
 
 class Department(models.Model):
@@ -19,7 +25,7 @@ class Semester(models.Model):
         return self.name
 
 
-class Course(models.Model):
+class Course(DirtyFieldsMixin, models.Model):
     department = models.ForeignKey(Department, on_delete=models.CASCADE)
     title = models.CharField(max_length=200)
     code = models.CharField(max_length=20, unique=True)
@@ -27,10 +33,24 @@ class Course(models.Model):
     credits = models.PositiveIntegerField(default=3)
     semester = models.ForeignKey(Semester, on_delete=models.CASCADE)
     instructor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='courses_taught')
+    # Seats; blank means unlimited
+    capacity = models.PositiveIntegerField(null=True, blank=True)
+    # Enrollments, kept in step by ums.registration
+    enrolled_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return f"{self.code}: {self.title}"
 
+    @property
+    def seats_left(self):
+        if self.capacity is None:
+            return None
+        return max(self.capacity - self.enrolled_count, 0)
+
+    @property
+    def is_full(self):
+        return self.capacity is not None and self.enrolled_count >= self.capacity
+
 
 class Enrollment(models.Model):
     student = models.ForeignKey('accounts.StudentProfile', on_delete=models.CASCADE)
@@ -44,7 +64,25 @@ class Enrollment(models.Model):
         return f"{self.student} -> {self.course}"
 
 
-class GradeSubmission(models.Model):
+class WaitlistEntry(models.Model):
+    """
+    A student waiting for a seat in a full course; the earliest entry is
+    enrolled when a seat frees up.
+    """
+    student = models.ForeignKey('accounts.StudentProfile', on_delete=models.CASCADE, related_name='waitlist_entries')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='waitlist')
+    joined_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('student', 'course')
+        ordering = ['id']
+        indexes = [models.Index(fields=['course', 'id'])]
+
+    def __str__(self):
+        return f"{self.student} waiting for {self.course}"
+
+
+class GradeSubmission(DirtyFieldsMixin, models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     student = models.ForeignKey('accounts.StudentProfile', on_delete=models.CASCADE)
     grade = models.CharField(max_length=2)  # e.g., A, B+
@@ -56,3 +94,153 @@ class GradeSubmission(models.Model):
 
     def __str__(self):
         return f"{self.course.code} - {self.student.student_id}: {self.grade}"
+
+
+class SemesterGPA(models.Model):
+    """
+    A student's graded credits and quality points for one semester, kept in
+    step with every grade so GPAs never have to re-read GradeSubmission.
+    """
+    student = models.ForeignKey('accounts.StudentProfile', on_delete=models.CASCADE, related_name='semester_gpas')
+    semester = models.ForeignKey(Semester, on_delete=models.CASCADE, related_name='student_gpas')
+    credits = models.IntegerField(default=0)
+    quality_points = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('student', 'semester')
+
+    @property
+    def gpa(self):
+        from .gpa import gpa_from
+        return gpa_from(self.quality_points, self.credits)
+
+    def __str__(self):
+        return f"{self.student_id} {self.semester_id}: {self.gpa}"
+
+
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=Department)
+@receiver([post_save, post_delete], sender=Semester)
+def invalidate_course_pages(sender, **kwargs):
+    from eco_nexus.page_cache import bump_page_version
+    bump_page_version('courses')
+
+
+@receiver([post_save, post_delete], sender=Department)
+def invalidate_department_registry(sender, **kwargs):
+    from eco_nexus import reference
+    reference.departments.invalidate()
+
+
+@receiver([post_save, post_delete], sender=Semester)
+def invalidate_semester_registry(sender, **kwargs):
+    from eco_nexus import reference
+    reference.semesters.invalidate()
+
+
+@receiver([post_save, post_delete], sender=Course)
+def invalidate_cached_course(sender, instance, **kwargs):
+    from .course_cache import invalidate_courses
+    invalidate_courses([instance.pk])
+
+
+@receiver(post_save, sender=Department)
+@receiver(post_save, sender=Semester)
+def invalidate_cached_courses(sender, instance, **kwargs):
+    # Cached courses carry their department and semester
+    from .course_cache import invalidate_courses
+    field = 'department' if sender is Department else 'semester'
+    invalidate_courses(Course.objects.filter(**{field: instance}).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=GradeSubmission)
+def update_gpa_on_grade_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    from .gpa import apply_grade_change
+    # DirtyFieldsMixin still holds the values from before this save
+    saved = getattr(instance, 'saved_values', None)
+    if created:
+        before = None
+    elif saved is not None and 'course_id' in saved and 'grade' in saved:
+        before = (saved['course_id'], saved['grade'])
+    else:
+        # Saved over a row we never loaded: its old grade is unknown
+        from .gpa import recompute
+        recompute(student_ids=[instance.student_id])
+        return
+    apply_grade_change(instance.student_id, before, (instance.course_id, instance.grade))
+
+
+@receiver(post_delete, sender=GradeSubmission)
+def update_gpa_on_grade_deleted(sender, instance, origin=None, **kwargs):
+    # Only direct deletes; a deleted course recomputes its students below
+    # and a deleted student takes their GPAs along
+    if isinstance(origin, GradeSubmission) or getattr(origin, 'model', None) is GradeSubmission:
+        from .gpa import apply_grade_change
+        apply_grade_change(instance.student_id, (instance.course_id, instance.grade), None)
+
+
+@receiver(pre_delete, sender=Course)
+def remember_graded_students(sender, instance, **kwargs):
+    instance.graded_student_ids = list(
+        GradeSubmission.objects.filter(course=instance).values_list('student_id', flat=True)
+    )
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def recompute_course_gpas(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    # Only credits and semester feed GPAs (or the grades are gone); an edit
+    # to anything else must not rescan the course's students
+    if created or raw:
+        return
+    if update_fields is not None and not {'credits', 'semester'} & set(update_fields):
+        return
+    student_ids = getattr(instance, 'graded_student_ids', None)
+    if student_ids is None:
+        student_ids = GradeSubmission.objects.filter(course=instance).values_list('student_id', flat=True)
+    from .gpa import recompute
+    recompute(student_ids=list(student_ids))
+
+
+@receiver(post_save, sender=Course)
+def fill_seats_from_waitlist(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    # The capacity may have gone up
+    if created or raw:
+        return
+    if update_fields is not None and 'capacity' not in update_fields:
+        return
+    from .registration import promote
+    promote(instance.pk)
+
+
+# Courses being deleted in this thread: their seats go with them
+_deleting_courses = threading.local()
+
+
+def courses_being_deleted():
+    if not hasattr(_deleting_courses, 'ids'):
+        _deleting_courses.ids = set()
+    return _deleting_courses.ids
+
+
+@receiver(pre_delete, sender=Course)
+def mark_course_deleting(sender, instance, **kwargs):
+    # Every pre_delete of a cascade is sent before any row is deleted
+    courses_being_deleted().add(instance.pk)
+
+
+@receiver(post_delete, sender=Course)
+def unmark_course_deleting(sender, instance, **kwargs):
+    courses_being_deleted().discard(instance.pk)
+
+
+@receiver(post_delete, sender=Enrollment)
+def give_back_seat(sender, instance, using='default', **kwargs):
+    # Every delete frees a seat: unenrolling, the admin, a deleted student;
+    # not one of a course's own enrollments going with it
+    if instance.course_id in courses_being_deleted():
+        return
+    from .registration import seat_freed
+    seat_freed(instance.course_id, using=using)
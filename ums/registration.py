@@ -0,0 +1,178 @@
+"""
+Enrollment writes that stay correct under a registration rush.
+
+Each enrollment is one insert-or-ignore against the ``(student, course)``
+unique constraint (see ``eco_nexus.inserts``): no ``exists()`` check
+first and no IntegrityError when two clicks race.
+
+Courses with a ``capacity`` hand out seats through ``Course.enrolled_count``.
+A seat is taken by a single conditional UPDATE that only matches while
+the count is below capacity, so concurrent requests can never oversell a
+course; a student who misses out joins the course's FIFO waitlist, and
+every seat given back goes to the head of the waitlist. While anyone is
+waiting, new students queue behind them rather than taking a seat that
+has just come free.
+
+The count goes up with every seat these functions hand out and is
+recounted whenever an Enrollment is deleted, however it is deleted (see
+``seat_freed``). Enrollments bulk-loaded past the ORM's signals are put
+right by ``recount_seats`` (``manage.py recount_seats``).
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from eco_nexus.inserts import bulk_insert_or_ignore, insert_or_ignore
+
+from .models import Course, Enrollment, WaitlistEntry
+
+ENROLLED = 'enrolled'
+ALREADY_ENROLLED = 'already_enrolled'
+WAITLISTED = 'waitlisted'
+ALREADY_WAITLISTED = 'already_waitlisted'
+
+
+class CourseFull(Exception):
+    pass
+
+
+def claim_seat(course_id, for_waitlist=False, using='default'):
+    """
+    Take a free seat; False if the course is full, or if students are
+    waiting for it and the seat is not for the head of the waitlist
+    """
+    seats = Course.objects.using(using).filter(
+        Q(capacity__isnull=True) | Q(enrolled_count__lt=F('capacity')), pk=course_id,
+    )
+    if not for_waitlist:
+        seats = seats.exclude(Exists(WaitlistEntry.objects.filter(course=OuterRef('pk'))))
+    return bool(seats.update(enrolled_count=F('enrolled_count') + 1))
+
+
+def release_seat(course_id, using='default'):
+    Course.objects.using(using).filter(pk=course_id, enrolled_count__gt=0).update(
+        enrolled_count=F('enrolled_count') - 1
+    )
+
+
+def enroll(student, course):
+    """
+    Enroll ``student`` in ``course``, or put them on its waitlist if it is
+    full or others are already waiting; returns ENROLLED, ALREADY_ENROLLED, WAITLISTED or
+    ALREADY_WAITLISTED
+    """
+    try:
+        with transaction.atomic():
+            if not insert_or_ignore(Enrollment(student=student, course=course)):
+                return ALREADY_ENROLLED
+            if not claim_seat(course.pk):
+                # Undo the enrollment
+                raise CourseFull
+            return ENROLLED
+    except CourseFull:
+        pass
+    if not insert_or_ignore(WaitlistEntry(student=student, course=course)):
+        return ALREADY_WAITLISTED
+    # A seat may have come free since the claim failed; it goes to the head
+    if student.pk in promote(course.pk):
+        return ENROLLED
+    return WAITLISTED
+
+
+def unenroll(enrollment):
+    """
+    Delete ``enrollment``; its seat goes to the head of the waitlist once
+    the delete commits. Returns False if it was already gone.
+    """
+    # A stale copy is fine: the seats are recounted either way
+    deleted, _ = enrollment.delete()
+    return bool(deleted)
+
+
+def seat_freed(course_id, using='default'):
+    """
+    Bring the course's seat count back in line after an enrollment is
+    deleted, and move its waitlist up once the delete commits.
+
+    Django sends ``post_delete`` for every row it collected, even one a
+    concurrent request deleted first, so the seats are recounted under the
+    course's row lock rather than decremented. By the time the waitlist
+    moves, a deleted course has taken its waitlist with it.
+    """
+    with transaction.atomic(using=using):
+        list(Course.objects.using(using).select_for_update().filter(pk=course_id).values_list('pk'))
+        recount_seats([course_id], using=using)
+    transaction.on_commit(partial(promote, course_id, using=using), using=using)
+
+
+def promote(course_id, using='default'):
+    """
+    Enroll students from the head of the course's waitlist while it has
+    free seats; returns the ids of the students promoted
+    """
+    promoted = []
+    waitlist = WaitlistEntry.objects.using(using)
+    while True:
+        head = waitlist.filter(course_id=course_id).values_list('pk', 'student_id').first()
+        if head is None:
+            return promoted
+        entry_id, student_id = head
+        # The seat, the waitlist entry and the enrollment move together
+        with transaction.atomic(using=using):
+            if not claim_seat(course_id, for_waitlist=True, using=using):
+                return promoted
+            # Whoever deletes the entry promotes it
+            if (waitlist.filter(pk=entry_id).delete()[0]
+                    and insert_or_ignore(Enrollment(student_id=student_id, course_id=course_id), using=using)):
+                promoted.append(student_id)
+            else:
+                release_seat(course_id, using=using)
+
+
+def waitlist_position(student, course):
+    """
+    The student's 1-based place on the course's waitlist, or None
+    """
+    ahead = (
+        WaitlistEntry.objects.filter(course=course, pk__lte=OuterRef('pk')).order_by()
+        .values('course').annotate(n=Count('*')).values('n')
+    )
+    return (
+        WaitlistEntry.objects.filter(student=student, course=course)
+        .annotate(position=Subquery(ahead)).values_list('position', flat=True).first()
+    )
+
+
+def enroll_cohort(course, student_ids, batch_size=1000):
+    """
+    Enroll every student in ``student_ids`` (profile ids, or a queryset of
+    them) in ``course``, skipping those already enrolled. Registrar
+    enrollments are not limited by the course's capacity.
+
+    Returns the number of new enrollments.
+    """
+    with transaction.atomic():
+        created = bulk_insert_or_ignore(
+            (Enrollment(student_id=student_id, course=course) for student_id in student_ids),
+            batch_size=batch_size,
+        )
+        if created:
+            Course.objects.filter(pk=course.pk).update(enrolled_count=F('enrolled_count') + created)
+    return created
+
+
+def recount_seats(course_ids=None, using='default'):
+    """
+    Reset ``enrolled_count`` from the Enrollment table, for every course
+    or just ``course_ids``, on database ``using``
+    """
+    counts = (
+        Enrollment.objects.filter(course=OuterRef('pk')).order_by()
+        .values('course').annotate(n=Count('*')).values('n')
+    )
+    courses = Course.objects.using(using)
+    if course_ids is not None:
+        courses = courses.filter(pk__in=course_ids)
+    return courses.update(enrolled_count=Coalesce(Subquery(counts), 0))
@@ -1,3 +1,365 @@
-from django.test import TestCase
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.messages import get_messages
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from django.db import connection
+from django.http import Http404
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+
+from eco_nexus.pagination import encode_cursor, paginate_by_cursor
+from eco_nexus.testing import QueryBudgetTestCase
+
+from accounts.models import StudentProfile
+
+from .gpa import GRADE_POINTS, gpa_from, recompute
+from .grade_sheets import import_grades
+from .registration import (
+    ALREADY_ENROLLED, ALREADY_WAITLISTED, ENROLLED, WAITLISTED, claim_seat, enroll, enroll_cohort, unenroll,
+)
+from .models import Course, Department, Enrollment, GradeSubmission, SemesterGPA
+
+
+class UmsQueryBudgetTests(QueryBudgetTestCase):
+    """
+    Query and time budgets for every ums URL
+    """
+
+    def test_course_list(self):
+        self.assertBudget('ums:course_list', 4)
+        self.assertBudget('ums:course_list', 4, user=self.data.student_user)
+        self.assertBudget('ums:course_list', 3, user=self.data.employer_user)
+
+    def test_filters_from_reference_registry(self):
+        self.assertBudget('ums:course_list', 6, user=self.data.student_user)
+        # Departments and semesters are now in process memory
+        self.assertBudget('ums:course_list', 4, user=self.data.student_user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Department.objects.create(name='Marine Conservation', code='MAR')
+        response = self.assertBudget('ums:course_list', 5, user=self.data.student_user)
+        self.assertContains(response, 'Marine Conservation')
+
+    def test_course_detail(self):
+        kwargs = {'course_id': self.data.course.id}
+        self.assertBudget('ums:course_detail', 2, kwargs=kwargs)
+        self.assertBudget('ums:course_detail', 4, user=self.data.student_user, kwargs=kwargs)
+        self.assertBudget('ums:course_detail', 2, user=self.data.employer_user, kwargs=kwargs)
+
+    def test_enroll(self):
+        kwargs = {'course_id': self.data.course.id}
+        self.assertBudget('ums:enroll', 0, kwargs=kwargs, method='post', status=302)
+        self.assertBudget('ums:enroll', 5, user=self.data.student_user, kwargs=kwargs, method='post', status=302)
+        self.assertBudget('ums:enroll', 1, user=self.data.employer_user, kwargs=kwargs, method='post', status=302)
+
+    def test_enroll_legacy(self):
+        kwargs = {'course_id': self.data.course.id}
+        self.assertBudget('ums:enroll_legacy', 0, kwargs=kwargs, method='post', status=302)
+        self.assertBudget('ums:enroll_legacy', 5, user=self.data.student_user, kwargs=kwargs, method='post', status=302)
+
+    def test_unenroll(self):
+        kwargs = {'enrollment_id': self.data.enrollment.id}
+        self.assertBudget('ums:unenroll', 0, kwargs=kwargs, method='post', status=302)
+        self.assertBudget('ums:unenroll', 1, user=self.data.employer_user, kwargs=kwargs, method='post', status=302)
+        self.assertBudget('ums:unenroll', 7, user=self.data.student_user, kwargs=kwargs, method='post', status=302)
+
+    def test_my_enrollments(self):
+        self.assertBudget('ums:my_enrollments', 0, status=302)
+        self.assertBudget('ums:my_enrollments', 3, user=self.data.student_user)
+        self.assertBudget('ums:my_enrollments', 1, user=self.data.employer_user)
+
+    def test_my_grades(self):
+        self.assertBudget('ums:my_grades', 0, status=302)
+        self.assertBudget('ums:my_grades', 4, user=self.data.student_user)
+        self.assertBudget('ums:my_grades', 1, user=self.data.employer_user)
+
+    def expected_gpas(self, student):
+        semesters = {}
+        for grade in GradeSubmission.objects.filter(student=student, grade__in=list(GRADE_POINTS)).select_related('course'):
+            credits, points = semesters.get(grade.course.semester_id, (0, Decimal(0)))
+            semesters[grade.course.semester_id] = (
+                credits + grade.course.credits, points + grade.course.credits * GRADE_POINTS[grade.grade],
+            )
+        total_credits = sum(credits for credits, _ in semesters.values())
+        total_points = sum(points for _, points in semesters.values())
+        return gpa_from(total_points, total_credits), {
+            semester_id: gpa_from(points, credits) for semester_id, (credits, points) in semesters.items()
+        }
+
+    def stored_gpas(self, student):
+        return StudentProfile.objects.get(pk=student.pk).gpa, {
+            row.semester_id: row.gpa for row in SemesterGPA.objects.filter(student=student)
+        }
+
+    def test_gpa_updated_incrementally(self):
+        student = self.data.student
+        self.assertIsNotNone(self.stored_gpas(student)[0])
+        self.assertEqual(self.stored_gpas(student), self.expected_gpas(student))
+
+        grade = GradeSubmission.objects.get(student=student, course=self.data.course)
+        grade.grade = 'F' if grade.grade != 'F' else 'A'
+        # The update, then course lookup, semester row, totals and profile in
+        # a savepoint; no rescan of the student's grades
+        with self.assertNumQueries(7):
+            grade.save()
+        self.assertEqual(self.stored_gpas(student), self.expected_gpas(student))
+
+        course = Course.objects.exclude(gradesubmission__student=student).first()
+        GradeSubmission.objects.create(student=student, course=course, grade='B-')
+        self.assertEqual(self.stored_gpas(student), self.expected_gpas(student))
+
+        grade.delete()
+        self.assertEqual(self.stored_gpas(student), self.expected_gpas(student))
+
+        # Grades that carry no points leave the GPA alone
+        course = Course.objects.exclude(gradesubmission__student=student).first()
+        with self.assertNumQueries(1):
+            GradeSubmission.objects.create(student=student, course=course, grade='P')
+
+    def test_course_credit_change_recomputes_its_students(self):
+        course = self.data.course
+        course.credits += 2
+        course.save()
+        self.assertEqual(self.stored_gpas(self.data.student), self.expected_gpas(self.data.student))
+
+        # Other edits leave GPAs alone
+        course = Course.objects.get(pk=course.pk)
+        course.description = 'Fixed a typo.'
+        with CaptureQueriesContext(connection) as captured:
+            course.save()
+        self.assertFalse([query for query in captured if 'gradesubmission' in query['sql']])
+        self.assertEqual(Course.objects.get(pk=course.pk).description, 'Fixed a typo.')
+
+    def test_recompute_gpa(self):
+        students = list(StudentProfile.objects.filter(gradesubmission__isnull=False).distinct()[:5])
+        expected = [self.expected_gpas(student) for student in students]
+        SemesterGPA.objects.all().delete()
+        StudentProfile.objects.update(gpa=None)
+
+        count = StudentProfile.objects.count()
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(recompute(chunk_size=1000), count)
+        # One grouped read of the grades per chunk of students
+        grade_reads = [query['sql'] for query in captured if 'ums_gradesubmission' in query['sql']]
+        self.assertEqual(len(grade_reads), -(-count // 1000))
+        self.assertEqual([self.stored_gpas(student) for student in students], expected)
+
+    def grade_sheet(self, rows, name='grades.csv'):
+        lines = ['Student_ID,Name,Grade'] + [f'{student_id},Student,{grade}' for student_id, grade in rows]
+        return SimpleUploadedFile(name, '\n'.join(lines).encode(), content_type='text/csv')
+
+    def test_grade_sheet(self):
+        kwargs = {'course_id': self.data.course.id}
+        self.assertBudget('ums:grade_sheet', 0, kwargs=kwargs, status=302)
+        self.assertBudget('ums:grade_sheet', 2, user=self.data.staff_user, kwargs=kwargs)
+        self.assertBudget('ums:grade_sheet', 2, user=self.data.student_user, kwargs=kwargs, status=404)
+
+    def test_grade_sheet_import(self):
+        course = Course.objects.create(department=self.data.course.department, semester=self.data.course.semester,
+                                       title='Roster Course', code='ROSTER-1', credits=3)
+        students = list(StudentProfile.objects.order_by('pk')[:300])
+        Enrollment.objects.bulk_create(Enrollment(student=student, course=course) for student in students)
+        grades = ['A', 'B+', 'C', 'P']
+        rows = [(student.student_id, grades[i % len(grades)]) for i, student in enumerate(students)]
+        kwargs = {'course_id': course.id}
+
+        # A full roster imports in one request with a fixed number of queries,
+        # in well under the default ceiling
+        response = self.assertBudget('ums:grade_sheet', 17, user=self.data.staff_user, kwargs=kwargs, method='post',
+                                     data={'sheet': self.grade_sheet(rows)}, status=302, time_limit=2)
+        self.assertEqual(GradeSubmission.objects.filter(course=course).count(), 300)
+        self.assertEqual(self.stored_gpas(students[0]), self.expected_gpas(students[0]))
+        self.assertEqual(self.stored_gpas(students[3]), self.expected_gpas(students[3]))
+
+        # Any bad row imports nothing and every problem is reported
+        outsider = StudentProfile.objects.exclude(enrollment__course=course).first()
+        rows[0] = (rows[0][0], 'F')
+        bad_rows = rows[:1] + [(rows[1][0], 'Z')] + rows[2:] + [
+            (outsider.student_id, 'A'), ('nobody', 'A'), (rows[2][0], 'A'),
+        ]
+        response = self.assertBudget('ums:grade_sheet', 4, user=self.data.staff_user, kwargs=kwargs, method='post',
+                                     data={'sheet': self.grade_sheet(bad_rows)})
+        self.assertEqual([line for line, _ in response.context['sheet_errors']], [3, 302, 303, 304])
+        self.assertEqual(GradeSubmission.objects.get(course=course, student=students[0]).grade, 'A')
+
+        # Re-uploading changes only the grades that differ
+        result = import_grades(course, [(line, {'student_id': sid, 'grade': grade})
+                                        for line, (sid, grade) in enumerate(rows, start=2)])
+        self.assertEqual((result.created, result.updated, result.unchanged), (0, 1, 299))
+        self.assertEqual(self.stored_gpas(students[0]), self.expected_gpas(students[0]))
+
+    def test_grade_sheet_rejects_unreadable_files(self):
+        kwargs = {'course_id': self.data.course.id}
+        for upload, error in [
+            (SimpleUploadedFile('grades.txt', b'student_id,grade'), 'must be .csv or .xlsx'),
+            (SimpleUploadedFile('grades.csv', b'id,score\n1,A'), 'no student_id, grade column'),
+        ]:
+            response = self.assertBudget('ums:grade_sheet', 2, user=self.data.staff_user, kwargs=kwargs,
+                                         method='post', data={'sheet': upload})
+            self.assertContains(response, error)
+
+    def test_enroll_inserts_once(self):
+        course = Course.objects.create(department=self.data.course.department, semester=self.data.course.semester,
+                                       title='Open Course', code='OPEN-1')
+        client = self.client_for(self.data.student_user)
+        url = reverse('ums:enroll', kwargs={'course_id': course.id})
+        for expected in ('Successfully enrolled', 'already enrolled'):
+            response = client.post(url)
+            self.assertIn(expected, str(list(get_messages(response.wsgi_request))))
+        self.assertEqual(Enrollment.objects.filter(student=self.data.student, course=course).count(), 1)
+
+        # A duplicate is ignored by the database, not raised
+        with self.assertNumQueries(3):
+            self.assertEqual(enroll(self.data.student, course), ALREADY_ENROLLED)
+
+    def test_enroll_cohort(self):
+        course = Course.objects.create(department=self.data.course.department, semester=self.data.course.semester,
+                                       title='Cohort Course', code='COHORT-1')
+        student_ids = list(StudentProfile.objects.order_by('pk').values_list('pk', flat=True)[:500])
+        Enrollment.objects.create(student_id=student_ids[0], course=course)
+
+        # Two insert batches and one seat-count update, in a savepoint
+        with self.assertNumQueries(5):
+            self.assertEqual(enroll_cohort(course, student_ids + student_ids[:10], batch_size=300), 499)
+        self.assertEqual(Enrollment.objects.filter(course=course).count(), 500)
+        course.refresh_from_db()
+        self.assertEqual(course.enrolled_count, 499)
+        self.assertEqual(enroll_cohort(course, student_ids), 0)
+
+    def test_capacity_and_waitlist(self):
+        course = Course.objects.create(department=self.data.course.department, semester=self.data.course.semester,
+                                       title='Small Course', code='SMALL-1', capacity=2)
+        students = list(StudentProfile.objects.order_by('pk')[:5])
+        self.assertEqual([enroll(student, course) for student in students],
+                         [ENROLLED, ENROLLED, WAITLISTED, WAITLISTED, WAITLISTED])
+        self.assertEqual(enroll(students[3], course), ALREADY_WAITLISTED)
+        course.refresh_from_db()
+        self.assertEqual((course.enrolled_count, course.is_full), (2, True))
+
+        # The page reads seats from the course row, not a COUNT of enrollments
+        client = self.client_for(students[4].user)
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(reverse('ums:course_detail', kwargs={'course_id': course.id}))
+        self.assertEqual(response.context['waitlist_position'], 3)
+        self.assertContains(response, "You're #3 on the waitlist")
+        self.assertFalse([query['sql'] for query in captured if 'COUNT' in query['sql'] and 'ums_enrollment' in query['sql']])
+
+        # Each seat given back goes to the head of the waitlist once the delete commits
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(unenroll(Enrollment.objects.get(course=course, student=students[0])))
+        self.assertEqual(
+            set(Enrollment.objects.filter(course=course).values_list('student_id', flat=True)),
+            {students[1].pk, students[2].pk},
+        )
+        self.assertEqual(list(course.waitlist.values_list('student_id', flat=True)), [students[3].pk, students[4].pk])
+
+        # So does a seat freed by any other delete
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.filter(course=course, student=students[1]).delete()
+        course.refresh_from_db()
+        self.assertEqual((course.enrolled_count, list(course.waitlist.values_list('student_id', flat=True))),
+                         (2, [students[4].pk]))
+
+        # Edits that leave the capacity alone do not touch the waitlist
+        with CaptureQueriesContext(connection) as captured:
+            course.title = 'Small Seminar'
+            course.save()
+        self.assertFalse([query for query in captured if 'waitlist' in query['sql']])
+
+        # Raising the capacity fills the new seats from the waitlist
+        course.capacity = 4
+        course.save()
+        course.refresh_from_db()
+        self.assertEqual((course.enrolled_count, course.waitlist.count()), (3, 0))
+
+        # A deleted student gives their seat back
+        with self.captureOnCommitCallbacks(execute=True):
+            students[2].delete()
+        course.refresh_from_db()
+        self.assertEqual(course.enrolled_count, 2)
+
+        # A deleted course takes its waitlist along instead of promoting it
+        late = StudentProfile.objects.order_by('pk')[5]
+        self.assertEqual([enroll(student, course) for student in (students[0], students[1], late)],
+                         [ENROLLED, ENROLLED, WAITLISTED])
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as captured:
+            course.delete()
+        self.assertFalse(Enrollment.objects.filter(course_id=course.pk).exists())
+        # Without recounting its seats enrollment by enrollment
+        self.assertFalse([query for query in captured if query['sql'].startswith('UPDATE "ums_course"')])
+
+    def test_waitlist_cannot_be_jumped(self):
+        course = Course.objects.create(department=self.data.course.department, semester=self.data.course.semester,
+                                       title='Small Course', code='SMALL-1', capacity=1)
+        first, waiting, late = StudentProfile.objects.order_by('pk')[:3]
+        self.assertEqual([enroll(student, course) for student in (first, waiting)], [ENROLLED, WAITLISTED])
+
+        # A seat comes free before the waitlist has moved up
+        with self.captureOnCommitCallbacks(execute=False):
+            unenroll(Enrollment.objects.get(course=course, student=first))
+        self.assertEqual(enroll(late, course), WAITLISTED)
+        self.assertEqual(list(Enrollment.objects.filter(course=course).values_list('student_id', flat=True)),
+                         [waiting.pk])
+        self.assertEqual(list(course.waitlist.values_list('student_id', flat=True)), [late.pk])
+
+    def test_seat_freed_while_joining_waitlist(self):
+        course = Course.objects.create(department=self.data.course.department, semester=self.data.course.semester,
+                                       title='Small Course', code='SMALL-1', capacity=1)
+        calls = []
+
+        def full_then_freed(course_id, for_waitlist=False, using='default'):
+            # The course is full for the first claim; its seat comes free
+            # (and the waitlist is empty) before the student joins the waitlist
+            calls.append(course_id)
+            return len(calls) > 1 and claim_seat(course_id, for_waitlist, using=using)
+
+        with mock.patch('ums.registration.claim_seat', full_then_freed):
+            self.assertEqual(enroll(self.data.student, course), ENROLLED)
+        course.refresh_from_db()
+        self.assertEqual((course.enrolled_count, course.waitlist.count()), (1, 0))
+        self.assertTrue(Enrollment.objects.filter(course=course, student=self.data.student).exists())
+
+    def test_cursor_pages_across_tied_keys(self):
+        enrollments = Enrollment.objects.filter(student=self.data.student)
+        # Every row shares its sort key bar the id tie-breaker
+        enrollments.update(enrolled_on=timezone.now())
+        ordering = ('-enrolled_on', 'id')
+        expected = list(enrollments.order_by(*ordering).values_list('id', flat=True))
+        self.assertGreater(len(expected), 14)
+
+        pages, cursor = [], None
+        while True:
+            page = paginate_by_cursor(enrollments, ordering, 7, cursor)
+            pages.append([enrollment.id for enrollment in page])
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual(sum(pages, []), expected)
+        self.assertFalse(paginate_by_cursor(enrollments, ordering, 7).has_previous())
+
+        # And back again from the last page
+        backwards = [pages[-1]]
+        while page.has_previous():
+            page = paginate_by_cursor(enrollments, ordering, 7, page.previous_cursor)
+            backwards.append([enrollment.id for enrollment in page])
+        self.assertEqual(backwards[::-1], pages)
+
+    def test_bad_cursor_is_not_found(self):
+        enrollments = Enrollment.objects.filter(student=self.data.student)
+        ordering = ('-enrolled_on', 'id')
+        for cursor in (
+            'not-a-cursor!',
+            encode_cursor('next', ['2024-01-01T00:00:00'])[:-3],
+            encode_cursor('sideways', ['2024-01-01T00:00:00', '1']),
+            encode_cursor('next', ['2024-01-01T00:00:00']),
+            encode_cursor('next', ['yesterday', '1']),
+            encode_cursor('next', ['2024-01-01T00:00:00', 'one']),
+        ):
+            with self.subTest(cursor=cursor), self.assertRaises(Http404):
+                paginate_by_cursor(enrollments, ordering, 7, cursor)
+
+        client = self.client_for(self.data.student_user)
+        response = client.get(reverse('ums:my_enrollments'), {'cursor': 'not-a-cursor!'})
+        self.assertEqual(response.status_code, 404)
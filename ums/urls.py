@@ -13,6 +13,9 @@ urlpatterns = [
     path('enroll/<int:course_id>/', views.enroll, name='enroll_legacy'),  # Legacy support
     path('enrollment/<int:enrollment_id>/unenroll/', views.UnenrollCourseView.as_view(), name='unenroll'),
     
+    # Instructor grading
+    path('courses/<int:course_id>/grades/upload/', views.GradeSheetUploadView.as_view(), name='grade_sheet'),
+
     # Student dashboards
     path('my-enrollments/', views.MyEnrollmentsView.as_view(), name='my_enrollments'),
     path('my-grades/', views.MyGradesView.as_view(), name='my_grades'),
@@ -1,16 +1,28 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import Http404
 from django.views import View
-from django.views.generic import ListView, DetailView
+from django.views.generic import ListView, FormView
+from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from django.db import models
 from django.contrib import messages
 
-from .models import Course, Enrollment, Department, GradeSubmission
-from accounts.models import StudentProfile
+from .models import Course, Enrollment, GradeSubmission
+from .forms import GradeSheetForm
+from .grade_sheets import import_grades
+from .registration import ALREADY_WAITLISTED, ENROLLED, WAITLISTED, unenroll, waitlist_position
+from .registration import enroll as enroll_student
+from .course_cache import COURSE_PLAN, get_course
+from eco_nexus import reference
+from eco_nexus.detail import PlannedDetailView
+from eco_nexus.identity import StudentRequiredMixin
+from eco_nexus.page_cache import cache_anonymous_page
+from eco_nexus.pagination import CursorPaginationMixin
 
 
-class CourseListView(ListView):
+@method_decorator(cache_anonymous_page('courses'), name='dispatch')
+class CourseListView(CursorPaginationMixin, ListView):
     """
     Display all available courses with filtering options
     """
@@ -18,22 +30,20 @@ class CourseListView(ListView):
     template_name = 'ums/course_list.html'
     context_object_name = 'courses'
     paginate_by = 12
+    cursor_ordering = ('code',)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['departments'] = Department.objects.all()
-        context['semesters'] = Course.objects.values_list('semester', flat=True).distinct()
+        context['departments'] = reference.departments.all()
+        context['semesters'] = reference.semesters.all()
         
         # Check which courses user is enrolled in
-        if self.request.user.is_authenticated:
-            try:
-                student_profile = self.request.user.student_profile
-                enrolled_course_ids = Enrollment.objects.filter(
-                    student=student_profile
-                ).values_list('course_id', flat=True)
-                context['enrolled_course_ids'] = list(enrolled_course_ids)
-            except StudentProfile.DoesNotExist:
-                context['enrolled_course_ids'] = []
+        student_profile = self.request.identity.student
+        if student_profile is not None:
+            enrolled_course_ids = Enrollment.objects.filter(
+                student=student_profile
+            ).values_list('course_id', flat=True)
+            context['enrolled_course_ids'] = list(enrolled_course_ids)
         else:
             context['enrolled_course_ids'] = []
         
@@ -63,7 +73,7 @@ class CourseListView(ListView):
         return queryset.order_by('code')
 
 
-class CourseDetailView(DetailView):
+class CourseDetailView(PlannedDetailView):
     """
     Display detailed information about a specific course
     """
@@ -71,120 +81,108 @@ class CourseDetailView(DetailView):
     template_name = 'ums/course_detail.html'
     context_object_name = 'course'
     pk_url_kwarg = 'course_id'
+    plan = COURSE_PLAN
+
+    def load_object(self, queryset=None):
+        # Served from the stampede-protected object cache
+        course = get_course(self.kwargs[self.pk_url_kwarg])
+        if course is None:
+            raise Http404("Course not found.")
+        return course
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        course = self.get_object()
+        course = self.object
         
-        # Get enrolled students count
-        context['enrolled_students_count'] = Enrollment.objects.filter(
-            course=course
-        ).count()
+        # Seats come from the course row, not a COUNT; the cached course
+        # may be behind on them
+        course.capacity, course.enrolled_count = Course.objects.filter(
+            pk=course.pk
+        ).values_list('capacity', 'enrolled_count').get()
+        context['enrolled_students_count'] = course.enrolled_count
         
         # Check if current user is enrolled
         context['is_enrolled'] = False
         context['user_enrollment'] = None
+        context['waitlist_position'] = None
         
-        if self.request.user.is_authenticated:
-            try:
-                student_profile = self.request.user.student_profile
-                enrollment = Enrollment.objects.filter(
-                    student=student_profile,
-                    course=course
-                ).first()
-                if enrollment:
-                    context['is_enrolled'] = True
-                    context['user_enrollment'] = enrollment
-            except StudentProfile.DoesNotExist:
-                pass
+        student_profile = self.request.identity.student
+        if student_profile is not None:
+            enrollment = Enrollment.objects.filter(
+                student=student_profile,
+                course=course
+            ).first()
+            if enrollment:
+                context['is_enrolled'] = True
+                context['user_enrollment'] = enrollment
+            else:
+                context['waitlist_position'] = waitlist_position(student_profile, course)
         
         # Get grades if enrolled
         if context['is_enrolled']:
-            try:
-                student_profile = self.request.user.student_profile
-                grade = GradeSubmission.objects.filter(
-                    student=student_profile,
-                    course=course
-                ).first()
-                context['grade'] = grade
-            except:
-                pass
+            context['grade'] = GradeSubmission.objects.filter(
+                student=student_profile,
+                course=course
+            ).first()
         
         return context
 
 
-@method_decorator(login_required, name='dispatch')
-class EnrollCourseView(View):
+class EnrollCourseView(StudentRequiredMixin, View):
     """
     Handle course enrollment for authenticated users
     """
+    role_message = "Student profile not found. Please complete your profile."
+    role_redirect_url = 'accounts:profile'
     
     def post(self, request, course_id):
         """
         Enroll student in course
         """
-        try:
-            # Get student profile
-            student_profile = request.user.student_profile
-        except StudentProfile.DoesNotExist:
-            messages.error(request, "Student profile not found. Please complete your profile.")
-            return redirect('accounts:profile')
-        
-        # Get course
-        course = get_object_or_404(Course, id=course_id)
-        
-        # Check if already enrolled
-        existing_enrollment = Enrollment.objects.filter(
-            student=student_profile,
-            course=course
-        ).exists()
-        
-        if existing_enrollment:
+        # Served from the object cache; the insert below settles duplicates
+        course = get_course(course_id)
+        if course is None:
+            raise Http404("Course not found.")
+
+        outcome = enroll_student(request.identity.student, course)
+        if outcome == ENROLLED:
+            messages.success(request, f"Successfully enrolled in {course.title}")
+        elif outcome == WAITLISTED:
+            messages.info(request, f"{course.title} is full; you have been added to the waitlist")
+        elif outcome == ALREADY_WAITLISTED:
+            messages.warning(request, f"You are already on the waitlist for {course.title}")
+        else:
             messages.warning(request, f"You are already enrolled in {course.title}")
-            return redirect('ums:course_detail', course_id=course_id)
-        
-        # Create enrollment
-        enrollment = Enrollment.objects.create(
-            student=student_profile,
-            course=course
-        )
-        
-        messages.success(request, f"Successfully enrolled in {course.title}")
         return redirect('ums:course_detail', course_id=course_id)
 
 
-@method_decorator(login_required, name='dispatch')
-class UnenrollCourseView(View):
+class UnenrollCourseView(StudentRequiredMixin, View):
     """
     Handle course unenrollment for authenticated users
     """
+    role_redirect_url = 'accounts:profile'
     
     def post(self, request, enrollment_id):
         """
         Unenroll student from course
         """
-        try:
-            student_profile = request.user.student_profile
-        except StudentProfile.DoesNotExist:
-            messages.error(request, "Student profile not found.")
-            return redirect('accounts:profile')
-        
         # Get enrollment
         enrollment = get_object_or_404(
-            Enrollment,
+            Enrollment.objects.select_related('course'),
             id=enrollment_id,
-            student=student_profile
+            student=request.identity.student
         )
         
         course = enrollment.course
-        enrollment.delete()
+        # Frees the seat for the next student on the waitlist
+        unenroll(enrollment)
         
         messages.success(request, f"Unenrolled from {course.title}")
         return redirect('ums:my_enrollments')
 
 
 @method_decorator(login_required, name='dispatch')
-class MyEnrollmentsView(ListView):
+class MyEnrollmentsView(CursorPaginationMixin, ListView):
     """
     Display all courses the student is enrolled in
     """
@@ -192,22 +190,22 @@ class MyEnrollmentsView(ListView):
     template_name = 'ums/my_enrollments.html'
     context_object_name = 'enrollments'
     paginate_by = 12
+    cursor_ordering = ('-enrolled_on', 'id')
 
     def get_queryset(self):
         """
         Only show enrollments for current user
         """
-        try:
-            student_profile = self.request.user.student_profile
-            return Enrollment.objects.filter(
-                student=student_profile
-            ).select_related('course__department', 'course__instructor')
-        except StudentProfile.DoesNotExist:
+        student_profile = self.request.identity.student
+        if student_profile is None:
             return Enrollment.objects.none()
+        return Enrollment.objects.filter(
+            student=student_profile
+        ).select_related('course__department', 'course__instructor').order_by('-enrolled_on', 'id')
 
 
 @method_decorator(login_required, name='dispatch')
-class MyGradesView(ListView):
+class MyGradesView(CursorPaginationMixin, ListView):
     """
     Display all grades for the student
     """
@@ -215,31 +213,63 @@ class MyGradesView(ListView):
     template_name = 'ums/my_grades.html'
     context_object_name = 'grades'
     paginate_by = 20
+    cursor_ordering = ('-submitted_on', 'id')
 
     def get_queryset(self):
         """
         Only show grades for current user
         """
-        try:
-            student_profile = self.request.user.student_profile
-            return GradeSubmission.objects.filter(
-                student=student_profile
-            ).select_related('course__department', 'course__semester')
-        except StudentProfile.DoesNotExist:
+        student_profile = self.request.identity.student
+        if student_profile is None:
             return GradeSubmission.objects.none()
+        return GradeSubmission.objects.filter(
+            student=student_profile
+        ).select_related('course__department', 'course__semester').order_by('-submitted_on', 'id')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Calculate GPA
-        try:
-            student_profile = self.request.user.student_profile
-            context['gpa'] = student_profile.gpa
-        except:
-            context['gpa'] = None
-        
+        # GPAs are kept up to date as grades change (see ums.gpa)
+        student_profile = self.request.identity.student
+        context['gpa'] = student_profile.gpa if student_profile is not None else None
+        context['semester_gpas'] = (
+            student_profile.semester_gpas.select_related('semester').order_by('semester__start_date')
+            if student_profile is not None else []
+        )
+
+        return context
+
+
+class GradeSheetUploadView(LoginRequiredMixin, FormView):
+    """
+    Let a course's instructor (or staff) upload its grades as one sheet
+    """
+    form_class = GradeSheetForm
+    template_name = 'ums/grade_sheet.html'
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            courses = Course.objects.all() if request.user.is_staff else Course.objects.filter(instructor=request.user)
+            self.course = get_object_or_404(courses, id=kwargs['course_id'])
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['course'] = self.course
         return context
 
+    def form_valid(self, form):
+        result = import_grades(self.course, form.rows, submitted_by=self.request.user)
+        if not result.ok:
+            # Nothing was imported; show every bad row at once
+            return self.render_to_response(self.get_context_data(form=form, sheet_errors=result.errors))
+        messages.success(
+            self.request,
+            f"Imported grades for {self.course.code}: {result.created} new, {result.updated} updated, "
+            f"{result.unchanged} unchanged",
+        )
+        return redirect('ums:course_detail', course_id=self.course.id)
+
 
 # Keep legacy function-based views for backward compatibility
 def course_list(request):